@@ -0,0 +1,179 @@
+"""冷启动基准 - stdio 入口从启动进程到首个响应的时间，以及 -X importtime 的导入耗时分解
+
+用法：
+    python benchmarks/cold_start.py [--runs 10] [--storage memory] [--storage-path PATH] [--top 15]
+                                    [--output result.json]
+
+每次运行启动一个 `python -m src.server` 进程（与 taskify-mcp-server 相同的 main 入口），
+直接在 stdio 上收发 JSON-RPC 消息，记录从启动进程到以下响应的时间（毫秒，取中位数与最小/最大值）：
+- initialize：握手响应
+- tools_list：工具列表
+- first_call：第一次 analyze_programming_context 调用
+另外测量空解释器的启动时间（python -c pass），作为不可再压缩的下限。
+
+导入耗时来自 `python -X importtime -c "import src.server"`，按顶层包汇总各模块的自身耗时
+（mcp 协议栈、本项目 src、其余第三方与标准库），并列出自身耗时最高的模块。
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+PROTOCOL_VERSION = "2025-06-18"
+
+
+def server_env(storage: str, storage_path: str = "") -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({"TASKIFY_STORAGE": storage, "FASTMCP_LOG_LEVEL": "WARNING"})
+    if storage_path:
+        env["TASKIFY_STORAGE_PATH"] = storage_path
+    return env
+
+
+def request(process: subprocess.Popen, message: Dict[str, Any], expect_response: bool = True) -> Dict[str, Any]:
+    assert process.stdin is not None and process.stdout is not None, "服务器进程需以管道方式启动"
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+    if not expect_response:
+        return {}
+    line = process.stdout.readline()
+    if not line:
+        raise SystemExit(f"服务器进程提前退出（状态码 {process.wait()}）")
+    return json.loads(line)
+
+
+def measure_once(storage: str, storage_path: str) -> Dict[str, float]:
+    """启动一个服务器进程，返回各响应距启动的毫秒数"""
+    milestones = {}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.server"],
+        cwd=ROOT, env=server_env(storage, storage_path), text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        request(process, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "cold-start-benchmark", "version": "1.0"}
+        }})
+        milestones["initialize"] = (time.perf_counter() - started) * 1000
+        request(process, {"jsonrpc": "2.0", "method": "notifications/initialized"}, expect_response=False)
+        request(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        milestones["tools_list"] = (time.perf_counter() - started) * 1000
+        response = request(process, {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {
+            "name": "analyze_programming_context",
+            "arguments": {"user_request": "Implement a login rate limiter for the API service"}
+        }})
+        if response.get("result", {}).get("isError") or "error" in response:
+            raise SystemExit(f"工具调用失败: {response}")
+        milestones["first_call"] = (time.perf_counter() - started) * 1000
+    finally:
+        if process.stdin is not None:
+            process.stdin.close()
+        process.wait(timeout=30)
+    return milestones
+
+
+def interpreter_startup(runs: int) -> float:
+    """空解释器（含 site）的启动时间中位数（毫秒）"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 1)
+
+
+def import_profile(top: int) -> Dict[str, Any]:
+    """-X importtime 的导入耗时：按顶层包汇总自身耗时，并列出最慢的模块"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.server"],
+        cwd=ROOT, env=server_env("memory"), capture_output=True, text=True, check=True
+    ).stderr
+    modules: Dict[str, int] = {}
+    total = 0
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        modules[name] = int(self_us)
+        if name == "src.server":
+            total = int(cumulative_us)
+    packages: Dict[str, int] = {}
+    for name, self_us in modules.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    ranked = sorted(packages.items(), key=lambda item: -item[1])
+    return {
+        "import_src_server_ms": round(total / 1000, 1),
+        "modules_imported": len(modules),
+        "by_package_ms": {package: round(self_us / 1000, 1) for package, self_us in ranked[:top]},
+        "slowest_modules_ms": {
+            name: round(self_us / 1000, 1)
+            for name, self_us in sorted(modules.items(), key=lambda item: -item[1])[:top]
+        }
+    }
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        milestone: {
+            "median": round(statistics.median(sample[milestone] for sample in samples), 1),
+            "min": round(min(sample[milestone] for sample in samples), 1),
+            "max": round(max(sample[milestone] for sample in samples), 1)
+        }
+        for milestone in samples[0]
+    }
+
+
+def main():
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="冷启动次数")
+    parser.add_argument("--storage", default="memory", help="服务器使用的存储后端（TASKIFY_STORAGE）")
+    parser.add_argument("--storage-path", default="",
+                        help="持久化后端的存储路径（TASKIFY_STORAGE_PATH），默认使用临时目录")
+    parser.add_argument("--top", type=int, default=15, help="导入耗时分解中列出的包与模块数")
+    parser.add_argument("--output", help="保存 JSON 结果的路径")
+    args = parser.parse_args()
+
+    # 未指定 --storage-path 时持久化后端写入临时目录（结束后删除），不改动用户的 ~/.taskify；
+    # 各次运行共用同一存储，测量的是打开已有存储的启动
+    storage_dir = "" if args.storage_path else tempfile.mkdtemp(prefix="taskify-cold-start-")
+    storage_path = args.storage_path or os.path.join(storage_dir, "taskify.db")
+    try:
+        # 先运行一次，确保字节码缓存已生成，测量的是常规的冷启动而不是首次编译
+        measure_once(args.storage, storage_path)
+        samples = [measure_once(args.storage, storage_path) for _ in range(args.runs)]
+    finally:
+        if storage_dir:
+            shutil.rmtree(storage_dir, ignore_errors=True)
+    result = {
+        "benchmark": "cold_start",
+        "runs": args.runs,
+        "storage": args.storage,
+        "python_startup_ms": interpreter_startup(args.runs),
+        "time_to_response_ms": summarize(samples),
+        "imports": import_profile(args.top)
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""HTTP 压测 - 一个 Streamable HTTP 服务器进程对比 N 个 stdio 服务器进程的吞吐量
+
+用法：
+    python benchmarks/http_load.py [--connections 8] [--concurrency 4] [--duration 10]
+                                   [--mix analyze=1,guided=4,validate=3,coach=0.5,manager=0.5]
+                                   [--tool-workers 4] [--shards 1] [--skip-stdio] [--seed 7]
+                                   [--log-level WARNING] [--output result.json]
+
+相同的负载跑两遍：
+- stdio：--connections 个服务器进程，每个进程一条 stdio 连接（每个 Agent 一个进程的部署方式）
+- http：一个 --transport streamable-http 服务器进程，--connections 条 HTTP 连接
+  （每条连接一个 httpx 客户端，keep-alive 复用 TCP 连接），所有 Agent 共享分析历史与上下文记忆；
+  --shards N 时改为分片部署：一个路由进程 + N 个工作进程（会话按分片亲和路由，历史在分片间复制）
+
+每条连接上运行 --concurrency 个虚拟客户端，客户端与工具权重与 stdio_load.py 相同。
+输出两种部署各自的延迟汇总，以及吞吐量、服务器进程数与共享历史规模的对比。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stdio_load import (  # noqa: E402
+    ROOT,
+    TOOL_ALIASES,
+    drive,
+    parse_mix,
+    result_json,
+    run_connection,
+    server_env,
+    summarize,
+)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"HTTP 服务器进程提前退出（状态码 {process.returncode}）")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit(f"HTTP 服务器在 {timeout} 秒内没有开始监听")
+
+
+async def history_size(session: ClientSession) -> int:
+    """连接所见的分析历史条数（stdio 每个进程各自一份，HTTP 所有连接共享一份）"""
+    result = await session.call_tool("session_manager", {"action": "stats"})
+    return result_json(result).get("total_analyses", 0)
+
+
+async def run_stdio(args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Any]:
+    connections = await asyncio.gather(*(run_connection(index, args, mix) for index in range(args.connections)))
+    return summarize(list(connections))
+
+
+async def run_http(args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Any]:
+    port = free_port()
+    env = server_env(args)
+    env["TASKIFY_TOOL_WORKERS"] = str(args.tool_workers)
+    with open(os.devnull, "w") as errlog:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.server", "--transport", "streamable-http", "--port", str(port),
+             "--shards", str(args.shards)],
+            cwd=ROOT, env=env, stdout=errlog, stderr=errlog
+        )
+        try:
+            wait_for_port(port, process)
+            url = f"http://127.0.0.1:{port}/mcp"
+
+            async def connection(index: int) -> Dict[str, Any]:
+                async with streamablehttp_client(url) as (read_stream, write_stream, _):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        # 服务器指标是进程级的，只由第一条连接读取一次
+                        result = await drive(session, index, args, mix, fetch_metrics=False)
+                        if index == 0:
+                            result["history_size"] = await history_size(session)
+                        return result
+
+            connections = list(await asyncio.gather(*(connection(index) for index in range(args.connections))))
+            async with streamablehttp_client(url) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    result = await session.call_tool("session_manager", {"action": "metrics"})
+                    connections[0]["server_metrics"] = result_json(result)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    server_metrics = connections[0]["server_metrics"]
+    if "shards" in server_metrics:
+        # 分片部署：指标按分片分别返回，各分片作为一条无客户端样本的连接参与加权合并
+        connections[0]["server_metrics"] = {"tools": {}}
+        connections.extend({"latencies": {}, "errors": {}, "elapsed": 0.0, "server_metrics": shard}
+                           for shard in server_metrics["shards"])
+    summary = summarize(connections)
+    summary["shared_history_size"] = connections[0]["history_size"]
+    if "router" in server_metrics:
+        summary["router"] = server_metrics["router"]
+    summary["http_admission"] = server_metrics.get("http_admission", {})
+    return summary
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    result: Dict[str, Any] = {
+        "benchmark": "http_load",
+        "connections": args.connections,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "tool_workers": args.tool_workers,
+        "shards": args.shards,
+        "mix": mix,
+        "seed": args.seed
+    }
+    # 两种部署依次运行，避免争抢同一批 CPU
+    stdio = None if args.skip_stdio else await run_stdio(args, mix)
+    http = await run_http(args, mix)
+    if stdio is not None:
+        result["stdio"] = stdio
+    result["http"] = http
+
+    comparison = {
+        "http_server_processes": 1 if args.shards <= 1 else args.shards + 1,
+        "http_calls_per_second": http["calls_per_second"],
+        "http_history_visible_per_agent": http["shared_history_size"]
+    }
+    if stdio is not None:
+        comparison.update({
+            "stdio_server_processes": args.connections,
+            "stdio_calls_per_second": stdio["calls_per_second"],
+            "http_vs_stdio_throughput": (round(http["calls_per_second"] / stdio["calls_per_second"], 2)
+                                         if stdio["calls_per_second"] else 0.0)
+        })
+    result["comparison"] = comparison
+    return result
+
+
+def main():
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=8, help="Agent 连接数（stdio 模式下即服务器进程数）")
+    parser.add_argument("--concurrency", type=int, default=4, help="每条连接上的并发客户端数")
+    parser.add_argument("--duration", type=float, default=10.0, help="每种部署的压测时长（秒）")
+    parser.add_argument("--mix", default="analyze=1,guided=4,validate=3,coach=0.5,manager=0.5",
+                        help="工具调用权重，简称：" + ", ".join(TOOL_ALIASES))
+    parser.add_argument("--tool-workers", type=int, default=4, help="HTTP 服务器的工具线程数（TASKIFY_TOOL_WORKERS）")
+    parser.add_argument("--shards", type=int, default=1, help="HTTP 部署的分片工作进程数（大于 1 时经路由转发）")
+    parser.add_argument("--skip-stdio", action="store_true", help="只运行 HTTP 部署")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-level", default="", help="服务器日志级别（FASTMCP_LOG_LEVEL），默认与正式部署相同")
+    parser.add_argument("--output", help="保存 JSON 结果的路径")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""会话内存基准 - 测量缓存 N 个会话时每个会话占用的字节数
+
+用法：python benchmarks/session_memory.py [--sessions 10000] [--seed 7]
+
+通过 analyze_programming_context 创建会话，随后清空会话缓存，
+以 tracemalloc 统计释放的内存作为会话独占的字节数（模板等共享对象不计入）。
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src import server  # noqa: E402
+
+REQUEST_TEMPLATES = [
+    "Implement a new {noun} feature for the {area} with unit test coverage",
+    "修复{area}模块的{noun}崩溃问题，错误发生在生产环境",
+    "Optimize the {noun} query performance in the {area}, latency is high",
+    "重构{area}服务中的{noun}，简化代码结构",
+    "update {noun} dependency versions and migrate deprecated {area} calls",
+    "write documentation for the {noun} {area} and explain the guide",
+    "build a distributed {noun} architecture with multiple {area} integration",
+]
+NOUNS = ["search", "login", "payment", "cache", "upload", "report", "用户", "订单", "消息", "权限"]
+AREAS = ["api", "database", "frontend", "scheduler", "gateway", "支付", "后台", "网关"]
+CONTEXTS = ["", "React app with docker and kubernetes", "大型企业分布式系统", "simple flask service"]
+
+
+def build_requests(count: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice(REQUEST_TEMPLATES).format(noun=rng.choice(NOUNS), area=rng.choice(AREAS)) + f" #{i}",
+            rng.choice(CONTEXTS)
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    requests = build_requests(args.sessions, args.seed)
+    # 直接调用同步实现（线程池装饰器保存在 __wrapped__ 上）
+    analyze: Callable[..., str] = getattr(server.analyze_programming_context, "__wrapped__")
+    # 历史记录只影响相似任务检索的耗时，与会话占用无关；限制长度以缩短基准运行时间
+    server._analysis_history.max_size = 1000
+    # 预热：编译关键词表、填充模板缓存
+    analyze(*requests[0])
+    server._session_cache.clear()
+
+    tracemalloc.start()
+    for user_request, project_context in requests:
+        analyze(user_request, project_context)
+    gc.collect()
+    loaded, _ = tracemalloc.get_traced_memory()
+    sessions = len(server._session_cache)
+    server._session_cache.clear()
+    gc.collect()
+    released, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    retained = loaded - released
+    print(json.dumps({
+        "sessions": sessions,
+        "retained_bytes": retained,
+        "bytes_per_session": round(retained / sessions, 1)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
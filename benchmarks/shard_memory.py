@@ -0,0 +1,133 @@
+"""分片内存基准 - 对比 fork 与 spawn 两种启动方式下分片工作进程的启动时间与内存占用
+
+用法：
+    python benchmarks/shard_memory.py [--shards 4] [--duration 5] [--concurrency 4]
+                                      [--methods fork,spawn] [--seed 7] [--output result.json]
+
+每种启动方式（TASKIFY_SHARD_START）各启动一次 --shards N 的分片部署：
+- startup_seconds：从启动路由到路由开始监听（全部工作进程已开始监听）的时间
+- 空载与压测 --duration 秒之后，各工作进程的 RSS、PSS（共享页按进程数均摊）与私有内存，
+  读取自 /proc/<pid>/smaps_rollup，仅支持 Linux
+
+fork 方式下工作进程与路由共享已导入的模块、关键词自动机与思考框架模板，PSS 与私有内存应明显低于 spawn。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from http_load import free_port, wait_for_port  # noqa: E402
+from stdio_load import ROOT, drive, parse_mix, server_env  # noqa: E402
+
+MEMORY_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty")
+
+
+def children(pid: int) -> List[int]:
+    """pid 的直接子进程"""
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                # comm 字段可能含空格，父进程号位于右括号之后的第二个字段
+                fields = file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def memory(pid: int) -> Dict[str, float]:
+    """进程的 RSS / PSS / 私有内存（MB）"""
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            name, _, rest = line.partition(":")
+            if name in MEMORY_FIELDS:
+                values[name] = int(rest.split()[0])
+    return {
+        "rss_mb": round(values["Rss"] / 1024, 1),
+        "pss_mb": round(values["Pss"] / 1024, 1),
+        "private_mb": round((values["Private_Clean"] + values["Private_Dirty"]) / 1024, 1)
+    }
+
+
+def summarize(router: int) -> Dict[str, Any]:
+    workers = [memory(pid) for pid in children(router)]
+    return {
+        "router": memory(router),
+        "workers": len(workers),
+        "worker_mean": {
+            name: round(sum(worker[name] for worker in workers) / len(workers), 1) for name in workers[0]
+        } if workers else {},
+        "total_pss_mb": round(memory(router)["pss_mb"] + sum(worker["pss_mb"] for worker in workers), 1)
+    }
+
+
+async def load(url: str, args: argparse.Namespace):
+    async with streamablehttp_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await drive(session, 0, args, parse_mix(args.mix), fetch_metrics=False)
+
+
+def run_method(method: str, args: argparse.Namespace) -> Dict[str, Any]:
+    port = free_port()
+    env = server_env(args)
+    env["TASKIFY_SHARD_START"] = method
+    started = time.perf_counter()
+    with open(os.devnull, "w") as errlog:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.server", "--transport", "streamable-http", "--port", str(port),
+             "--shards", str(args.shards)],
+            cwd=ROOT, env=env, stdout=errlog, stderr=errlog
+        )
+        try:
+            wait_for_port(port, process, timeout=120)
+            startup = time.perf_counter() - started
+            idle = summarize(process.pid)
+            asyncio.run(load(f"http://127.0.0.1:{port}/mcp", args))
+            loaded = summarize(process.pid)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return {"startup_seconds": round(startup, 3), "idle": idle, "after_load": loaded}
+
+
+def main():
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, default=4, help="分片工作进程数")
+    parser.add_argument("--duration", type=float, default=5.0, help="测量压测后内存前的压测时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=4, help="压测的并发客户端数")
+    parser.add_argument("--mix", default="analyze=1,guided=4,validate=3,coach=0.5,manager=0.5",
+                        help="工具调用权重，格式同 stdio_load.py")
+    parser.add_argument("--methods", default="fork,spawn", help="要对比的启动方式")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-level", default="WARNING", help="服务器日志级别（FASTMCP_LOG_LEVEL）")
+    parser.add_argument("--output", help="保存 JSON 结果的路径")
+    args = parser.parse_args()
+
+    result: Dict[str, Any] = {"benchmark": "shard_memory", "shards": args.shards, "duration": args.duration}
+    for method in args.methods.split(","):
+        result[method] = run_method(method, args)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""stdio 压测 - 以子进程启动真实的 MCP 服务器，经 stdio 传输并发调用工具
+
+用法：
+    python benchmarks/stdio_load.py [--connections 1] [--concurrency 16] [--duration 10]
+                                    [--mix analyze=1,guided=4,validate=3,coach=0.5,manager=0.5]
+                                    [--seed 7] [--log-level WARNING] [--output result.json]
+
+每个连接启动一个服务器进程（与 Agent 使用的 taskify-mcp-server 相同的 main() 入口），
+连接上运行 --concurrency 个并发的虚拟客户端，按 --mix 的权重随机选择工具调用，
+持续 --duration 秒。客户端记录端到端延迟（含 JSON-RPC 编解码与 stdio 传输）；
+结束时通过 session_manager('metrics') 读取服务器内的排队、执行与序列化耗时，
+两者之差即传输与协议开销。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.types import CallToolResult, TextContent
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from workload import STAGES, WorkloadGenerator  # noqa: E402
+
+# --mix 中的简称 → 工具名
+TOOL_ALIASES = {
+    "analyze": "analyze_programming_context",
+    "guided": "guided_thinking_process",
+    "validate": "validate_instruction_quality",
+    "coach": "smart_programming_coach",
+    "manager": "session_manager",
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        alias, _, weight = item.partition("=")
+        alias = alias.strip()
+        if alias not in TOOL_ALIASES:
+            raise SystemExit(f"未知的工具简称: {alias}（可用：{', '.join(TOOL_ALIASES)}）")
+        mix[TOOL_ALIASES[alias]] = float(weight or 1)
+    return mix
+
+
+def result_json(result: CallToolResult) -> Any:
+    """解析工具调用返回的 JSON 文本（本服务器的工具只返回一段文本内容）"""
+    content = result.content[0]
+    if not isinstance(content, TextContent):
+        raise SystemExit(f"工具返回了非文本内容: {content.type}")
+    return json.loads(content.text)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class VirtualClient:
+    """一个虚拟客户端：维护自己的会话列表，按权重发起工具调用"""
+
+    def __init__(self, session: ClientSession, mix: Dict[str, float], seed: int,
+                 latencies: Dict[str, List[float]], errors: Dict[str, int]):
+        self.session = session
+        self.tools = list(mix)
+        self.weights = [mix[tool] for tool in self.tools]
+        self.rng = random.Random(seed)
+        self.workload = WorkloadGenerator(seed)
+        self.latencies = latencies
+        self.errors = errors
+        self.session_ids: List[Tuple[str, int]] = []  # (session_id, 下一个思考阶段)
+
+    def _arguments(self, tool: str) -> Tuple[str, Dict[str, Any]]:
+        rng, workload = self.rng, self.workload
+        if tool != "analyze_programming_context" and tool != "smart_programming_coach" and not self.session_ids:
+            tool = "analyze_programming_context"  # 其余工具需要已有会话
+        if tool == "analyze_programming_context":
+            plan = workload.lifecycle()
+            return tool, {"user_request": plan.user_request, "project_context": plan.project_context}
+        if tool == "smart_programming_coach":
+            plan = workload.lifecycle()
+            return tool, {"user_request": plan.user_request, "project_context": plan.project_context,
+                          "mode": rng.choice(["full_guidance", "quick_start", "expert_mode"])}
+        index = rng.randrange(len(self.session_ids))
+        session_id, stage = self.session_ids[index]
+        if tool == "guided_thinking_process":
+            self.session_ids[index] = (session_id, (stage + 1) % len(STAGES))
+            return tool, {"session_id": session_id, "current_step": STAGES[stage]}
+        if tool == "validate_instruction_quality":
+            return tool, {"instruction": workload.instruction(), "session_id": session_id}
+        return tool, {"action": rng.choice(["detail", "detail", "list", "stats"]), "session_id": session_id}
+
+    async def run(self, deadline: float):
+        while time.perf_counter() < deadline:
+            tool, arguments = self._arguments(self.rng.choices(self.tools, self.weights)[0])
+            start = time.perf_counter()
+            result = await self.session.call_tool(tool, arguments)
+            self.latencies.setdefault(tool, []).append(time.perf_counter() - start)
+            if result.isError:
+                self.errors[tool] = self.errors.get(tool, 0) + 1
+                continue
+            if tool == "analyze_programming_context":
+                session_id = result_json(result)["session_id"]
+                self.session_ids.append((session_id, 0))
+                del self.session_ids[:-32]  # 只在最近的会话上继续操作
+
+
+def server_env(args: argparse.Namespace) -> Dict[str, str]:
+    """服务器进程的环境变量：仅内存存储，开启指标"""
+    env = dict(os.environ)
+    env.update({"TASKIFY_STORAGE": "memory", "TASKIFY_METRICS": "1"})
+    if args.log_level:
+        env["FASTMCP_LOG_LEVEL"] = args.log_level
+    return env
+
+
+async def drive(session: ClientSession, index: int, args: argparse.Namespace, mix: Dict[str, float],
+                fetch_metrics: bool = True) -> Dict[str, Any]:
+    """在一个已建立的连接上运行 --concurrency 个虚拟客户端，结束后可选读取服务器指标"""
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    await session.initialize()
+    clients = [
+        VirtualClient(session, mix, args.seed * 1000 + index * 100 + number, latencies, errors)
+        for number in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(client.run(deadline) for client in clients))
+    elapsed = time.perf_counter() - started
+    metrics: Dict[str, Any] = {"tools": {}}
+    if fetch_metrics:
+        result = await session.call_tool("session_manager", {"action": "metrics"})
+        metrics = result_json(result)
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed, "server_metrics": metrics}
+
+
+async def run_connection(index: int, args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Any]:
+    """启动一个服务器进程并在其 stdio 连接上运行并发客户端"""
+    params = StdioServerParameters(command=sys.executable, args=["-m", "src.server"], cwd=ROOT, env=server_env(args))
+    # 服务器日志照常输出（计入开销），但不打印到终端
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                return await drive(session, index, args, mix)
+
+
+def summarize(connections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并各连接的客户端延迟，并与服务器端耗时对比"""
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for connection in connections:
+        for tool, values in connection["latencies"].items():
+            latencies.setdefault(tool, []).extend(values)
+        for tool, count in connection["errors"].items():
+            errors[tool] = errors.get(tool, 0) + count
+    elapsed = max(connection["elapsed"] for connection in connections)
+
+    tools = {}
+    for tool, values in sorted(latencies.items()):
+        ordered = sorted(values)
+        end_to_end_mean = sum(ordered) / len(ordered) * 1000
+        # 服务器端：各连接的执行、排队、序列化均值按调用次数加权合并
+        server = {"execution": [0.0, 0], "queue_wait": [0.0, 0], "serialization": [0.0, 0]}
+        for connection in connections:
+            tool_metrics = connection["server_metrics"]["tools"].get(tool)
+            if not tool_metrics:
+                continue
+            parts = {"execution": tool_metrics.get("latency_ms", {})}
+            parts.update({name: tool_metrics.get("stages", {}).get(name, {}) for name in ("queue_wait", "serialization")})
+            for name, summary in parts.items():
+                if summary.get("count"):
+                    server[name][0] += summary["mean"] * summary["count"]
+                    server[name][1] += summary["count"]
+        server_mean = {name: round(total / count, 3) if count else 0.0 for name, (total, count) in server.items()}
+        in_server = server_mean["execution"] + server_mean["queue_wait"]
+        tools[tool] = {
+            "calls": len(ordered),
+            "errors": errors.get(tool, 0),
+            "end_to_end_ms": {
+                "mean": round(end_to_end_mean, 3),
+                "p50": round(percentile(ordered, 0.5) * 1000, 3),
+                "p95": round(percentile(ordered, 0.95) * 1000, 3),
+                "p99": round(percentile(ordered, 0.99) * 1000, 3)
+            },
+            "server_mean_ms": {
+                "tool_logic": round(server_mean["execution"] - server_mean["serialization"], 3),
+                "serialization": server_mean["serialization"],
+                "queue_wait": server_mean["queue_wait"]
+            },
+            # 端到端均值减去服务器内耗时：JSON-RPC 编解码、stdio 传输与事件循环调度
+            "transport_overhead_ms": round(end_to_end_mean - in_server, 3)
+        }
+
+    total_calls = sum(len(values) for values in latencies.values())
+    return {
+        "total_calls": total_calls,
+        "elapsed_seconds": round(elapsed, 3),
+        "calls_per_second": round(total_calls / elapsed, 1) if elapsed else 0.0,
+        "tools": tools
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    connections = await asyncio.gather(*(run_connection(index, args, mix) for index in range(args.connections)))
+    return {
+        "benchmark": "stdio_load",
+        "connections": args.connections,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": mix,
+        "seed": args.seed,
+        **summarize(list(connections))
+    }
+
+
+def main():
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=1, help="服务器进程（stdio 连接）数")
+    parser.add_argument("--concurrency", type=int, default=16, help="每个连接上的并发客户端数")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--mix", default="analyze=1,guided=4,validate=3,coach=0.5,manager=0.5",
+                        help="工具调用权重，简称：" + ", ".join(TOOL_ALIASES))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-level", default="", help="服务器日志级别（FASTMCP_LOG_LEVEL），默认与正式部署相同")
+    parser.add_argument("--output", help="保存 JSON 结果的路径")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
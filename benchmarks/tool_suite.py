@@ -0,0 +1,196 @@
+"""工具基准套件 - 在进程内驱动全部五个工具，报告吞吐量、延迟分位数与峰值 RSS
+
+用法：
+    python benchmarks/tool_suite.py [--scales 100,1000,10000] [--lifecycles 300] [--seed 7]
+                                    [--output benchmarks/baselines/tool_suite.json]
+                                    [--compare benchmarks/baselines/tool_suite.json] [--tolerance 0.2]
+
+每个规模在独立的子进程中运行（峰值 RSS 互不影响）：先用 N 次分析预热历史记录与会话缓存，
+再执行 --lifecycles 个完整的会话生命周期（分析 → 四个思考阶段 → 若干次指令评估，
+部分生命周期附带 smart_programming_coach 与 session_manager 调用），逐次计时。
+
+--output 保存 JSON 基线；--compare 与已有基线逐项对比，延迟或吞吐量退化超过容差时以状态码 1 退出。
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from workload import STAGES, WorkloadGenerator  # noqa: E402
+
+TOOLS = ("analyze_programming_context", "guided_thinking_process", "validate_instruction_quality",
+         "smart_programming_coach", "session_manager")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4)
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_scale(scale: int, lifecycles: int, seed: int) -> Dict[str, Any]:
+    """在当前进程中运行一个规模（由子进程调用）"""
+    os.environ["TASKIFY_STORAGE"] = "memory"
+    from src import server
+
+    tools: Dict[str, Callable[..., str]] = {name: getattr(server, name).__wrapped__ for name in TOOLS}
+    generator = WorkloadGenerator(seed)
+
+    # 预热：填充历史记录与会话缓存
+    analyze = tools["analyze_programming_context"]
+    for _ in range(scale):
+        plan = generator.lifecycle()
+        analyze(plan.user_request, plan.project_context)
+
+    samples: Dict[str, List[float]] = {name: [] for name in TOOLS}
+
+    def timed(name: str, *args: Any) -> str:
+        start = time.perf_counter()
+        result = tools[name](*args)
+        samples[name].append(time.perf_counter() - start)
+        return result
+
+    plans = [generator.lifecycle() for _ in range(lifecycles)]
+    started = time.perf_counter()
+    for plan in plans:
+        session_id = json.loads(timed("analyze_programming_context", plan.user_request, plan.project_context))["session_id"]
+        for stage in STAGES:
+            timed("guided_thinking_process", session_id, stage)
+        for instruction in plan.instructions:
+            timed("validate_instruction_quality", instruction, session_id)
+        if plan.coach_mode:
+            timed("smart_programming_coach", plan.user_request, plan.project_context, plan.coach_mode)
+        for action in plan.manager_actions:
+            timed("session_manager", action, session_id)
+    elapsed = time.perf_counter() - started
+
+    total_calls = sum(len(values) for values in samples.values())
+    return {
+        "scale": scale,
+        "history_size": len(server._analysis_history),
+        "active_sessions": len(server._session_cache),
+        "lifecycles": lifecycles,
+        "total_calls": total_calls,
+        "elapsed_seconds": round(elapsed, 3),
+        "calls_per_second": round(total_calls / elapsed, 1),
+        "lifecycles_per_second": round(lifecycles / elapsed, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "tools": {name: latency_summary(values) for name, values in samples.items()}
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """打印与基线的对比，返回是否存在超过容差的退化"""
+    regressed = False
+    baseline_runs = {run["scale"]: run for run in baseline["runs"]}
+    print(f"\n对比基线 {baseline.get('revision', '?')} → {current['revision']}（容差 {tolerance:.0%}）")
+    for run in current["runs"]:
+        old = baseline_runs.get(run["scale"])
+        if old is None:
+            print(f"  scale={run['scale']}: 基线中没有该规模，跳过")
+            continue
+        rows = [("calls_per_second", old["calls_per_second"], run["calls_per_second"], True)]
+        for name, summary in run["tools"].items():
+            previous = old["tools"].get(name)
+            if previous and previous["calls"] and summary["calls"]:
+                rows.append((f"{name}.p50_ms", previous["p50_ms"], summary["p50_ms"], False))
+                rows.append((f"{name}.p95_ms", previous["p95_ms"], summary["p95_ms"], False))
+        for label, before, after, higher_is_better in rows:
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = "  退化" if worse > tolerance else ""
+            regressed |= worse > tolerance
+            print(f"  scale={run['scale']:<7} {label:<40} {before:>10} → {after:<10} {change:+.1%}{flag}")
+    return regressed
+
+
+def main():
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="100,1000,10000", help="预热的分析次数（历史记录数与会话数），逗号分隔")
+    parser.add_argument("--lifecycles", type=int, default=300, help="每个规模计时的会话生命周期数")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="保存 JSON 结果的路径")
+    parser.add_argument("--compare", help="对比的基线 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对退化")
+    parser.add_argument("--run-scale", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale is not None:
+        print(json.dumps(run_scale(args.run_scale, args.lifecycles, args.seed)))
+        return
+
+    runs = []
+    for scale in (int(value) for value in args.scales.split(",")):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-scale", str(scale),
+             "--lifecycles", str(args.lifecycles), "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        runs.append(run)
+        print(f"scale={scale:<7} history={run['history_size']:<7} sessions={run['active_sessions']:<7} "
+              f"{run['calls_per_second']:>8} calls/s  peak_rss={run['peak_rss_mb']} MB", file=sys.stderr)
+
+    result = {
+        "benchmark": "tool_suite",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "runs": runs
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""合成工作负载 - 生成中英文混合的请求、项目上下文、指令与会话生命周期
+
+同一种子生成完全相同的序列，基准结果可在不同提交之间对比。
+长度分布取自对数正态分布：多数请求是一两句话，少数带有长篇背景描述。
+"""
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import List
+
+STAGES = ("understanding", "planning", "implementation", "validation")
+COACH_MODES = ("full_guidance", "quick_start", "expert_mode")
+
+EN_OPENINGS = [
+    "Implement a new {noun} feature for the {area}",
+    "Fix the {noun} crash in the {area} that happens in production",
+    "Optimize the {noun} query performance in the {area}, latency is too high",
+    "Refactor the {noun} module in the {area} to simplify the code structure",
+    "Upgrade {noun} dependencies and migrate deprecated {area} calls",
+    "Write documentation for the {noun} {area} and explain the setup guide",
+    "Add unit and integration test coverage for the {noun} {area}",
+    "Build a distributed {noun} architecture with multiple {area} integrations",
+]
+ZH_OPENINGS = [
+    "实现{area}的{noun}新功能",
+    "修复{area}模块的{noun}崩溃问题，错误发生在生产环境",
+    "优化{area}中{noun}查询的性能，延迟太高",
+    "重构{area}服务中的{noun}，简化代码结构",
+    "升级{noun}依赖并迁移{area}中已废弃的调用",
+    "为{noun}{area}编写文档和使用指南",
+    "为{area}的{noun}补充单元测试和集成测试",
+    "设计分布式{noun}架构，集成多个{area}",
+]
+EN_DETAILS = [
+    "the change must stay backward compatible", "users report errors after the last release",
+    "we need the p99 below 200ms", "the current implementation is hard to maintain",
+    "it should handle concurrent requests safely", "keep the public API stable",
+    "there is a memory leak under load", "add logging and monitoring for the new path",
+    "the feature needs to support multiple tenants", "make sure the migration is reversible",
+]
+ZH_DETAILS = [
+    "需要保持向后兼容", "用户反馈上次发布后出现错误", "要求 p99 延迟低于 200ms", "现有实现难以维护",
+    "需要安全处理并发请求", "保持公开接口稳定", "高负载下存在内存泄漏", "为新路径添加日志和监控",
+    "需要支持多租户", "确保迁移可以回滚",
+]
+NOUNS = ["search", "login", "payment", "cache", "upload", "report", "notification", "scheduler",
+         "用户", "订单", "消息", "权限", "库存", "账单"]
+AREAS = ["api", "database", "frontend", "gateway", "worker", "admin panel",
+         "支付", "后台", "网关", "数据库", "前端"]
+CONTEXT_PARTS = [
+    "React frontend with a Django REST backend", "Spring Boot microservices on kubernetes",
+    "Flask service deployed with docker", "Node.js express gateway", "大型企业分布式系统",
+    "微服务架构，使用 kafka 和 redis", "legacy monolith with a PostgreSQL database",
+    "Vue 单页应用，后端为 Go 服务", "enterprise system with strict compliance requirements",
+]
+INSTRUCTION_OPENINGS = [
+    "Implement {noun}() in {area}.py", "Fix the {noun} bug in {area}.js", "Optimize the {noun} query",
+    "Refactor the {noun} class", "实现{noun}函数", "修复{area}中的{noun}错误", "优化{noun}接口性能",
+]
+INSTRUCTION_DETAILS = [
+    "first reproduce the issue, then find the root cause", "add unit tests for edge cases",
+    "handle error and exception paths", "return the parameter validation result",
+    "must keep backward compatible behaviour", "the response time should drop to 50ms",
+    "use docker to run the integration test", "then update the documentation",
+    "maybe clean up the old code somehow", "首先重现问题，然后定位根因", "添加单元测试",
+    "处理错误和异常", "必须兼容旧版本", "输出结果需要符合期望", "步骤：1. 设计 2. 实现 3. 测试",
+]
+
+
+@dataclass
+class Lifecycle:
+    """一个会话的完整生命周期：分析 → 四个思考阶段 → 若干次指令评估，可选教练与会话管理调用"""
+    user_request: str
+    project_context: str
+    instructions: List[str]
+    coach_mode: str = ""
+    manager_actions: List[str] = field(default_factory=list)
+
+
+class WorkloadGenerator:
+    """按种子生成可复现的合成负载"""
+
+    def __init__(self, seed: int = 7):
+        self.rng = random.Random(seed)
+        self._serial = 0
+        # 项目上下文来自有限的项目集合，多个会话共享同一项目
+        self._contexts = [self.context() for _ in range(20)]
+
+    def _length(self, median: float, sigma: float, low: int, high: int) -> int:
+        """对数正态分布的长度，截断到 [low, high]"""
+        return max(low, min(high, int(round(self.rng.lognormvariate(math.log(median), sigma)))))
+
+    def request(self) -> str:
+        rng = self.rng
+        chinese = rng.random() < 0.4
+        openings, details = (ZH_OPENINGS, ZH_DETAILS) if chinese else (EN_OPENINGS, EN_DETAILS)
+        parts = [rng.choice(openings).format(noun=rng.choice(NOUNS), area=rng.choice(AREAS))]
+        parts.extend(rng.choice(details) for _ in range(self._length(1.5, 0.8, 0, 12)))
+        self._serial += 1
+        # 序号保证请求互不相同，相似度检索需要真实地比较历史
+        return ("，" if chinese else ", ").join(parts) + f" #{self._serial}"
+
+    def context(self) -> str:
+        rng = self.rng
+        if rng.random() < 0.3:
+            return ""
+        # 少量长上下文模拟粘贴进来的项目说明
+        count = self._length(2, 1.2, 1, 60)
+        return "; ".join(rng.choice(CONTEXT_PARTS) for _ in range(count))
+
+    def instruction(self) -> str:
+        rng = self.rng
+        parts = [rng.choice(INSTRUCTION_OPENINGS).format(noun=rng.choice(NOUNS), area=rng.choice(AREAS))]
+        parts.extend(rng.choice(INSTRUCTION_DETAILS) for _ in range(self._length(3, 0.7, 0, 20)))
+        return ", ".join(parts)
+
+    def lifecycle(self) -> Lifecycle:
+        rng = self.rng
+        return Lifecycle(
+            user_request=self.request(),
+            project_context=rng.choice(self._contexts),
+            instructions=[self.instruction() for _ in range(self._length(2, 0.6, 1, 8))],
+            coach_mode=rng.choice(COACH_MODES) if rng.random() < 0.2 else "",
+            manager_actions=[rng.choice(["detail", "detail", "list", "stats"])] if rng.random() < 0.3 else []
+        )
@@ -0,0 +1,82 @@
+"""分析结果缓存 - 按规范化输入缓存任务分析中的确定性部分"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .context_registry import context_digest
+
+
+class AnalysisCache:
+    """有界 LRU 缓存，记录命中与未命中次数
+
+    任务类型、复杂度、需求与约束等只由输入文本决定，且各分析函数只读取小写后的文本，
+    因此键取 (小写请求, 小写上下文的摘要, complexity_hint) 的摘要：大小写不同的重复请求同样命中，
+    长上下文也只以 16 字节摘要参与键的计算。相似度等依赖历史的部分不缓存。
+
+    工具调用在线程池中执行，缓存自带锁，查询无需持有全局状态锁。
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_request: str, project_context: str, complexity_hint: str, context_hash: bytes = b"") -> bytes:
+        """规范化输入的摘要
+
+        context_hash 为上下文登记表中已算好的全文摘要（见 context_digest），长上下文无需再次小写和哈希；
+        未提供时就地计算。
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for data in (user_request.lower().encode("utf-8", "surrogatepass"),
+                     context_hash or context_digest(project_context),
+                     complexity_hint.encode("utf-8", "surrogatepass")):
+            # 长度前缀避免不同切分拼接出相同的字节串
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """读取缓存结果并记录命中情况"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: bytes, value: Any):
+        """写入结果，超出容量时淘汰最久未使用的条目"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计，供 session_manager('stats') 展示"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 2) if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,76 @@
+"""上下文记忆 - 项目上下文的累积经验"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator
+
+from .context_registry import CONTEXT_REGISTRY_SIZE
+from .storage import StorageBackend
+
+
+class ContextMemory(MutableMapping):
+    """上下文记忆：context_key → {'context', 'timestamp', 'task_count'}
+
+    读取时先查进程内缓存，未命中再从持久化后端按需加载；写入同时交给后端。
+    内部锁保护缓存，多个工具线程可并发读写；计数递增须经 record_task 完成。
+
+    进程内缓存与上下文登记表一样按最近使用保留至多 max_size 条：持久化后端下被淘汰的条目
+    再次读取时从后端重新加载，内存模式下被淘汰的条目随之丢弃（与会话的 LRU 淘汰一致）。
+    len() 与遍历只覆盖进程内缓存，二者保持一致；全部条目数（含只在后端中的）由 total() 给出。
+    """
+
+    def __init__(self, backend: StorageBackend, max_size: int = CONTEXT_REGISTRY_SIZE):
+        self._backend = backend
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _cache(self, context_key: str, memory: Dict[str, Any]):
+        # 调用方已持有 self._lock
+        self._entries[context_key] = memory
+        self._entries.move_to_end(context_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __getitem__(self, context_key: str) -> Dict[str, Any]:
+        with self._lock:
+            memory = self._entries.get(context_key)
+            if memory is not None:
+                self._entries.move_to_end(context_key)
+                return memory
+            memory = self._backend.load_context(context_key)
+            if memory is None:
+                raise KeyError(context_key)
+            self._cache(context_key, memory)
+            return memory
+
+    def __setitem__(self, context_key: str, memory: Dict[str, Any]):
+        with self._lock:
+            self._cache(context_key, memory)
+            self._backend.save_context(context_key, memory)
+
+    def __delitem__(self, context_key: str):
+        with self._lock:
+            del self._entries[context_key]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def total(self) -> int:
+        """全部上下文记忆条目数：持久化后端中的条目数（内存模式下即缓存条目数）"""
+        with self._lock:
+            return max(len(self._entries), self._backend.count_contexts())
+
+    def record_task(self, context_key: str, context: str) -> int:
+        """该上下文新增一次任务（读取、递增、写回为原子操作），返回新的任务数"""
+        with self._lock:
+            task_count = self.get(context_key, {}).get('task_count', 0) + 1
+            self[context_key] = {'context': context, 'timestamp': time.time(), 'task_count': task_count}
+            return task_count
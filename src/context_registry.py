@@ -0,0 +1,77 @@
+"""项目上下文登记 - 每个不同的项目上下文只计算一次指纹"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+# 登记的上下文数量上限（按最近使用淘汰，淘汰后再次出现时重新计算指纹）
+CONTEXT_REGISTRY_SIZE = 1024
+
+
+def context_fingerprint(project_context: str) -> str:
+    """上下文ID：与上下文记忆持久化使用的键格式一致（MD5 前 8 位）"""
+    return hashlib.md5(project_context.encode()).hexdigest()[:8]
+
+
+def context_digest(project_context: str) -> bytes:
+    """规范化（小写）上下文全文的 16 字节摘要，用作分析结果缓存的键
+
+    上下文ID只有 32 位，不同上下文可能碰撞，不能作为缓存键。
+    """
+    return hashlib.blake2b(project_context.lower().encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+EMPTY_CONTEXT_DIGEST = context_digest("")
+
+
+class ContextRegistry:
+    """项目上下文 → 上下文ID 的 LRU 登记表
+
+    同一份（可能数 KB 的）项目上下文在多个会话、多次工具调用中反复出现，
+    登记后只需一次字典查找即可得到上下文ID与全文摘要，并返回共享的上下文字符串，
+    使引用相同上下文的会话只保存一份文本。
+    """
+
+    def __init__(self, max_size: int = CONTEXT_REGISTRY_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, project_context: str) -> Tuple[str, str, bytes]:
+        """返回 (上下文ID, 共享的上下文字符串, 全文摘要)；空上下文的ID为空字符串"""
+        if not project_context:
+            return "", project_context, EMPTY_CONTEXT_DIGEST
+        with self._lock:
+            entry = self._entries.get(project_context)
+            if entry is not None:
+                self._entries.move_to_end(project_context)
+                return entry
+        entry = (context_fingerprint(project_context), project_context, context_digest(project_context))
+        with self._lock:
+            entry = self._entries.setdefault(project_context, entry)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def register(self, project_context: str) -> Tuple[str, str]:
+        """返回 (上下文ID, 共享的上下文字符串)"""
+        context_id, shared, _ = self.lookup(project_context)
+        return context_id, shared
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 进程内共享的登记表：新建与从存储水合的会话都经由它取得上下文ID
+CONTEXT_REGISTRY = ContextRegistry()
+
+
+def register_context(project_context: str) -> Tuple[str, str]:
+    """在共享登记表中登记项目上下文"""
+    return CONTEXT_REGISTRY.register(project_context)
+
+
+def lookup_context(project_context: str) -> Tuple[str, str, bytes]:
+    """在共享登记表中登记项目上下文，并返回其全文摘要"""
+    return CONTEXT_REGISTRY.lookup(project_context)
@@ -0,0 +1,58 @@
+"""工具执行 - 在线程池中运行工具逻辑，避免阻塞事件循环"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from .metrics import Metrics
+
+
+class ToolExecutor:
+    """把同步的工具实现包装为异步工具
+
+    FastMCP 在同一个事件循环上并发处理所有客户端的请求。同步工具会独占事件循环，
+    一条很长的指令评估就会阻塞其他客户端；包装后工具逻辑在线程池中执行，
+    事件循环只负责收发消息，耗时的分析与评分可以与其他请求交错进行。
+
+    被包装的工具必须自行保护共享状态（见 server._session_locks 与各存储的内部锁）；
+    原始的同步实现可通过 ``tool.__wrapped__`` 直接调用（不计入指标）。
+
+    提供 metrics 时记录每次调用的排队时间、执行耗时与响应字节数。
+    """
+
+    def __init__(self, max_workers: int, metrics: Optional[Metrics] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="taskify-tool")
+        self._metrics = metrics
+
+    def offload(self, func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+        """装饰器：返回在线程池中执行 func 的协程函数（保留签名供工具参数推断）"""
+        metrics = self._metrics
+        if metrics is not None and metrics.enabled:
+            tool = func.__name__
+
+            def run(submitted: float, *args: Any, **kwargs: Any) -> Any:
+                metrics.observe_stage(tool, "queue_wait", time.perf_counter() - submitted)
+                with metrics.tool_call(tool) as call:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, str):
+                        call.payload_bytes = len(result.encode("utf-8", "surrogatepass"))
+                    return result
+
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(run, time.perf_counter(), *args, **kwargs))
+            return wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        return wrapper
+
+    def shutdown(self):
+        """等待执行中的工具调用完成后关闭线程池"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,368 @@
+"""思考框架 - 按任务类型与复杂度缓存的框架模板与会话级自适应提示"""
+
+from dataclasses import replace
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .models import (
+    ComplexityLevel,
+    FrameworkHints,
+    TaskAnalysis,
+    TaskType,
+    ThinkingFramework,
+    interned,
+)
+
+
+def generate_thinking_framework(task_analysis: TaskAnalysis, similar_tasks: Optional[List[Dict]] = None) -> Dict[str, ThinkingFramework]:
+    """根据任务分析生成定制化思考框架 - 智能增强版"""
+    return resolve_frameworks(
+        task_analysis.task_type,
+        task_analysis.complexity_level,
+        generate_adaptive_hints(task_analysis, similar_tasks)
+    )
+
+
+def generate_adaptive_hints(task_analysis: TaskAnalysis, similar_tasks: Optional[List[Dict]] = None) -> Optional[FrameworkHints]:
+    """从相似任务中学习，返回需要叠加在模板之上的自适应提示
+
+    会话只保存这部分差异；没有可借鉴的经验时返回 None，会话完全复用模板。
+    """
+    adaptive_hints = []
+    planning_lessons = []
+    if similar_tasks:
+        for similar in similar_tasks:
+            if similar.get('lessons_learned'):
+                adaptive_hints.extend(similar['lessons_learned'])
+                planning_lessons.extend(similar['lessons_learned'][:1])
+    if not adaptive_hints:
+        return None
+
+    template = get_framework_template(task_analysis.task_type, task_analysis.complexity_level)
+    return {
+        "understanding": interned(adaptive_hints[:2]),
+        "planning": interned((list(template["planning"].adaptive_hints or ()) + planning_lessons)[:4])
+    }
+
+
+def resolve_frameworks(task_type: TaskType, complexity: ComplexityLevel,
+                       hints: Optional[FrameworkHints] = None) -> Dict[str, ThinkingFramework]:
+    """由模板与自适应提示差异还原完整的思考框架
+
+    模板对象在会话间共享且不可变，只有被覆盖提示的阶段才会生成新的框架对象。
+    """
+    frameworks = dict(get_framework_template(task_type, complexity))
+    if hints:
+        for stage, stage_hints in hints.items():
+            if stage in frameworks:
+                frameworks[stage] = replace(frameworks[stage], adaptive_hints=stage_hints)
+    return frameworks
+
+
+@lru_cache(maxsize=None)
+def get_framework_template(task_type: TaskType, complexity: ComplexityLevel) -> Dict[str, ThinkingFramework]:
+    """构建（并缓存）某一任务类型与复杂度下的思考框架模板
+
+    各 generate_*/get_*_hints 函数只读取任务类型与复杂度，
+    因此每种组合只需生成一次；模板中的列表转为元组，供所有会话共享。
+    """
+    task_analysis = TaskAnalysis(
+        task_type=task_type,
+        complexity_level=complexity,
+        core_objective="",
+        key_requirements=(),
+        constraints=(),
+        risk_factors=(),
+        success_criteria=(),
+        context_needs=()
+    )
+
+    def framework(phase, questions, considerations, output_format, examples, hints):
+        return ThinkingFramework(
+            phase=phase,
+            guiding_questions=tuple(questions),
+            key_considerations=tuple(considerations),
+            output_format=output_format,
+            examples=tuple(examples),
+            adaptive_hints=tuple(hints)
+        )
+
+    return {
+        # 第一阶段：理解阶段
+        "understanding": framework(
+            "深度理解",
+            generate_understanding_questions(task_analysis),
+            generate_understanding_considerations(task_analysis),
+            "问题本质、用户意图、隐含需求",
+            generate_understanding_examples(task_analysis),
+            []
+        ),
+        # 第二阶段：规划阶段
+        "planning": framework(
+            "策略规划",
+            generate_planning_questions(task_analysis),
+            generate_planning_considerations(task_analysis),
+            "实现路径、技术选型、风险评估",
+            generate_planning_examples(task_analysis),
+            get_planning_hints(task_analysis)
+        ),
+        # 第三阶段：实现阶段
+        "implementation": framework(
+            "精准实现",
+            generate_implementation_questions(task_analysis),
+            generate_implementation_considerations(task_analysis),
+            "具体步骤、代码结构、接口设计",
+            generate_implementation_examples(task_analysis),
+            get_implementation_hints(task_analysis)
+        ),
+        # 第四阶段：验证阶段
+        "validation": framework(
+            "质量验证",
+            generate_validation_questions(task_analysis),
+            generate_validation_considerations(task_analysis),
+            "测试策略、验收标准、性能指标",
+            generate_validation_examples(task_analysis),
+            get_validation_hints(task_analysis)
+        )
+    }
+
+
+def preload_framework_templates():
+    """构建全部任务类型与复杂度组合的模板
+
+    分叉分片工作进程之前调用，模板只在路由进程中构建一次，由各工作进程共享。
+    """
+    for task_type in TaskType:
+        for complexity in ComplexityLevel:
+            get_framework_template(task_type, complexity)
+
+
+def get_planning_hints(task_analysis: TaskAnalysis, similar_tasks: Optional[List[Dict]] = None) -> List[str]:
+    """获取规划阶段的自适应提示"""
+    hints = []
+    
+    # 基于任务类型的特定提示
+    if task_analysis.task_type == TaskType.NEW_FEATURE:
+        hints.append("考虑功能的渐进式发布策略")
+        hints.append("设计时优先考虑用户体验和性能")
+    elif task_analysis.task_type == TaskType.PERFORMANCE:
+        hints.append("建立性能基线，量化优化目标")
+        hints.append("考虑缓存、索引、算法优化等多个层面")
+    elif task_analysis.task_type == TaskType.REFACTOR:
+        hints.append("确保重构的向后兼容性")
+        hints.append("制定详细的测试计划以验证重构效果")
+    
+    # 基于复杂度的提示
+    if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
+        hints.append("将复杂任务分解为独立的子任务")
+        hints.append("考虑并行开发和集成策略")
+    
+    # 从相似任务中学习
+    if similar_tasks:
+        for similar in similar_tasks:
+            if similar.get('lessons_learned'):
+                hints.extend(similar['lessons_learned'][:1])
+    
+    return hints[:4]  # 限制提示数量
+
+
+def get_implementation_hints(task_analysis: TaskAnalysis) -> List[str]:
+    """获取实现阶段的自适应提示"""
+    hints = []
+    
+    if task_analysis.task_type == TaskType.NEW_FEATURE:
+        hints.extend([
+            "采用TDD(测试驱动开发)方法",
+            "实现MVP(最小可行产品)版本，然后迭代"
+        ])
+    elif task_analysis.task_type == TaskType.BUG_FIX:
+        hints.extend([
+            "先重现问题，再定位根因",
+            "修复后添加回归测试防止问题再现"
+        ])
+    elif task_analysis.task_type == TaskType.PERFORMANCE:
+        hints.extend([
+            "使用性能分析工具定位瓶颈",
+            "优化前后进行性能对比测试"
+        ])
+    
+    return hints
+
+
+def get_validation_hints(task_analysis: TaskAnalysis) -> List[str]:
+    """获取验证阶段的自适应提示"""
+    hints = []
+    
+    if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
+        hints.extend([
+            "进行分层测试：单元测试、集成测试、系统测试",
+            "考虑负载测试和压力测试"
+        ])
+    
+    if task_analysis.task_type == TaskType.NEW_FEATURE:
+        hints.extend([
+            "进行用户验收测试(UAT)",
+            "收集用户反馈并准备迭代"
+        ])
+    
+    return hints
+
+
+def generate_understanding_questions(task_analysis: TaskAnalysis) -> List[str]:
+    """生成理解阶段的指导问题"""
+    base_questions = [
+        "用户真正想要解决什么核心问题？",
+        "这个需求背后的业务价值是什么？",
+        "有哪些隐含的约束和期望？"
+    ]
+    
+    type_specific_questions = {
+        TaskType.NEW_FEATURE: [
+            "这个功能如何融入现有系统？",
+            "预期的用户使用场景是什么？",
+            "功能边界在哪里？"
+        ],
+        TaskType.BUG_FIX: [
+            "问题的根本原因是什么？",
+            "影响范围有多大？",
+            "如何避免类似问题再次出现？"
+        ],
+        TaskType.REFACTOR: [
+            "当前设计的痛点是什么？",
+            "重构的最终目标是什么？",
+            "如何确保重构后的向后兼容性？"
+        ],
+        TaskType.PERFORMANCE: [
+            "性能瓶颈在哪里？",
+            "目标性能指标是什么？",
+            "优化的权衡取舍是什么？"
+        ]
+    }
+    
+    return base_questions + type_specific_questions.get(task_analysis.task_type, [])
+
+
+def generate_understanding_considerations(task_analysis: TaskAnalysis) -> List[str]:
+    """生成理解阶段的关键考虑点"""
+    base_considerations = [
+        "区分显性需求和隐性需求",
+        "识别技术约束和业务约束",
+        "评估变更的影响范围"
+    ]
+    
+    complexity_considerations = {
+        ComplexityLevel.SIMPLE: ["确保理解准确，避免过度设计"],
+        ComplexityLevel.MEDIUM: ["平衡功能完整性和实现复杂度"],
+        ComplexityLevel.COMPLEX: ["系统性思考，考虑架构影响", "分阶段实现策略"]
+    }
+    
+    return base_considerations + complexity_considerations[task_analysis.complexity_level]
+
+
+def generate_understanding_examples(task_analysis: TaskAnalysis) -> List[str]:
+    """生成理解阶段的示例"""
+    examples = {
+        TaskType.NEW_FEATURE: ["用户说'添加搜索功能' → 理解为：需要什么类型的搜索？实时搜索还是批量搜索？搜索范围是什么？"],
+        TaskType.BUG_FIX: ["用户说'登录有问题' → 理解为：什么情况下出错？错误现象是什么？影响所有用户还是特定用户？"],
+        TaskType.REFACTOR: ["用户说'代码太乱了' → 理解为：具体哪些部分需要重构？重构的优先级是什么？"],
+        TaskType.PERFORMANCE: ["用户说'太慢了' → 理解为：哪个环节慢？可接受的响应时间是多少？"]
+    }
+    
+    return examples.get(task_analysis.task_type, ["深入理解用户真实需求，而非表面描述"])
+
+
+def generate_planning_questions(task_analysis: TaskAnalysis) -> List[str]:
+    """生成规划阶段的指导问题"""
+    return [
+        "最佳的实现路径是什么？",
+        "需要哪些技术栈和工具？",
+        "如何分解任务以降低风险？",
+        "有哪些可能的技术陷阱？",
+        "如何确保代码质量和可维护性？"
+    ]
+
+
+def generate_planning_considerations(task_analysis: TaskAnalysis) -> List[str]:
+    """生成规划阶段的关键考虑点"""
+    base_considerations = [
+        "选择合适的技术方案",
+        "评估开发成本和时间",
+        "考虑未来扩展性"
+    ]
+    
+    if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
+        base_considerations.extend([
+            "设计系统架构",
+            "定义模块接口",
+            "制定迭代计划"
+        ])
+    
+    return base_considerations
+
+
+def generate_planning_examples(task_analysis: TaskAnalysis) -> List[str]:
+    """生成规划阶段的示例"""
+    return [
+        "技术选型：React vs Vue → 考虑团队技能、项目需求、生态系统",
+        "架构设计：单体 vs 微服务 → 考虑项目规模、团队能力、维护成本"
+    ]
+
+
+def generate_implementation_questions(task_analysis: TaskAnalysis) -> List[str]:
+    """生成实现阶段的指导问题"""
+    return [
+        "如何组织代码结构？",
+        "接口设计是否清晰合理？",
+        "错误处理策略是什么？",
+        "如何确保代码的可测试性？",
+        "是否遵循了项目的编码规范？"
+    ]
+
+
+def generate_implementation_considerations(task_analysis: TaskAnalysis) -> List[str]:
+    """生成实现阶段的关键考虑点"""
+    return [
+        "保持代码简洁和可读性",
+        "遵循设计模式和最佳实践",
+        "考虑异常情况的处理",
+        "确保接口的向后兼容性",
+        "添加必要的日志和监控"
+    ]
+
+
+def generate_implementation_examples(task_analysis: TaskAnalysis) -> List[str]:
+    """生成实现阶段的示例"""
+    return [
+        "函数设计：单一职责、清晰命名、适当抽象",
+        "错误处理：预期异常 vs 意外异常的不同处理策略"
+    ]
+
+
+def generate_validation_questions(task_analysis: TaskAnalysis) -> List[str]:
+    """生成验证阶段的指导问题"""
+    return [
+        "如何验证功能的正确性？",
+        "性能是否满足要求？",
+        "是否考虑了边界情况？",
+        "用户体验是否良好？",
+        "是否有充分的测试覆盖？"
+    ]
+
+
+def generate_validation_considerations(task_analysis: TaskAnalysis) -> List[str]:
+    """生成验证阶段的关键考虑点"""
+    return [
+        "功能测试和集成测试",
+        "性能基准测试",
+        "用户体验验证",
+        "代码质量检查",
+        "文档完整性确认"
+    ]
+
+
+def generate_validation_examples(task_analysis: TaskAnalysis) -> List[str]:
+    """生成验证阶段的示例"""
+    return [
+        "API测试：正常情况、异常情况、边界情况",
+        "性能测试：响应时间、并发处理、内存使用"
+    ]
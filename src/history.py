@@ -0,0 +1,133 @@
+"""分析历史 - 带相似度索引的有界历史记录"""
+
+import threading
+from collections import Counter, deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .similarity import SimilarityIndex
+from .storage import StorageBackend
+
+if TYPE_CHECKING:
+    from .replication import HistoryReplication
+
+
+class AnalysisHistory:
+    """分析历史记录
+
+    追加时同步维护相似度索引并淘汰超出上限的最旧记录；
+    任务类型与复杂度的分布随追加与淘汰增量维护，读取无需遍历历史；
+    持久化后端中的历史在首次使用时才加载，启动时不做全量读取。
+
+    记录保存在环形缓冲（deque）中，追加与淘汰最旧记录均为 O(1)。
+    内部锁保护缓冲、索引与计数，多个工具线程可并发追加与检索；
+    遍历与 summary() 返回加锁时刻的快照，读取方遍历期间不阻塞写入。
+
+    分片部署时传入 replication：本分片的新记录发布给其他分片，
+    读取前合并其他分片发布的记录（只进入内存，不写入本分片的后端）。
+    """
+
+    def __init__(self, max_size: int, index: SimilarityIndex, backend: StorageBackend,
+                 replication: Optional["HistoryReplication"] = None):
+        self.max_size = max_size
+        self.index = index
+        self._backend = backend
+        self._replication = replication
+        self._items: Deque[Dict[str, Any]] = deque()
+        self._task_type_counts: Counter = Counter()
+        self._complexity_counts: Counter = Counter()
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for item in self._backend.load_history(self.max_size):
+                self._append(item)
+            self._loaded = True
+
+    def load(self):
+        """立即加载持久化后端中的历史（可在后台线程中提前调用，首次检索不再等待加载）"""
+        self._ensure_loaded()
+
+    def _sync(self):
+        self._ensure_loaded()
+        if self._replication is not None:
+            replicated = self._replication.poll()
+            if replicated:
+                with self._lock:
+                    for item in replicated:
+                        self._append(item)
+
+    def _append(self, item: Dict[str, Any]):
+        item['entry_id'] = self.index.add(item)
+        self._items.append(item)
+        self._task_type_counts[item.get('task_type', 'unknown')] += 1
+        self._complexity_counts[item.get('complexity', 'unknown')] += 1
+        if len(self._items) > self.max_size:
+            evicted = self._items.popleft()
+            self.index.remove(evicted['entry_id'])
+            self._discount(self._task_type_counts, evicted.get('task_type', 'unknown'))
+            self._discount(self._complexity_counts, evicted.get('complexity', 'unknown'))
+
+    @staticmethod
+    def _discount(counts: Counter, key: str):
+        counts[key] -= 1
+        if not counts[key]:
+            del counts[key]
+
+    def append(self, item: Dict[str, Any]):
+        """追加一条分析记录"""
+        self._sync()
+        with self._lock:
+            self._append(item)
+        self._backend.append_history(item)
+        if self._replication is not None:
+            self._replication.publish(item)
+
+    def query(self, text: str, threshold: float, top_k: int) -> List[Tuple[float, Optional[float], Dict[str, Any]]]:
+        """检索相似的历史任务"""
+        self._sync()
+        with self._lock:
+            return self.index.query(text, threshold, top_k)
+
+    def task_type_count(self, task_type: str) -> int:
+        """某一任务类型的历史记录数"""
+        self._sync()
+        with self._lock:
+            return self._task_type_counts.get(task_type, 0)
+
+    def complexity_count(self, complexity: str) -> int:
+        """某一复杂度的历史记录数"""
+        self._sync()
+        with self._lock:
+            return self._complexity_counts.get(complexity, 0)
+
+    def task_type_distribution(self) -> Dict[str, int]:
+        """任务类型分布（按首次出现的顺序）"""
+        self._sync()
+        with self._lock:
+            return dict(self._task_type_counts)
+
+    def complexity_distribution(self) -> Dict[str, int]:
+        """复杂度分布（按首次出现的顺序）"""
+        self._sync()
+        with self._lock:
+            return dict(self._complexity_counts)
+
+    def summary(self) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+        """同一时刻的记录数、任务类型分布与复杂度分布"""
+        self._sync()
+        with self._lock:
+            return len(self._items), dict(self._task_type_counts), dict(self._complexity_counts)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self._sync()
+        with self._lock:
+            return iter(tuple(self._items))
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._items)
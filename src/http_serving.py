@@ -0,0 +1,173 @@
+"""HTTP 服务模式 - 以 Streamable HTTP / SSE 传输运行服务器，多个 Agent 共享同一进程的学习状态"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, MutableMapping, Optional, Sequence, Tuple
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+_admission: Optional["AdmissionControl"] = None  # HTTP 模式下当前进程使用的准入控制
+
+
+class AdmissionControl:
+    """ASGI 中间件：请求体大小上限与在途请求数上限（背压）
+
+    - 请求体超过 max_body_bytes 时返回 413：Content-Length 超限直接拒绝，
+      分块上传在累计超限时停止读取；请求体读完后再交给内层应用
+    - 同时处理的 POST 请求（JSON-RPC 消息）达到 max_inflight 时，新请求最多排队
+      queue_timeout 秒，仍无空位则返回 503 与 Retry-After，由客户端退避重试，
+      避免无界排队拖慢所有 Agent
+    - GET（SSE 通知流）与 DELETE（关闭会话）不计入名额，长连接不会占满处理能力
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int, max_inflight: int, queue_timeout: float):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.max_inflight = max_inflight
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_inflight)
+        self.inflight = 0
+        self.rejected_too_large = 0
+        self.rejected_busy = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(scope, receive)
+        if body is None:
+            self.rejected_too_large += 1
+            await error_response(send, 413, f"请求体超过 {self.max_body_bytes} 字节上限")
+            return
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_busy += 1
+            logger.warning("在途请求已达上限 %d，拒绝新请求", self.max_inflight)
+            await error_response(send, 503, "服务器繁忙，请稍后重试",
+                                  [(b"retry-after", str(max(1, int(self.queue_timeout))).encode())])
+            return
+
+        self.inflight += 1
+        try:
+            await self.app(scope, _replay(body, receive), send)
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+
+    async def _read_body(self, scope: Scope, receive: Receive):
+        """读取完整请求体，超过上限返回 None"""
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    if int(value) > self.max_body_bytes:
+                        return None
+                except ValueError:
+                    pass
+                break
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "rejected_too_large": self.rejected_too_large,
+            "rejected_busy": self.rejected_busy
+        }
+
+
+def admission_stats() -> Optional[Dict[str, int]]:
+    """HTTP 模式下的准入统计（在途请求数与拒绝次数），stdio 模式返回 None"""
+    return _admission.stats() if _admission is not None else None
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    """把已读取的请求体作为一条消息重放给内层应用，之后的消息（断开通知）照常转发"""
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def replay() -> Message:
+        if pending:
+            return pending.pop()
+        return await receive()
+
+    return replay
+
+
+async def error_response(send: Send, status: int, message: str,
+                          headers: Sequence[Tuple[bytes, bytes]] = ()):
+    """JSON-RPC 错误响应（id 为空，请求未被解析）"""
+    body = json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": message}},
+                      ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    *headers]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def run_http(mcp, transport: str, host: str, port: int, keep_alive: float, max_body_bytes: int,
+             max_inflight: int, queue_timeout: float, max_connections: int, json_response: bool = True,
+             stateless: bool = False):
+    """以 HTTP 传输运行 FastMCP 服务器（阻塞直到退出）
+
+    transport: "streamable-http"（单一端点 /mcp，推荐）或 "sse"（/sse + /messages/，兼容旧客户端）
+    keep_alive: 空闲连接保持时间（秒），Agent 的连续调用复用同一连接
+    max_connections: 同时打开的连接上限，超出时新连接收到 503
+    json_response / stateless: Streamable HTTP 的响应格式与会话模式；
+        JSON 响应省去逐条 SSE 分帧，无状态模式不为每个客户端保留传输会话
+    """
+    mcp.settings.host = host
+    mcp.settings.port = port
+    if transport == "streamable-http":
+        mcp.settings.json_response = json_response
+        mcp.settings.stateless_http = stateless
+        app = mcp.streamable_http_app()
+    else:
+        app = mcp.sse_app()
+    logger.info("taskify %s 服务监听 http://%s:%d", transport, host, port)
+    serve(AdmissionControl(app, max_body_bytes, max_inflight, queue_timeout),
+          host, port, keep_alive, max_connections, mcp.settings.log_level)
+
+
+def serve(app: ASGIApp, host: str, port: int, keep_alive: float, max_connections: int, log_level: str = "INFO"):
+    """用 uvicorn 运行 ASGI 应用（阻塞直到退出）；传入 AdmissionControl 时登记为当前进程的准入控制"""
+    import uvicorn
+
+    global _admission
+    if isinstance(app, AdmissionControl):
+        _admission = app
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_level=log_level.lower(),
+        access_log=False,
+        timeout_keep_alive=max(1, int(keep_alive)),
+        limit_concurrency=max_connections or None,
+        lifespan="on"
+    )
+    uvicorn.Server(config).run()
@@ -0,0 +1,186 @@
+"""指令特征提取 - 一次扫描生成所有质量评分共享的特征"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .keywords import KeywordAutomaton, KeywordHits
+
+# 质量评分使用的关键词表：表 → 标签 → 关键词（子串匹配，指令统一转为小写）
+INSTRUCTION_TABLES: Dict[str, Dict[str, List[str]]] = {
+    "clarity": {
+        "action_verb": ["implement", "create", "fix", "optimize", "refactor", "test",
+                        "实现", "创建", "修复", "优化", "重构", "测试"],
+        "target": ["function", "class", "method", "api", "函数", "类", "方法"],
+        # 按任务类型的清晰度加分项
+        "bug_fix": ["reproduce", "root cause", "重现", "根因"],
+        "new_feature": ["requirement", "user story", "需求", "用户故事"]
+    },
+    "completeness": {
+        "io": ["input", "output", "return", "parameter", "输入", "输出", "返回", "参数"],
+        "constraint": ["constraint", "requirement", "must", "should", "约束", "要求", "必须", "应该"],
+        "success": ["success", "criteria", "expect", "成功", "标准", "期望"]
+    },
+    "specificity": {
+        "tech": ["react", "vue", "angular", "django", "flask", "express", "spring"],
+        "test_type": ["unit", "integration", "e2e", "单元", "集成", "端到端"]
+    },
+    "actionability": {
+        "step": ["step", "first", "then", "步骤", "首先", "然后"],
+        "vague": ["somehow", "maybe", "possibly", "大概", "可能", "或许"],
+        "tool": ["npm", "git", "docker", "kubectl", "python", "node"]
+    },
+    "risk": {
+        "test": ["test", "testing", "测试"],
+        "error_handling": ["error", "exception", "handle", "错误", "异常", "处理"],
+        "compatibility": ["compatible", "backward", "兼容"]
+    },
+    # 与任务类型匹配的动词（标签为 TaskType 的值）
+    "alignment": {
+        "new_feature": ["implement", "create", "add", "build"],
+        "bug_fix": ["fix", "resolve", "debug", "patch"],
+        "performance": ["optimize", "improve", "enhance", "speed"],
+        "refactor": ["refactor", "restructure", "clean", "organize"]
+    }
+}
+
+INSTRUCTION_ENGINE = KeywordAutomaton(INSTRUCTION_TABLES)
+
+STEP_MARKER_PATTERN = re.compile(r'\d+\.|\-|\*')
+METRIC_UNIT_PATTERN = re.compile(r'\d+%|\d+ms|\d+MB')
+SOURCE_FILE_PATTERN = re.compile(r'\w+\.(py|js|ts|java|cpp|c)')
+NUMBER_PATTERN = re.compile(r'\d')
+
+# 增量扫描使用的模式：与上面的模式判定结果相同，但只需跨片段保留最多 5 个字符的尾部
+STREAM_STEP_NUMBER_PATTERN = re.compile(r'\d\.')
+STREAM_METRIC_UNIT_PATTERN = re.compile(r'\d(?:%|ms|MB)')
+STREAM_SOURCE_FILE_PATTERN = re.compile(r'\w\.(?:py|js|ts|java|cpp|c)')
+STREAM_TAIL_SIZE = 5
+
+
+@dataclass(frozen=True, slots=True)
+class InstructionFeatures:
+    """指令的特征向量，各评分函数只读取这里的字段，不再重复扫描指令"""
+    hits: KeywordHits
+    word_count: int
+    step_markers: int
+    has_number: bool
+    has_metric_unit: bool
+    has_source_file: bool
+    # 小写后的指令，用于少量与任务相关的动态短语匹配；
+    # 增量评分不保留全文，动态短语改由 instruction_engine(phrases) 的 phrase 表识别
+    text: Optional[str] = None
+
+    def mentions(self, table: str, label: str) -> bool:
+        """是否命中某个关键词表中的任意关键词"""
+        return self.hits.any(table, label)
+
+    def mentions_any_word(self, phrase: str) -> bool:
+        """短语按空白切分后，是否有任意片段出现在指令中"""
+        text = self.text
+        if text is None:
+            return self.hits.any("phrase_word", phrase)
+        return any(keyword in text for keyword in phrase.lower().split())
+
+    def contains_phrase(self, phrase: str) -> bool:
+        """完整短语是否出现在指令中（忽略大小写）"""
+        text = self.text
+        if text is None:
+            return not phrase or self.hits.any("phrase", phrase)
+        return phrase.lower() in text
+
+
+def extract_instruction_features(instruction: str) -> InstructionFeatures:
+    """提取指令特征：关键词自动机一次扫描 + 各计数正则一次扫描"""
+    text = instruction.lower()
+    return InstructionFeatures(
+        hits=INSTRUCTION_ENGINE.scan(text),
+        word_count=len(instruction.split()),
+        step_markers=len(STEP_MARKER_PATTERN.findall(instruction)),
+        has_number=NUMBER_PATTERN.search(instruction) is not None,
+        has_metric_unit=METRIC_UNIT_PATTERN.search(instruction) is not None,
+        has_source_file=SOURCE_FILE_PATTERN.search(instruction) is not None,
+        text=text
+    )
+
+
+@lru_cache(maxsize=256)
+def instruction_engine(phrases: Tuple[str, ...]) -> KeywordAutomaton:
+    """在质量关键词表之外加入任务相关的动态短语（风险因素、关键需求）
+
+    phrase_word 表：短语 → 按空白切分的片段，对应 mentions_any_word；
+    phrase 表：短语 → 完整短语，对应 contains_phrase。
+    同一任务的增量评分会话共享编译好的自动机。
+    """
+    if not phrases:
+        return INSTRUCTION_ENGINE
+    tables: Dict[str, Mapping[str, Sequence[str]]] = dict(INSTRUCTION_TABLES)
+    tables["phrase_word"] = {phrase: phrase.lower().split() for phrase in phrases}
+    tables["phrase"] = {phrase: [phrase.lower()] for phrase in phrases if phrase}
+    return KeywordAutomaton(tables)
+
+
+class InstructionStream:
+    """增量提取指令特征：逐段追加指令文本，特征以运行计数维护
+
+    每次 append 只扫描新片段（外加不超过 STREAM_TAIL_SIZE 个字符的上一段尾部），
+    features() 的结果与对完整指令调用 extract_instruction_features 的评分特征一致。
+    """
+
+    __slots__ = ("stream_id", "session_id", "phrases", "last_access", "length", "chunks",
+                 "_scanner", "_tail", "_word_count", "_step_markers",
+                 "_has_number", "_has_metric_unit", "_has_source_file")
+
+    def __init__(self, stream_id: str, session_id: str = "", phrases: Tuple[str, ...] = (),
+                 last_access: float = 0.0):
+        self.stream_id = stream_id
+        self.session_id = session_id
+        self.phrases = phrases
+        self.last_access = last_access
+        self.length = 0
+        self.chunks = 0
+        self._scanner = instruction_engine(phrases).stream()
+        self._tail = ""
+        self._word_count = 0
+        self._step_markers = 0
+        self._has_number = False
+        self._has_metric_unit = False
+        self._has_source_file = False
+
+    def append(self, chunk: str):
+        """追加一段指令文本"""
+        if not chunk:
+            return
+        tail = self._tail
+        # 小写逐字符进行（关键词中没有依赖上下文的大小写规则），可以分段转换
+        self._scanner.feed(chunk.lower())
+
+        words = len(chunk.split())
+        if tail and not tail[-1].isspace() and not chunk[0].isspace():
+            words -= 1  # 片段边界落在一个单词中间
+        self._word_count += words
+
+        self._step_markers += (chunk.count('-') + chunk.count('*') +
+                               len(STREAM_STEP_NUMBER_PATTERN.findall(tail[-1:] + chunk)))
+        if not self._has_number:
+            self._has_number = NUMBER_PATTERN.search(chunk) is not None
+        if not self._has_metric_unit:
+            self._has_metric_unit = STREAM_METRIC_UNIT_PATTERN.search(tail[-2:] + chunk) is not None
+        if not self._has_source_file:
+            self._has_source_file = STREAM_SOURCE_FILE_PATTERN.search(tail + chunk) is not None
+
+        self._tail = (tail + chunk)[-STREAM_TAIL_SIZE:]
+        self.length += len(chunk)
+        self.chunks += 1
+
+    def features(self) -> InstructionFeatures:
+        """当前已追加文本的特征"""
+        return InstructionFeatures(
+            hits=self._scanner.hits(),
+            word_count=self._word_count,
+            step_markers=self._step_markers,
+            has_number=self._has_number,
+            has_metric_unit=self._has_metric_unit,
+            has_source_file=self._has_source_file
+        )
@@ -0,0 +1,291 @@
+"""预写日志存储后端 - 后台批量落盘的追加式变更日志"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .models import SessionInfo
+from .storage import StorageBackend, session_from_record, session_to_record
+
+logger = logging.getLogger(__name__)
+
+
+class JournalBackend(StorageBackend):
+    """追加式变更日志后端（write-behind）
+
+    - 工具调用只把变更放入内存队列（同一会话的多次修改合并为一条），立即返回
+    - 后台写线程按组提交：每 fsync_interval 秒或积累 batch_size 条变更时，
+      一次性追加写入日志并执行一次 fsync，崩溃时最多丢失一个刷盘间隔的变更
+    - 变更在 fsync 成功之后才应用到已落盘状态；写出失败时整批保留（读取仍可见），
+      写线程记录错误并在下一个刷盘间隔重试
+    - 日志记录数超过 compact_threshold 时写出全量快照并截断日志，
+      启动时只需读取快照加一段有界的日志即可恢复
+    """
+
+    name = "journal"
+
+    def __init__(self, path: str, batch_size: int = 256, fsync_interval: float = 0.1,
+                 compact_threshold: int = 10000, max_history: int = 20000):
+        base = os.path.splitext(path)[0]
+        os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+        self.journal_path = base + ".journal"
+        self.snapshot_path = base + ".snapshot"
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+
+        # 已落盘（或已回放）的状态，仅由刷盘流程修改
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._contexts: Dict[str, Dict[str, Any]] = {}
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+
+        # 待写入的变更：有序操作队列 + 会话/上下文的最新值
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending: List[Tuple[str, Any]] = []
+        self._dirty_sessions: Dict[str, SessionInfo] = {}
+        self._dirty_contexts: Dict[str, Dict[str, Any]] = {}
+        self._deleted_sessions: set = set()
+        # 正在写出的批次，写出完成前读取仍需可见
+        self._inflight_sessions: Dict[str, SessionInfo] = {}
+        self._inflight_contexts: Dict[str, Dict[str, Any]] = {}
+        # 写出失败、等待重试的记录（仅由刷盘流程访问）
+        self._failed: List[Dict[str, Any]] = []
+
+        self._flush_lock = threading.Lock()
+        self._journal_records = self._replay()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="taskify-journal", daemon=True)
+        self._writer.start()
+
+    # ---- 回放与应用 ----
+
+    def _apply(self, record: Dict[str, Any]):
+        op = record["op"]
+        if op == "session":
+            data = record["data"]
+            self._sessions[data["session_id"]] = data
+        elif op == "delete_session":
+            self._sessions.pop(record["session_id"], None)
+        elif op == "expire":
+            cutoff = record["cutoff"]
+            expired = [sid for sid, data in self._sessions.items() if data["last_access"] < cutoff]
+            for sid in expired:
+                del self._sessions[sid]
+        elif op == "context":
+            self._contexts[record["key"]] = record["data"]
+        elif op == "history":
+            self._history.append(record["data"])
+
+    def _replay(self) -> int:
+        """加载快照并回放日志，返回日志中的记录数"""
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._sessions.update(snapshot.get("sessions", {}))
+            self._contexts.update(snapshot.get("contexts", {}))
+            self._history.extend(snapshot.get("history", []))
+
+        if not os.path.exists(self.journal_path):
+            return 0
+        count = 0
+        valid_length = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # 崩溃时写了一半的尾部记录
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(record)
+                valid_length += len(line)
+                count += 1
+        # 截掉损坏的尾部，保证后续追加写入从完整记录之后开始
+        if valid_length != os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_length)
+        return count
+
+    # ---- 后台写线程 ----
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.fsync_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("变更日志写出失败，%d 条记录将在下次刷盘时重试", len(self._failed))
+            if closed:
+                return
+
+    def _enqueue(self, op: str, payload: Any):
+        # 调用方已持有 self._lock
+        self._pending.append((op, payload))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.notify()
+
+    def flush(self):
+        """把待写入的变更作为一组追加到日志并 fsync"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                # 上次写出失败的批次仍在写出中，合并而不是替换，保证读取仍可见
+                self._inflight_sessions.update(self._dirty_sessions)
+                self._inflight_contexts.update(self._dirty_contexts)
+                self._dirty_sessions, self._dirty_contexts = {}, {}
+            if not pending and not self._failed:
+                return
+
+            # 同一会话/上下文只在其最后一次出现的位置写出最新值，保证与删除操作的先后顺序
+            last_position = {(op, payload): i for i, (op, payload) in enumerate(pending)
+                             if op in ("session", "context")}
+
+            # 序列化在锁外进行，不阻塞工具调用
+            records = []
+            for i, (op, payload) in enumerate(pending):
+                if op == "session":
+                    session = self._inflight_sessions.get(payload)
+                    if session is None or last_position[(op, payload)] != i:
+                        continue
+                    record = {"op": "session", "data": session_to_record(session)}
+                elif op == "context":
+                    if last_position[(op, payload)] != i:
+                        continue
+                    record = {"op": "context", "key": payload, "data": self._inflight_contexts[payload]}
+                else:
+                    record = payload
+                records.append(record)
+
+            batch = self._failed + records
+            if batch:
+                offset = None
+                try:
+                    offset = os.fstat(self._journal.fileno()).st_size
+                    self._journal.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+                    self._journal.flush()
+                    os.fsync(self._journal.fileno())
+                except Exception:
+                    self._failed = batch
+                    self._reopen_journal(offset)
+                    raise
+                self._failed = []
+                self._journal_records += len(batch)
+
+            # fsync 成功后才应用到已落盘状态
+            with self._lock:
+                for record in batch:
+                    self._apply(record)
+                self._inflight_sessions = {}
+                self._inflight_contexts = {}
+                self._deleted_sessions -= {r["session_id"] for r in batch if r["op"] == "delete_session"}
+            if self._journal_records >= self.compact_threshold:
+                self._compact()
+
+    def _reopen_journal(self, offset: Optional[int]):
+        """写出失败后丢弃文件对象中残留的缓冲，把日志截断回写出前的长度并重新打开"""
+        try:
+            self._journal.close()
+        except Exception:
+            pass
+        if offset is not None:
+            try:
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(offset)
+            except OSError:
+                pass
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _compact(self):
+        """写出全量快照并截断日志（调用方持有 _flush_lock）"""
+        snapshot = {
+            "sessions": self._sessions,
+            "contexts": self._contexts,
+            "history": list(self._history)
+        }
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._journal.close()
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._journal_records = 0
+
+    # ---- StorageBackend 接口 ----
+
+    def load_session(self, session_id: str) -> Optional[SessionInfo]:
+        with self._lock:
+            session = self._dirty_sessions.get(session_id)
+            if session is not None:
+                return session
+            if session_id in self._deleted_sessions:
+                return None
+            session = self._inflight_sessions.get(session_id)
+            if session is not None:
+                return session
+            record = self._sessions.get(session_id)
+        return session_from_record(record) if record else None
+
+    def save_session(self, session: SessionInfo):
+        with self._lock:
+            if session.session_id not in self._dirty_sessions:
+                self._enqueue("session", session.session_id)
+            self._dirty_sessions[session.session_id] = session
+            self._deleted_sessions.discard(session.session_id)
+
+    def delete_session(self, session_id: str):
+        with self._lock:
+            self._dirty_sessions.pop(session_id, None)
+            self._deleted_sessions.add(session_id)
+            self._enqueue("delete_session", {"op": "delete_session", "session_id": session_id})
+
+    def delete_expired_sessions(self, cutoff: float):
+        with self._lock:
+            self._enqueue("expire", {"op": "expire", "cutoff": cutoff})
+
+    def load_context(self, context_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for source in (self._dirty_contexts, self._inflight_contexts, self._contexts):
+                data = source.get(context_key)
+                if data is not None:
+                    return data
+            return None
+
+    def save_context(self, context_key: str, memory: Dict[str, Any]):
+        with self._lock:
+            if context_key not in self._dirty_contexts:
+                self._enqueue("context", context_key)
+            self._dirty_contexts[context_key] = dict(memory)
+
+    def count_contexts(self) -> int:
+        with self._lock:
+            return len(self._contexts.keys() | self._inflight_contexts.keys() | self._dirty_contexts.keys())
+
+    def append_history(self, item: Dict[str, Any]):
+        data = {k: v for k, v in item.items() if k != 'entry_id'}
+        with self._lock:
+            self._enqueue("history", {"op": "history", "data": data})
+
+    def load_history(self, limit: int) -> List[Dict[str, Any]]:
+        self.flush()
+        with self._lock:
+            history = list(self._history)
+        return history[-limit:] if limit else []
+
+    def close(self):
+        with self._wakeup:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join()
+        self._journal.close()
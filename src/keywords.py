@@ -0,0 +1,238 @@
+"""关键词引擎 - 基于 Aho-Corasick 自动机的多表关键词匹配"""
+
+import re
+from collections import deque
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+
+# 任务类型关键词（顺序即优先级，得分相同时靠前的类型胜出）
+TASK_TYPE_KEYWORDS: Dict[str, List[str]] = {
+    "new_feature": [
+        "add", "implement", "create", "build", "develop", "新增", "添加", "实现", "构建",
+        "feature", "functionality", "capability", "功能", "能力"
+    ],
+    "bug_fix": [
+        "fix", "bug", "error", "issue", "problem", "修复", "错误", "问题", "故障",
+        "broken", "crash", "fail", "exception", "崩溃", "失败", "异常"
+    ],
+    "refactor": [
+        "refactor", "restructure", "reorganize", "clean", "重构", "重组", "清理",
+        "improve", "simplify", "optimize code", "改进", "简化", "代码优化"
+    ],
+    "performance": [
+        "optimize", "performance", "speed", "memory", "efficient", "优化", "性能", "效率",
+        "slow", "fast", "latency", "throughput", "缓慢", "延迟", "吞吐量"
+    ],
+    "testing": [
+        "test", "testing", "unit test", "coverage", "测试", "单元测试",
+        "validate", "verify", "check", "验证", "检查"
+    ],
+    "documentation": [
+        "document", "doc", "readme", "comment", "文档", "注释",
+        "explain", "describe", "guide", "解释", "描述", "指南"
+    ],
+    "maintenance": [
+        "update", "upgrade", "maintain", "dependency", "更新", "升级", "维护",
+        "migrate", "deprecated", "迁移", "废弃"
+    ]
+}
+
+# 关键词所在单词中出现这些修饰词时额外加分
+TASK_TYPE_MODIFIERS: Dict[str, List[str]] = {
+    "modifier": ["new", "better", "improved"]
+}
+
+# estimate_complexity 使用的复杂度指标
+COMPLEXITY_KEYWORDS: Dict[str, List[str]] = {
+    "high": [
+        "architecture", "system", "multiple", "integrate", "database", "api",
+        "microservice", "distributed", "架构", "系统", "多个", "集成", "微服务", "分布式",
+        "scalable", "enterprise", "production", "可扩展", "企业级", "生产环境"
+    ],
+    "medium": [
+        "module", "class", "function", "component", "service", "模块", "组件", "类", "函数", "服务",
+        "interface", "workflow", "process", "接口", "工作流", "流程"
+    ],
+    "low": [
+        "variable", "config", "simple", "single", "basic", "变量", "配置", "简单", "单个", "基础",
+        "small", "minor", "quick", "小", "轻微", "快速"
+    ]
+}
+
+# 项目上下文中的技术栈与规模线索
+CONTEXT_KEYWORDS: Dict[str, List[str]] = {
+    "tech": ["react", "vue", "angular", "kubernetes", "docker"],
+    "scale": ["large", "enterprise", "distributed", "大型", "企业", "分布式"]
+}
+
+# smart_programming_coach 使用的快速复杂度指标
+REQUEST_COMPLEXITY_KEYWORDS: Dict[str, List[str]] = {
+    "high": [
+        "architecture", "system", "multiple", "integrate", "refactor",
+        "optimize", "架构", "系统", "多个", "集成", "重构", "优化"
+    ],
+    "medium": [
+        "feature", "function", "class", "module", "api",
+        "功能", "函数", "类", "模块", "接口"
+    ]
+}
+
+# 请求性质（顺序即判定优先级）
+REQUEST_NATURE_KEYWORDS: Dict[str, List[str]] = {
+    "learning": ["learn", "understand", "explain", "学习", "理解", "解释"],
+    "debugging": ["fix", "bug", "error", "修复", "错误", "问题"],
+    "optimization": ["optimize", "performance", "优化", "性能"],
+    "development": ["create", "implement", "build", "创建", "实现", "构建"]
+}
+
+ANALYSIS_TABLES: Dict[str, Dict[str, List[str]]] = {
+    "task_type": TASK_TYPE_KEYWORDS,
+    "task_modifier": TASK_TYPE_MODIFIERS,
+    "complexity": COMPLEXITY_KEYWORDS,
+    "context": CONTEXT_KEYWORDS,
+    "request_complexity": REQUEST_COMPLEXITY_KEYWORDS,
+    "request_nature": REQUEST_NATURE_KEYWORDS
+}
+
+
+class KeywordHits:
+    """一次扫描的命中结果，按 (表, 标签) 归类"""
+
+    __slots__ = ("_hits",)
+
+    def __init__(self, hits: Dict[Tuple[str, str], List[str]]):
+        self._hits = hits
+
+    def keywords(self, table: str, label: str) -> List[str]:
+        """返回命中的关键词（去重）"""
+        return self._hits.get((table, label), [])
+
+    def count(self, table: str, label: str) -> int:
+        """返回命中的不同关键词数量"""
+        return len(self._hits.get((table, label), ()))
+
+    def any(self, table: str, label: str) -> bool:
+        """是否命中任意关键词"""
+        return (table, label) in self._hits
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 自动机：一次线性扫描即可找出所有表中出现的关键词
+
+    与逐个执行 ``keyword in text`` 的语义一致（子串匹配），
+    但扫描代价只与文本长度相关，不随关键词数量增长。
+    """
+
+    def __init__(self, tables: Mapping[str, Mapping[str, Sequence[str]]]):
+        self.tables = tables
+        # 每个关键词归属的 (表, 标签) 列表
+        owners: Dict[str, List[Tuple[str, str]]] = {}
+        for table, labels in tables.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    owner = (table, label)
+                    if owner not in owners.setdefault(keyword, []):
+                        owners[keyword].append(owner)
+        self._patterns: List[str] = list(owners)
+        self._owners: List[Tuple[Tuple[str, str], ...]] = [tuple(owners[p]) for p in self._patterns]
+        self._build()
+
+    def _build(self):
+        """构建 goto / fail / output 表"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, pattern in enumerate(self._patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(index)
+
+        # BFS 计算失败链，并把失败链上的转移预先合并进 delta，
+        # 扫描时每个字符只需一次字典查询：未命中 delta 的字符必然回到根节点的一级转移
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # 合并失败链上的输出，扫描时无需再沿失败链回溯
+                outputs[nxt].extend(outputs[fail[nxt]])
+
+        self._root = root
+        self._delta = delta
+        self._out: List[Tuple[int, ...]] = [tuple(o) for o in outputs]
+
+    def _advance(self, state: int, text: str, found: set) -> int:
+        """从 state 开始扫描文本，把命中的关键词下标加入 found，返回结束状态"""
+        delta, root_get, out = self._delta, self._root.get, self._out
+        for ch in text:
+            nxt = delta[state].get(ch)
+            state = nxt if nxt is not None else root_get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return state
+
+    def _hits(self, found: set) -> KeywordHits:
+        hits: Dict[Tuple[str, str], List[str]] = {}
+        patterns, owners = self._patterns, self._owners
+        for index in found:
+            keyword = patterns[index]
+            for owner in owners[index]:
+                hits.setdefault(owner, []).append(keyword)
+        return KeywordHits(hits)
+
+    def scan(self, text: str) -> KeywordHits:
+        """扫描文本（调用方负责大小写归一化），返回命中结果"""
+        found: set = set()
+        self._advance(0, text, found)
+        return self._hits(found)
+
+    def stream(self) -> "KeywordStream":
+        """创建增量扫描器：文本可以分段送入，跨段的关键词同样能被识别"""
+        return KeywordStream(self)
+
+
+class KeywordStream:
+    """保存自动机状态的增量扫描器，每次送入只扫描新片段"""
+
+    __slots__ = ("_automaton", "_state", "_found")
+
+    def __init__(self, automaton: KeywordAutomaton):
+        self._automaton = automaton
+        self._state = 0
+        self._found: set = set()
+
+    def feed(self, text: str):
+        """送入下一段文本（调用方负责大小写归一化）"""
+        self._state = self._automaton._advance(self._state, text, self._found)
+
+    def hits(self) -> KeywordHits:
+        """到目前为止的命中结果"""
+        return self._automaton._hits(self._found)
+
+
+# 导入时编译一次，所有分析函数共享
+KEYWORD_ENGINE = KeywordAutomaton(ANALYSIS_TABLES)
+
+# 关键词所在单词的提取正则：纯单词关键词直接在 \w+ 单词中查找，
+# 含空格等非单词字符的关键词才需要各自的上下文正则
+WORD_PATTERN = re.compile(r'\w+')
+TASK_TYPE_CONTEXT_PATTERNS: Dict[str, "re.Pattern[str]"] = {
+    keyword: re.compile(rf'\w*{keyword}\w*')
+    for keywords in TASK_TYPE_KEYWORDS.values()
+    for keyword in keywords
+    if not WORD_PATTERN.fullmatch(keyword)
+}
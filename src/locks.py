@@ -0,0 +1,24 @@
+"""分段锁 - 按键把互斥分散到固定数量的锁上"""
+
+import threading
+from typing import Hashable
+
+DEFAULT_STRIPES = 64
+
+
+class LockStripes:
+    """按键哈希选择锁的分段锁
+
+    同一键总是映射到同一把锁，不同会话大多落在不同的锁上、互不阻塞；
+    锁的数量固定，不随会话数增长。锁可重入，但调用方不应同时持有两个键的锁
+    （两个键可能以相反顺序落在同两把锁上）。
+    """
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._locks = tuple(threading.RLock() for _ in range(max(1, stripes)))
+
+    def __call__(self, key: Hashable) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
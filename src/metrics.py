@@ -0,0 +1,267 @@
+"""运行指标 - 工具与处理阶段的耗时、调用次数、响应大小与内存分配采样"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+METRICS_WINDOW = 1024  # 每个指标保留的最近样本数，分位数基于这些样本计算
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Series:
+    """一个指标序列：累计次数与总和，外加最近样本的滑动窗口"""
+
+    __slots__ = ("count", "total", "samples")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(q * len(ordered)))] for q in QUANTILES}
+
+    def summary(self, scale: float = 1.0, digits: Optional[int] = 3) -> Dict[str, Any]:
+        quantiles = self.quantiles()
+        summary = {f"p{int(q * 100)}": round(value * scale, digits) for q, value in quantiles.items()}
+        summary["mean"] = round(self.total / self.count * scale, digits) if self.count else 0
+        summary["count"] = self.count
+        return summary
+
+
+class _NullTimer:
+    """指标关闭或不在工具调用中时使用的空计时器"""
+
+    payload_bytes: Optional[int] = None  # 与 _ToolCall 接口一致，写入的值不会被记录
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("_metrics", "_key", "_start")
+
+    def __init__(self, metrics: "Metrics", key: Tuple[str, str]):
+        self._metrics = metrics
+        self._key = key
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics._observe(self._metrics._stages, self._key, time.perf_counter() - self._start)
+        return False
+
+
+class _ToolCall:
+    """一次工具调用的计时上下文"""
+
+    __slots__ = ("_metrics", "_tool", "_start", "_previous", "_sampled", "_base_memory", "payload_bytes")
+
+    def __init__(self, metrics: "Metrics", tool: str, sampled: bool):
+        self._metrics = metrics
+        self._tool = tool
+        self._sampled = sampled
+        self.payload_bytes: Optional[int] = None
+
+    def __enter__(self):
+        local = self._metrics._local
+        self._previous = getattr(local, "tool", None)
+        local.tool = self._tool
+        if self._sampled:
+            import tracemalloc  # 开启采样时 Metrics 已导入，这里只是取已加载的模块
+            tracemalloc.reset_peak()
+            self._base_memory = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self._start
+        metrics = self._metrics
+        metrics._local.tool = self._previous
+        allocation = None
+        if self._sampled:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            allocation = (peak - self._base_memory, current - self._base_memory)
+        metrics._finish_call(self._tool, elapsed, exc_type is not None, self.payload_bytes, allocation)
+        return False
+
+
+class Metrics:
+    """工具调用与处理阶段的指标
+
+    - 每个工具记录调用次数、错误次数、耗时分布与响应字节数
+    - 工具内部的处理阶段（分类、相似度检索、序列化等）通过 stage() 计时，
+      归属于当前线程正在执行的工具
+    - alloc_sample_every > 0 时启用 tracemalloc，每 N 次工具调用采样一次分配峰值与净增内存；
+      线程池并发执行时采样会包含同时运行的其他调用，数值用于观察量级；
+      tracemalloc 对整个进程生效，开启后所有调用的耗时都会明显变慢，不宜与关闭时的耗时直接比较
+    - 分位数基于每个指标最近 METRICS_WINDOW 个样本；export_path 非空时
+      以 Prometheus 文本格式定期写入该文件（原子替换），可交给 node_exporter 的 textfile 采集
+    """
+
+    def __init__(self, enabled: bool = True, alloc_sample_every: int = 0, export_path: str = "",
+                 export_interval: float = 15.0, window: int = METRICS_WINDOW):
+        self.enabled = enabled
+        self.alloc_sample_every = alloc_sample_every if enabled else 0
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._calls: Dict[str, _Series] = {}
+        self._errors: Dict[str, int] = {}
+        self._payloads: Dict[str, _Series] = {}
+        self._allocations: Dict[Tuple[str, str], _Series] = {}
+        self._stages: Dict[Tuple[str, str], _Series] = {}
+        self._call_counter = 0
+        self._last_export = time.monotonic()
+        if self.alloc_sample_every:
+            import tracemalloc  # 未开启采样时不导入，避免拖慢启动
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def tool_call(self, tool: str):
+        """工具调用的计时上下文；调用方可设置 payload_bytes 记录响应大小"""
+        if not self.enabled:
+            return _NullTimer()
+        sampled = False
+        if self.alloc_sample_every:
+            with self._lock:
+                self._call_counter += 1
+                sampled = self._call_counter % self.alloc_sample_every == 0
+        return _ToolCall(self, tool, sampled)
+
+    def stage(self, name: str):
+        """当前工具内一个处理阶段的计时上下文"""
+        if not self.enabled:
+            return _NULL_TIMER
+        tool = getattr(self._local, "tool", None)
+        if tool is None:
+            return _NULL_TIMER
+        return _StageTimer(self, (tool, name))
+
+    def observe_stage(self, tool: str, name: str, seconds: float):
+        """直接记录一个阶段耗时（例如线程池排队时间）"""
+        if self.enabled:
+            self._observe(self._stages, (tool, name), seconds)
+
+    def _observe(self, table: Dict[Any, _Series], key: Any, value: float):
+        with self._lock:
+            series = table.get(key)
+            if series is None:
+                series = table[key] = _Series(self.window)
+            series.observe(value)
+
+    def _finish_call(self, tool: str, elapsed: float, failed: bool, payload_bytes: Optional[int],
+                     allocation: Optional[Tuple[int, int]]):
+        with self._lock:
+            series = self._calls.get(tool)
+            if series is None:
+                series = self._calls[tool] = _Series(self.window)
+            series.observe(elapsed)
+            if failed:
+                self._errors[tool] = self._errors.get(tool, 0) + 1
+        if payload_bytes is not None:
+            self._observe(self._payloads, tool, payload_bytes)
+        if allocation is not None:
+            self._observe(self._allocations, (tool, "peak"), allocation[0])
+            self._observe(self._allocations, (tool, "retained"), allocation[1])
+        if self.export_path and time.monotonic() - self._last_export >= self.export_interval:
+            self.export()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前指标（耗时以毫秒表示），供 session_manager('metrics') 返回"""
+        with self._lock:
+            tools: Dict[str, Dict[str, Any]] = {}
+            for tool, series in self._calls.items():
+                tools[tool] = {
+                    "calls": series.count,
+                    "errors": self._errors.get(tool, 0),
+                    "latency_ms": series.summary(1000.0)
+                }
+            for tool, series in self._payloads.items():
+                tools.setdefault(tool, {})["payload_bytes"] = series.summary(digits=None)
+            for (tool, kind), series in self._allocations.items():
+                tools.setdefault(tool, {}).setdefault("allocation_bytes", {})[kind] = series.summary(digits=None)
+            for (tool, stage), series in self._stages.items():
+                tools.setdefault(tool, {}).setdefault("stages", {})[stage] = series.summary(1000.0)
+            return {
+                "uptime_seconds": int(time.time() - self.started),
+                "window": self.window,
+                "allocation_sample_every": self.alloc_sample_every,
+                "tools": tools
+            }
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式（summary 类型，耗时单位为秒）"""
+        lines: List[str] = []
+        with self._lock:
+            self._summary_lines(lines, "taskify_tool_latency_seconds", "Tool call latency.",
+                                {(("tool", tool),): series for tool, series in self._calls.items()})
+            lines.append("# HELP taskify_tool_errors_total Tool calls that raised an exception.")
+            lines.append("# TYPE taskify_tool_errors_total counter")
+            for tool in self._calls:
+                lines.append(f'taskify_tool_errors_total{{tool="{_escape(tool)}"}} {self._errors.get(tool, 0)}')
+            self._summary_lines(lines, "taskify_stage_latency_seconds", "Latency of a processing stage within a tool.",
+                                {(("tool", tool), ("stage", stage)): series
+                                 for (tool, stage), series in self._stages.items()})
+            self._summary_lines(lines, "taskify_tool_payload_bytes", "Serialized tool response size.",
+                                {(("tool", tool),): series for tool, series in self._payloads.items()})
+            self._summary_lines(lines, "taskify_tool_allocation_bytes", "Sampled tracemalloc allocation per tool call.",
+                                {(("tool", tool), ("kind", kind)): series
+                                 for (tool, kind), series in self._allocations.items()})
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _summary_lines(lines: List[str], name: str, help_text: str,
+                       series_by_labels: Dict[Tuple[Tuple[str, str], ...], _Series]):
+        if not series_by_labels:
+            return
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} summary")
+        for labels, series in series_by_labels.items():
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            for q, value in series.quantiles().items():
+                lines.append(f'{name}{{{label_text},quantile="{q}"}} {value!r}')
+            lines.append(f"{name}_sum{{{label_text}}} {series.total!r}")
+            lines.append(f"{name}_count{{{label_text}}} {series.count}")
+
+    def export(self, path: str = "") -> Optional[str]:
+        """把指标以 Prometheus 文本格式写入文件（先写临时文件再替换），返回写入路径"""
+        path = path or self.export_path
+        if not path:
+            return None
+        self._last_export = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+        os.replace(temporary, path)
+        return path
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
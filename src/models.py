@@ -0,0 +1,116 @@
+"""数据模型 - 任务分析、思考框架与会话信息"""
+
+import sys
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .context_registry import register_context
+
+
+class TaskType(Enum):
+    """任务类型枚举"""
+    NEW_FEATURE = "new_feature"
+    BUG_FIX = "bug_fix"
+    REFACTOR = "refactor"
+    PERFORMANCE = "performance"
+    TESTING = "testing"
+    DOCUMENTATION = "documentation"
+    MAINTENANCE = "maintenance"
+    UNKNOWN = "unknown"
+
+
+class ComplexityLevel(Enum):
+    """复杂度级别枚举"""
+    SIMPLE = "simple"
+    MEDIUM = "medium"
+    COMPLEX = "complex"
+
+
+# 共享字符串元组池：分析结果中的列表大多来自有限的固定短语集合，
+# 相同内容在所有会话间只保存一份
+INTERN_POOL_SIZE = 4096
+_intern_pool: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def interned(values: Iterable[str]) -> Tuple[str, ...]:
+    """返回内容相同的共享元组（池满后不再收录新内容）"""
+    values = tuple(values)
+    shared = _intern_pool.get(values)
+    if shared is not None:
+        return shared
+    if len(_intern_pool) < INTERN_POOL_SIZE:
+        values = tuple(sys.intern(value) for value in values)
+        _intern_pool[values] = values
+    return values
+
+
+@dataclass(frozen=True, slots=True)
+class TaskAnalysis:
+    """任务分析结果"""
+    task_type: TaskType
+    complexity_level: ComplexityLevel
+    core_objective: str
+    key_requirements: Tuple[str, ...]
+    constraints: Tuple[str, ...]
+    risk_factors: Tuple[str, ...]
+    success_criteria: Tuple[str, ...]
+    context_needs: Tuple[str, ...]
+    similarity_score: float = 0.0  # 与历史任务的相似度
+    learning_insights: Optional[Tuple[Tuple[str, ...], ...]] = None  # 从历史中学到的见解
+
+
+@dataclass(frozen=True, slots=True)
+class ThinkingFramework:
+    """思考框架（模板对象在会话间共享）"""
+    phase: str
+    guiding_questions: Tuple[str, ...]
+    key_considerations: Tuple[str, ...]
+    output_format: str
+    examples: Tuple[str, ...]
+    adaptive_hints: Optional[Tuple[str, ...]] = None  # 自适应提示
+
+
+# 思考框架模板ID：框架内容只取决于任务类型与复杂度
+FrameworkTemplateId = Tuple[TaskType, ComplexityLevel]
+# 会话相对模板的差异：阶段 → 覆盖的自适应提示
+FrameworkHints = Dict[str, Tuple[str, ...]]
+
+
+@dataclass(slots=True)
+class SessionInfo:
+    """会话信息
+
+    思考框架不随会话保存：会话通过 task_analysis 引用共享模板，
+    只在 framework_hints 中保存从历史中学到的提示差异。
+    """
+    session_id: str
+    timestamp: float
+    user_request: str
+    project_context: str
+    task_analysis: TaskAnalysis
+    current_stage: str = "understanding"
+    stage_history: List[str] = field(default_factory=list)
+    quality_scores: Dict[str, float] = field(default_factory=dict)
+    last_access: float = 0.0  # 最近访问时间，用于超时与淘汰
+    framework_hints: Optional[FrameworkHints] = None  # 相对模板的自适应提示，无差异时为 None
+    context_id: str = ""  # 项目上下文ID（上下文记忆的键），由上下文登记表计算，不单独持久化
+
+    def __post_init__(self):
+        """初始化可选字段的默认值"""
+        if not self.context_id and self.project_context:
+            self.context_id, self.project_context = register_context(self.project_context)
+        if not self.last_access:
+            self.last_access = self.timestamp
+
+    @property
+    def framework_template_id(self) -> FrameworkTemplateId:
+        """会话引用的思考框架模板"""
+        return (self.task_analysis.task_type, self.task_analysis.complexity_level)
+
+    @property
+    def thinking_frameworks(self) -> Dict[str, ThinkingFramework]:
+        """由模板与提示差异还原的完整思考框架"""
+        # frameworks 模块依赖本模块，延迟导入以避免循环引用
+        from .frameworks import resolve_frameworks
+        return resolve_frameworks(*self.framework_template_id, self.framework_hints)
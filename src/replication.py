@@ -0,0 +1,129 @@
+"""历史复制 - 分片部署中各工作进程之间复制分析历史"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, TextIO
+
+
+class HistoryReplication:
+    """基于共享目录的分析历史复制
+
+    每个分片只追加写自己的 history-<序号>.<段号>.jsonl，并按 poll_interval 读取其他分片文件的新增部分；
+    各分片因此都持有全部分片的历史（最多滞后一个轮询间隔），相似任务检索与统计不必跨进程查询。
+    读取只消费到最后一个换行符为止，对方写到一半的行留到下次读取。
+
+    每个段最多写 max_entries 行，写满后开始下一段并删除上上一段：被删除的段之后至少还有
+    max_entries 条更新的记录，落后到仍未读完它的分片即使读到这些记录，也会被其历史上限立即淘汰，
+    因此复制文件的总大小保持在约两段以内。读取方在下一段出现后读完当前段再切换；
+    当前段已被删除时直接跳到仍存在的最早一段。
+
+    复制目录由路由进程为一次部署创建并在退出时删除；重启后各分片只从自己的存储后端恢复本分片的历史。
+    """
+
+    def __init__(self, directory: str, shard_index: int, shard_count: int, poll_interval: float = 0.1,
+                 max_entries: int = 20000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_index = shard_index
+        self.poll_interval = poll_interval
+        self.max_entries = max(1, max_entries)
+        self._segment = 0
+        self._written = 0
+        self._writer: TextIO = open(self._path(shard_index, 0), "a", encoding="utf-8")
+        self._peers = [index for index in range(shard_count) if index != shard_index]
+        self._peer_segments: Dict[int, int] = {peer: 0 for peer in self._peers}
+        self._readers: Dict[int, BinaryIO] = {}
+        self._lock = threading.Lock()
+        self._last_poll = 0.0
+
+    def _path(self, shard_index: int, segment: int) -> str:
+        return os.path.join(self.directory, f"history-{shard_index}.{segment}.jsonl")
+
+    def publish(self, item: Dict[str, Any]):
+        """发布本分片的一条新历史"""
+        line = json.dumps({k: v for k, v in item.items() if k != 'entry_id'}, ensure_ascii=False)
+        with self._lock:
+            if self._written >= self.max_entries:
+                self._rotate()
+            self._writer.write(line + "\n")
+            self._writer.flush()
+            self._written += 1
+
+    def _rotate(self):
+        """开始下一段，并删除上上一段"""
+        self._writer.close()
+        self._segment += 1
+        self._written = 0
+        self._writer = open(self._path(self.shard_index, self._segment), "a", encoding="utf-8")
+        if self._segment >= 2:
+            try:
+                os.remove(self._path(self.shard_index, self._segment - 2))
+            except FileNotFoundError:
+                pass
+
+    def _earliest_segment(self, peer: int, after: int) -> Optional[int]:
+        """peer 仍存在的段中晚于 after 的最早一段"""
+        prefix = f"history-{peer}."
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".jsonl"):
+                segment = name[len(prefix):-len(".jsonl")]
+                if segment.isdigit() and int(segment) > after:
+                    segments.append(int(segment))
+        return min(segments) if segments else None
+
+    def _open_reader(self, peer: int) -> Optional[BinaryIO]:
+        segment = self._peer_segments[peer]
+        try:
+            reader = open(self._path(peer, segment), "rb")
+        except FileNotFoundError:
+            # 当前段尚未创建，或已因落后太多被对方删除
+            later = self._earliest_segment(peer, segment)
+            if later is None:
+                return None
+            self._peer_segments[peer] = later
+            try:
+                reader = open(self._path(peer, later), "rb")
+            except FileNotFoundError:
+                return None
+        self._readers[peer] = reader
+        return reader
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """其他分片自上次读取以来的新历史（距上次读取不足 poll_interval 时返回空列表）"""
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return []
+        with self._lock:
+            self._last_poll = now
+            items = []
+            for peer in self._peers:
+                while True:
+                    reader = self._readers.get(peer) or self._open_reader(peer)
+                    if reader is None:
+                        break
+                    # 先确认当前段是否已写完再读取：对方只在写完当前段之后才创建下一段，
+                    # 当前段被删除说明对方已写到更后面的段
+                    segment = self._peer_segments[peer]
+                    finished = (os.path.exists(self._path(peer, segment + 1))
+                                or not os.path.exists(self._path(peer, segment)))
+                    data = reader.read()
+                    end = data.rfind(b"\n") + 1
+                    if end < len(data):
+                        reader.seek(end - len(data), os.SEEK_CUR)
+                    items.extend(json.loads(line) for line in data[:end].splitlines() if line)
+                    if not finished:
+                        break
+                    reader.close()
+                    del self._readers[peer]
+                    self._peer_segments[peer] += 1
+            return items
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
@@ -0,0 +1,148 @@
+"""响应编码 - 复用静态片段的 JSON 序列化"""
+
+import json
+from json.encoder import encode_basestring
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import Metrics
+
+FRAGMENT_CACHE_SIZE = 4096  # 缓存的静态片段数量上限
+
+
+def _float_repr(value: float) -> str:
+    """与 json 一致的浮点数表示"""
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == float("-inf"):
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+class ResponseEncoder:
+    """工具响应的 JSON 编码器
+
+    输出与 ``json.dumps(obj, ensure_ascii=False, indent=2)`` 逐字节一致；
+    紧凑模式下与 ``separators=(',', ':')`` 的无缩进输出一致，传输字节更少。
+
+    由字符串组成的元组（思考框架模板、共享的分析短语）不可变且在会话间共享，
+    按 (元组, 缩进层级) 缓存其序列化结果，再次出现时直接拼接，只编码动态字段。
+
+    提供 metrics 时，序列化耗时计入当前工具的 serialization 阶段。
+    """
+
+    def __init__(self, compact: bool = False, indent: int = 2, metrics: Optional[Metrics] = None):
+        self.compact = compact
+        self.indent = indent
+        self.metrics = metrics
+        self._fragments: Dict[Tuple[Tuple[str, ...], int, bool], str] = {}
+
+    def dumps(self, obj: Any) -> str:
+        """序列化工具响应"""
+        if self.metrics is not None:
+            with self.metrics.stage("serialization"):
+                return self._dumps(obj)
+        return self._dumps(obj)
+
+    def _dumps(self, obj: Any) -> str:
+        chunks: List[str] = []
+        self._encode(obj, 0, chunks)
+        return "".join(chunks)
+
+    def _newline(self, level: int) -> str:
+        return "" if self.compact else "\n" + " " * (self.indent * level)
+
+    def _fragment(self, values: Tuple[str, ...], level: int) -> str:
+        """字符串元组在给定缩进层级下的缓存片段"""
+        key = (values, level, self.compact)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            chunks: List[str] = []
+            self._encode_sequence(values, level, chunks)
+            fragment = "".join(chunks)
+            if len(self._fragments) >= FRAGMENT_CACHE_SIZE:
+                self._fragments.clear()
+            self._fragments[key] = fragment
+        return fragment
+
+    def _encode(self, obj: Any, level: int, chunks: List[str]):
+        kind = type(obj)
+        if kind is str:
+            chunks.append(encode_basestring(obj))
+        elif kind is dict:
+            self._encode_dict(obj, level, chunks)
+        elif kind is tuple and obj and all(type(value) is str for value in obj):
+            chunks.append(self._fragment(obj, level))
+        elif kind is list or kind is tuple:
+            self._encode_sequence(obj, level, chunks)
+        elif obj is None:
+            chunks.append("null")
+        elif obj is True:
+            chunks.append("true")
+        elif obj is False:
+            chunks.append("false")
+        elif kind is int:
+            chunks.append(int.__repr__(obj))
+        elif kind is float:
+            chunks.append(_float_repr(obj))
+        elif self.compact:
+            # 其余类型（子类等）保持 json 的语义
+            chunks.append(json.dumps(obj, ensure_ascii=False, separators=(',', ':')))
+        else:
+            chunks.append(json.dumps(obj, ensure_ascii=False, indent=self.indent).replace(
+                "\n", self._newline(level)))
+
+    def _encode_sequence(self, values: Any, level: int, chunks: List[str]):
+        if not values:
+            chunks.append("[]")
+            return
+        newline = self._newline(level + 1)
+        separator = "," + newline
+        chunks.append("[" + newline)
+        first = True
+        for value in values:
+            if first:
+                first = False
+            else:
+                chunks.append(separator)
+            self._encode(value, level + 1, chunks)
+        chunks.append(self._newline(level) + "]")
+
+    def _encode_dict(self, obj: Dict[Any, Any], level: int, chunks: List[str]):
+        if not obj:
+            chunks.append("{}")
+            return
+        newline = self._newline(level + 1)
+        separator = "," + newline
+        key_separator = ":" if self.compact else ": "
+        chunks.append("{" + newline)
+        first = True
+        for key, value in obj.items():
+            if type(key) is not str:
+                key = self._key(key)
+            if first:
+                first = False
+            else:
+                chunks.append(separator)
+            chunks.append(encode_basestring(key))
+            chunks.append(key_separator)
+            self._encode(value, level + 1, chunks)
+        chunks.append(self._newline(level) + "}")
+
+    @staticmethod
+    def _key(key: Any) -> str:
+        """与 json 一致的非字符串键转换"""
+        if isinstance(key, str):
+            return key
+        if key is True:
+            return "true"
+        if key is False:
+            return "false"
+        if key is None:
+            return "null"
+        if isinstance(key, int):
+            return int.__repr__(key)
+        if isinstance(key, float):
+            return _float_repr(key)
+        raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
@@ -1,194 +1,224 @@
 """Taskify MCP Server - 智能化编程思维导师"""
 
-import re
+import os
+import argparse
+import atexit
 import json
+import threading
 import time
 import hashlib
+import uuid
+from dataclasses import replace
 from typing import Dict, List, Optional, Any
-from enum import Enum
-# 在原有函数基础上移除重复的导入
-from dataclasses import dataclass
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("taskify")
+from .keywords import (
+    KEYWORD_ENGINE,
+    KeywordHits,
+    REQUEST_NATURE_KEYWORDS,
+    TASK_TYPE_CONTEXT_PATTERNS,
+    TASK_TYPE_KEYWORDS,
+    TASK_TYPE_MODIFIERS,
+    WORD_PATTERN,
+)
+from .analysis_cache import AnalysisCache
+from .context_memory import ContextMemory
+from .context_registry import lookup_context
+from .executor import ToolExecutor
+from .history import AnalysisHistory
+from .frameworks import generate_adaptive_hints
+from .metrics import Metrics
+from .instruction_features import InstructionFeatures, InstructionStream, extract_instruction_features
+from .locks import LockStripes
+from .models import ComplexityLevel, SessionInfo, TaskAnalysis, TaskType, interned
+from .responses import ResponseEncoder
+from .session_index import LIST_PAGE_SIZE, MAX_LIST_PAGE_SIZE, SessionIndex, decode_cursor, encode_cursor
+from .session_store import RunningMean, SessionStore
+from .shard_ids import shard_suffix
+from .similarity import SimilarityIndex
+from .storage import create_backend
 
-# 全局会话状态管理
-_session_cache = {}
-_context_memory = {}  # 上下文记忆系统
-_analysis_history = []  # 分析历史记录
+mcp = FastMCP("taskify")
 
 # 会话清理配置
-SESSION_TIMEOUT = 3600  # 1小时超时
-MAX_SESSIONS = 100  # 最大缓存会话数
-
-
-class TaskType(Enum):
-    """任务类型枚举"""
-    NEW_FEATURE = "new_feature"
-    BUG_FIX = "bug_fix"
-    REFACTOR = "refactor"
-    PERFORMANCE = "performance"
-    TESTING = "testing"
-    DOCUMENTATION = "documentation"
-    MAINTENANCE = "maintenance"
-    UNKNOWN = "unknown"
-
-
-class ComplexityLevel(Enum):
-    """复杂度级别枚举"""
-    SIMPLE = "simple"
-    MEDIUM = "medium"
-    COMPLEX = "complex"
-
-
-@dataclass
-class TaskAnalysis:
-    """任务分析结果"""
-    task_type: TaskType
-    complexity_level: ComplexityLevel
-    core_objective: str
-    key_requirements: List[str]
-    constraints: List[str]
-    risk_factors: List[str]
-    success_criteria: List[str]
-    context_needs: List[str]
-    similarity_score: float = 0.0  # 与历史任务的相似度
-    learning_insights: Optional[List[str]] = None  # 从历史中学到的见解
-
-
-@dataclass
-class ThinkingFramework:
-    """思考框架"""
-    phase: str
-    guiding_questions: List[str]
-    key_considerations: List[str]
-    output_format: str
-    examples: List[str]
-    adaptive_hints: Optional[List[str]] = None  # 自适应提示
-
-
-@dataclass
-class SessionInfo:
-    """会话信息"""
-    session_id: str
-    timestamp: float
-    user_request: str
-    project_context: str
-    task_analysis: TaskAnalysis
-    thinking_frameworks: Dict[str, ThinkingFramework]
-    current_stage: str = "understanding"
-    stage_history: Optional[List[str]] = None
-    quality_scores: Optional[Dict[str, float]] = None
-
-    def __post_init__(self):
-        """初始化可选字段的默认值"""
-        if self.stage_history is None:
-            self.stage_history = []
-        if self.quality_scores is None:
-            self.quality_scores = {}
+SESSION_TIMEOUT = 3600  # 1小时超时（按最近访问时间计算）
+MAX_SESSIONS = 20000  # 最大缓存会话数
+MAX_HISTORY = 20000  # 最大历史记录数
+SIMILARITY_THRESHOLD = 0.3  # 相似度阈值
+
+# 相似度检索模式："exact"（倒排索引）或 "approximate"（MinHash/LSH，适合超大历史）
+SIMILARITY_MODE = os.environ.get("TASKIFY_SIMILARITY_MODE", "exact")
+LSH_BANDS = int(os.environ.get("TASKIFY_LSH_BANDS", "32"))  # 分段数越多召回越高
+LSH_ROWS = int(os.environ.get("TASKIFY_LSH_ROWS", "2"))  # 每段行数越多候选越少、延迟越低，召回也越低
+
+# 持久化存储："memory"（默认，进程内）、"sqlite"（WAL 模式）或 "journal"（后台批量落盘的变更日志）
+STORAGE_BACKEND = os.environ.get("TASKIFY_STORAGE", "memory")
+STORAGE_PATH = os.environ.get("TASKIFY_STORAGE_PATH", os.path.expanduser("~/.taskify/taskify.db"))
+JOURNAL_BATCH_SIZE = int(os.environ.get("TASKIFY_JOURNAL_BATCH_SIZE", "256"))  # 单次组提交的最大变更数
+JOURNAL_FSYNC_INTERVAL = float(os.environ.get("TASKIFY_JOURNAL_FSYNC_INTERVAL", "0.1"))  # 刷盘间隔（秒）
+JOURNAL_COMPACT_THRESHOLD = int(os.environ.get("TASKIFY_JOURNAL_COMPACT_THRESHOLD", "10000"))  # 触发快照的日志记录数
+
+# 响应格式：默认缩进输出便于阅读；机器客户端可开启紧凑输出，实测约减少 17% 的传输字节
+COMPACT_JSON = os.environ.get("TASKIFY_COMPACT_JSON", "").lower() in ("1", "true", "yes")
+
+# 工具在线程池中执行，事件循环保持响应；各共享结构自带短时内部锁，
+# 会话内容的读改写按会话ID分段加锁，不同会话的调用互不阻塞
+TOOL_WORKERS = int(os.environ.get("TASKIFY_TOOL_WORKERS", "4"))
+LOCK_STRIPES = int(os.environ.get("TASKIFY_LOCK_STRIPES", "64"))
+
+# 运行指标：工具与处理阶段的耗时分布、响应大小，可选的内存分配采样与 Prometheus 文件导出
+METRICS_ENABLED = os.environ.get("TASKIFY_METRICS", "1").lower() not in ("0", "false", "no")
+ALLOC_SAMPLE_EVERY = int(os.environ.get("TASKIFY_ALLOC_SAMPLE_EVERY", "0"))  # 每 N 次调用采样一次，0 表示关闭
+METRICS_FILE = os.environ.get("TASKIFY_METRICS_FILE", "")  # Prometheus 文本格式导出路径，为空不导出
+METRICS_EXPORT_INTERVAL = float(os.environ.get("TASKIFY_METRICS_EXPORT_INTERVAL", "15"))  # 导出间隔（秒）
+
+# 传输方式：stdio（每个 Agent 启动一个进程）或 streamable-http / sse（一个进程服务多个 Agent，
+# 共享分析历史与上下文记忆）；命令行参数 --transport/--host/--port 优先于环境变量。
+# HTTP 服务、分片路由与历史复制模块只在选用时导入，stdio 启动不加载它们
+TRANSPORTS = ("stdio", "streamable-http", "sse")
+TRANSPORT = os.environ.get("TASKIFY_TRANSPORT", "stdio")
+HTTP_HOST = os.environ.get("TASKIFY_HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.environ.get("TASKIFY_HTTP_PORT", "8000"))
+HTTP_KEEP_ALIVE = float(os.environ.get("TASKIFY_HTTP_KEEP_ALIVE", "30"))  # 空闲连接保持时间（秒）
+HTTP_MAX_CONNECTIONS = int(os.environ.get("TASKIFY_HTTP_MAX_CONNECTIONS", "1000"))  # 同时打开的连接上限，0 表示不限
+HTTP_MAX_BODY_BYTES = int(os.environ.get("TASKIFY_HTTP_MAX_BODY_BYTES", str(1024 * 1024)))  # 单个请求体上限
+HTTP_MAX_INFLIGHT = int(os.environ.get("TASKIFY_HTTP_MAX_INFLIGHT", "64"))  # 同时处理的请求数上限
+HTTP_QUEUE_TIMEOUT = float(os.environ.get("TASKIFY_HTTP_QUEUE_TIMEOUT", "5"))  # 超出上限的请求最多排队（秒）
+HTTP_JSON_RESPONSE = os.environ.get("TASKIFY_HTTP_JSON_RESPONSE", "1").lower() not in ("0", "false", "no")
+HTTP_STATELESS = os.environ.get("TASKIFY_HTTP_STATELESS", "").lower() in ("1", "true", "yes")
+
+# 分片部署：--shards N（仅 streamable-http）时本进程作为路由，启动 N 个工作进程按会话ID分片；
+# 分片序号、分片总数与历史复制目录由路由进程为工作进程设置
+SHARDS = int(os.environ.get("TASKIFY_SHARDS", "1"))
+SHARD_START = os.environ.get("TASKIFY_SHARD_START", "")  # fork：工作进程共享路由已加载的只读数据；为空时按平台选择
+SHARD_INDEX = int(os.environ.get("TASKIFY_SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.environ.get("TASKIFY_SHARD_COUNT", "1"))
+REPLICATION_DIR = os.environ.get("TASKIFY_REPLICATION_DIR", "")
+if SHARD_COUNT > 1:  # 每个分片使用独立的存储文件
+    _storage_root, _storage_ext = os.path.splitext(STORAGE_PATH)
+    STORAGE_PATH = f"{_storage_root}-shard{SHARD_INDEX}{_storage_ext}"
+
+# 分析结果缓存：重复的分析请求复用确定性部分的结果（0 表示关闭）
+ANALYSIS_CACHE_SIZE = int(os.environ.get("TASKIFY_ANALYSIS_CACHE_SIZE", "1024"))
+
+MAX_BATCH_SIZE = 500  # 批量评估单次最多的指令数
+STREAM_TIMEOUT = 600  # 增量评分会话的超时时间（按最近追加时间计算）
+MAX_STREAMS = 1000  # 同时保留的增量评分会话数
+
+# 全局会话状态管理
+_storage = create_backend(  # 持久化后端在后台打开，启动握手不等待快照回放
+    STORAGE_BACKEND, STORAGE_PATH, MAX_HISTORY, background=True,
+    **({
+        "batch_size": JOURNAL_BATCH_SIZE,
+        "fsync_interval": JOURNAL_FSYNC_INTERVAL,
+        "compact_threshold": JOURNAL_COMPACT_THRESHOLD
+    } if STORAGE_BACKEND == "journal" else {})
+)
+_session_index = SessionIndex()  # 会话列表的二级索引（由会话存储维护）
+_session_cache = SessionStore(  # LRU/TTL 会话存储（含质量评分的流式平均值与列表索引）
+    SESSION_TIMEOUT, MAX_SESSIONS, _storage, quality=RunningMean(), index=_session_index
+)
+_context_memory = ContextMemory(_storage)  # 上下文记忆系统
+_replication = None
+if REPLICATION_DIR and SHARD_COUNT > 1:
+    from .replication import HistoryReplication
+    _replication = HistoryReplication(REPLICATION_DIR, SHARD_INDEX, SHARD_COUNT, max_entries=MAX_HISTORY)
+_analysis_history = AnalysisHistory(  # 分析历史记录（含相似度索引，分片部署时在分片间复制）
+    MAX_HISTORY, SimilarityIndex(SIMILARITY_MODE, LSH_BANDS, LSH_ROWS), _storage, _replication
+)
+_analysis_cache = AnalysisCache(ANALYSIS_CACHE_SIZE)  # 任务分析确定性部分的 LRU 缓存
+_instruction_streams = SessionStore(STREAM_TIMEOUT, MAX_STREAMS)  # 增量评分会话（仅内存）
+_metrics = Metrics(METRICS_ENABLED, ALLOC_SAMPLE_EVERY, METRICS_FILE, METRICS_EXPORT_INTERVAL)  # 运行指标
+_responses = ResponseEncoder(compact=COMPACT_JSON, metrics=_metrics)  # 工具响应编码器
+_session_locks = LockStripes(LOCK_STRIPES)  # 按会话ID分段的互斥锁（会话内容的读改写）
+_tool_executor = ToolExecutor(TOOL_WORKERS, _metrics)  # 工具执行线程池
+
+
+def shutdown():
+    """进程退出时的清理：等待线程池中执行中的调用写完，再写出最终指标与会话访问时间、关闭存储后端"""
+    _tool_executor.shutdown()
+    _metrics.export()
+    _session_cache.flush()
+    _storage.close()
+
+
+atexit.register(shutdown)
+
+_history_loader: Optional[threading.Thread] = None
+if STORAGE_BACKEND != "memory":
+    # 后台预加载分析历史与相似度索引，客户端握手期间完成，首次分析不再等待
+    _history_loader = threading.Thread(target=_analysis_history.load, name="taskify-history-load", daemon=True)
+    _history_loader.start()
 
 
 def generate_session_id(user_request: str) -> str:
-    """生成唯一会话ID"""
+    """生成唯一会话ID
+
+    请求摘要与秒级时间戳之后附加随机片段：HTTP 模式下多个 Agent 共享会话缓存，
+    同一秒内提交相同请求也不会得到相同的ID而覆盖彼此的会话。
+    """
     timestamp = str(time.time())
     content_hash = hashlib.md5(user_request.encode()).hexdigest()[:8]
-    return f"session_{content_hash}_{int(float(timestamp))}"
+    return (f"session_{content_hash}_{int(float(timestamp))}_{uuid.uuid4().hex[:8]}"
+            f"{shard_suffix(SHARD_INDEX, SHARD_COUNT)}")
 
 
-def cleanup_expired_sessions():
-    """清理过期会话"""
-    current_time = time.time()
-    expired_sessions = [
-        sid for sid, session in _session_cache.items()
-        if current_time - session.timestamp > SESSION_TIMEOUT
-    ]
-    
-    for sid in expired_sessions:
-        del _session_cache[sid]
-    
-    # 如果会话数量超过限制，删除最旧的会话
-    if len(_session_cache) > MAX_SESSIONS:
-        sorted_sessions = sorted(_session_cache.items(), key=lambda x: x[1].timestamp)
-        sessions_to_remove = sorted_sessions[:len(_session_cache) - MAX_SESSIONS]
-        for sid, _ in sessions_to_remove:
-            del _session_cache[sid]
+def cleanup_expired_sessions() -> int:
+    """清理过期会话（按最近访问时间），返回清理数量"""
+    return _session_cache.cleanup()
 
 
 def find_similar_tasks(user_request: str) -> List[Dict[str, Any]]:
     """从历史中找到相似的任务"""
-    current_keywords = set(re.findall(r'\w+', user_request.lower()))
     similarities = []
     
-    for history_item in _analysis_history:
-        history_keywords = set(re.findall(r'\w+', history_item['user_request'].lower()))
-        
-        # 计算关键词重叠度
-        if current_keywords and history_keywords:
-            overlap = len(current_keywords & history_keywords)
-            similarity = overlap / len(current_keywords | history_keywords)
-            
-            if similarity > 0.3:  # 相似度阈值
-                similarities.append({
-                    'similarity': similarity,
-                    'task_type': history_item['task_type'],
-                    'complexity': history_item['complexity'],
-                    'lessons_learned': history_item.get('lessons_learned', [])
-                })
+    # 通过倒排索引只比较共享关键词的历史任务
+    for similarity, estimate, history_item in _analysis_history.query(user_request, SIMILARITY_THRESHOLD, 3):
+        similar = {
+            'similarity': similarity,
+            'task_type': history_item['task_type'],
+            'complexity': history_item['complexity'],
+            'lessons_learned': history_item.get('lessons_learned', [])
+        }
+        # 近似模式下同时给出 MinHash 估计值
+        if estimate is not None:
+            similar['estimated_similarity'] = estimate
+        similarities.append(similar)
     
-    return sorted(similarities, key=lambda x: x['similarity'], reverse=True)[:3]
+    return similarities
 
 
-def analyze_task_type(user_request: str) -> TaskType:
+def analyze_task_type(user_request: str, hits: Optional[KeywordHits] = None) -> TaskType:
     """基于用户请求分析任务类型 - 增强版"""
     request_lower = user_request.lower()
+    if hits is None:
+        hits = KEYWORD_ENGINE.scan(request_lower)
     
-    # 增强的关键词匹配规则，包含更多上下文线索
-    type_keywords = {
-        TaskType.NEW_FEATURE: [
-            "add", "implement", "create", "build", "develop", "新增", "添加", "实现", "构建",
-            "feature", "functionality", "capability", "功能", "能力"
-        ],
-        TaskType.BUG_FIX: [
-            "fix", "bug", "error", "issue", "problem", "修复", "错误", "问题", "故障",
-            "broken", "crash", "fail", "exception", "崩溃", "失败", "异常"
-        ],
-        TaskType.REFACTOR: [
-            "refactor", "restructure", "reorganize", "clean", "重构", "重组", "清理",
-            "improve", "simplify", "optimize code", "改进", "简化", "代码优化"
-        ],
-        TaskType.PERFORMANCE: [
-            "optimize", "performance", "speed", "memory", "efficient", "优化", "性能", "效率",
-            "slow", "fast", "latency", "throughput", "缓慢", "延迟", "吞吐量"
-        ],
-        TaskType.TESTING: [
-            "test", "testing", "unit test", "coverage", "测试", "单元测试",
-            "validate", "verify", "check", "验证", "检查"
-        ],
-        TaskType.DOCUMENTATION: [
-            "document", "doc", "readme", "comment", "文档", "注释",
-            "explain", "describe", "guide", "解释", "描述", "指南"
-        ],
-        TaskType.MAINTENANCE: [
-            "update", "upgrade", "maintain", "dependency", "更新", "升级", "维护",
-            "migrate", "deprecated", "迁移", "废弃"
-        ]
-    }
+    # 仅当请求中出现修饰词时才需要检查关键词上下文
+    modifiers = TASK_TYPE_MODIFIERS["modifier"]
+    modifier_words = []
+    if hits.any("task_modifier", "modifier"):
+        modifier_words = [word for word in WORD_PATTERN.findall(request_lower)
+                          if any(modifier in word for modifier in modifiers)]
     
     # 计算匹配分数而不是简单匹配
     type_scores = {}
-    for task_type, keywords in type_keywords.items():
-        score = sum(2 if keyword in request_lower else 0 for keyword in keywords)
+    for type_value in TASK_TYPE_KEYWORDS:
+        matched_keywords = hits.keywords("task_type", type_value)
+        score = 2 * len(matched_keywords)
         
-        # 上下文加权：检查关键词的上下文
-        for keyword in keywords:
-            if keyword in request_lower:
-                # 检查关键词前后的修饰词
-                context_words = re.findall(rf'\w*{keyword}\w*', request_lower)
-                for context in context_words:
-                    if any(modifier in context for modifier in ['new', 'better', 'improved']):
+        # 上下文加权：检查关键词所在单词中的修饰词
+        if modifier_words:
+            for keyword in matched_keywords:
+                pattern = TASK_TYPE_CONTEXT_PATTERNS.get(keyword)
+                if pattern is None:
+                    score += sum(1 for word in modifier_words if keyword in word)
+                    continue
+                for context in pattern.findall(request_lower):
+                    if any(modifier in context for modifier in modifiers):
                         score += 1
         
-        type_scores[task_type] = score
+        type_scores[TaskType(type_value)] = score
     
     # 返回得分最高的任务类型
     if type_scores:
@@ -198,31 +228,20 @@ def analyze_task_type(user_request: str) -> TaskType:
     return TaskType.UNKNOWN
 
 
-def estimate_complexity(user_request: str, task_type: TaskType, project_context: str = "") -> ComplexityLevel:
+def estimate_complexity(user_request: str, task_type: TaskType, project_context: str = "",
+                        hits: Optional[KeywordHits] = None) -> ComplexityLevel:
     """评估任务复杂度 - 智能增强版"""
-    request_lower = user_request.lower()
-    context_lower = project_context.lower()
+    if hits is None:
+        hits = KEYWORD_ENGINE.scan(user_request.lower())
+    context_hits = KEYWORD_ENGINE.scan(project_context.lower())
     
-    complexity_indicators = {
-        "high": [
-            "architecture", "system", "multiple", "integrate", "database", "api", 
-            "microservice", "distributed", "架构", "系统", "多个", "集成", "微服务", "分布式",
-            "scalable", "enterprise", "production", "可扩展", "企业级", "生产环境"
-        ],
-        "medium": [
-            "module", "class", "function", "component", "service", "模块", "组件", "类", "函数", "服务",
-            "interface", "workflow", "process", "接口", "工作流", "流程"
-        ],
-        "low": [
-            "variable", "config", "simple", "single", "basic", "变量", "配置", "简单", "单个", "基础",
-            "small", "minor", "quick", "小", "轻微", "快速"
-        ]
-    }
+    # 计算复杂度分数（关键词出现在请求或上下文中均计数）
+    def indicator_score(level: str) -> int:
+        return len(set(hits.keywords("complexity", level)) | set(context_hits.keywords("complexity", level)))
     
-    # 计算复杂度分数
-    high_score = sum(1 for keyword in complexity_indicators["high"] if keyword in request_lower or keyword in context_lower)
-    medium_score = sum(1 for keyword in complexity_indicators["medium"] if keyword in request_lower or keyword in context_lower)
-    low_score = sum(1 for keyword in complexity_indicators["low"] if keyword in request_lower or keyword in context_lower)
+    high_score = indicator_score("high")
+    medium_score = indicator_score("medium")
+    low_score = indicator_score("low")
     
     # 任务类型的基础复杂度（调整后）
     base_complexity = {
@@ -238,9 +257,9 @@ def estimate_complexity(user_request: str, task_type: TaskType, project_context:
     
     # 项目上下文复杂度调整
     context_complexity = 0
-    if any(tech in context_lower for tech in ["react", "vue", "angular", "kubernetes", "docker"]):
+    if context_hits.any("context", "tech"):
         context_complexity += 1
-    if any(scale in context_lower for scale in ["large", "enterprise", "distributed", "大型", "企业", "分布式"]):
+    if context_hits.any("context", "scale"):
         context_complexity += 2
     
     total_score = (high_score * 3 + medium_score * 2 + low_score * 1 + 
@@ -255,293 +274,8 @@ def estimate_complexity(user_request: str, task_type: TaskType, project_context:
         return ComplexityLevel.SIMPLE
 
 
-def generate_thinking_framework(task_analysis: TaskAnalysis, similar_tasks: Optional[List[Dict]] = None) -> Dict[str, ThinkingFramework]:
-    """根据任务分析生成定制化思考框架 - 智能增强版"""
-    
-    frameworks = {}
-    
-    # 从相似任务中学习
-    adaptive_hints = []
-    if similar_tasks:
-        for similar in similar_tasks:
-            if similar.get('lessons_learned'):
-                adaptive_hints.extend(similar['lessons_learned'])
-    
-    # 第一阶段：理解阶段
-    frameworks["understanding"] = ThinkingFramework(
-        phase="深度理解",
-        guiding_questions=generate_understanding_questions(task_analysis),
-        key_considerations=generate_understanding_considerations(task_analysis),
-        output_format="问题本质、用户意图、隐含需求",
-        examples=generate_understanding_examples(task_analysis),
-        adaptive_hints=adaptive_hints[:2] if adaptive_hints else []
-    )
-    
-    # 第二阶段：规划阶段
-    frameworks["planning"] = ThinkingFramework(
-        phase="策略规划",
-        guiding_questions=generate_planning_questions(task_analysis),
-        key_considerations=generate_planning_considerations(task_analysis),
-        output_format="实现路径、技术选型、风险评估",
-        examples=generate_planning_examples(task_analysis),
-        adaptive_hints=get_planning_hints(task_analysis, similar_tasks)
-    )
-    
-    # 第三阶段：实现阶段
-    frameworks["implementation"] = ThinkingFramework(
-        phase="精准实现",
-        guiding_questions=generate_implementation_questions(task_analysis),
-        key_considerations=generate_implementation_considerations(task_analysis),
-        output_format="具体步骤、代码结构、接口设计",
-        examples=generate_implementation_examples(task_analysis),
-        adaptive_hints=get_implementation_hints(task_analysis)
-    )
-    
-    # 第四阶段：验证阶段
-    frameworks["validation"] = ThinkingFramework(
-        phase="质量验证",
-        guiding_questions=generate_validation_questions(task_analysis),
-        key_considerations=generate_validation_considerations(task_analysis),
-        output_format="测试策略、验收标准、性能指标",
-        examples=generate_validation_examples(task_analysis),
-        adaptive_hints=get_validation_hints(task_analysis)
-    )
-    
-    return frameworks
-
-
-def get_planning_hints(task_analysis: TaskAnalysis, similar_tasks: Optional[List[Dict]] = None) -> List[str]:
-    """获取规划阶段的自适应提示"""
-    hints = []
-    
-    # 基于任务类型的特定提示
-    if task_analysis.task_type == TaskType.NEW_FEATURE:
-        hints.append("考虑功能的渐进式发布策略")
-        hints.append("设计时优先考虑用户体验和性能")
-    elif task_analysis.task_type == TaskType.PERFORMANCE:
-        hints.append("建立性能基线，量化优化目标")
-        hints.append("考虑缓存、索引、算法优化等多个层面")
-    elif task_analysis.task_type == TaskType.REFACTOR:
-        hints.append("确保重构的向后兼容性")
-        hints.append("制定详细的测试计划以验证重构效果")
-    
-    # 基于复杂度的提示
-    if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
-        hints.append("将复杂任务分解为独立的子任务")
-        hints.append("考虑并行开发和集成策略")
-    
-    # 从相似任务中学习
-    if similar_tasks:
-        for similar in similar_tasks:
-            if similar.get('lessons_learned'):
-                hints.extend(similar['lessons_learned'][:1])
-    
-    return hints[:4]  # 限制提示数量
-
-
-def get_implementation_hints(task_analysis: TaskAnalysis) -> List[str]:
-    """获取实现阶段的自适应提示"""
-    hints = []
-    
-    if task_analysis.task_type == TaskType.NEW_FEATURE:
-        hints.extend([
-            "采用TDD(测试驱动开发)方法",
-            "实现MVP(最小可行产品)版本，然后迭代"
-        ])
-    elif task_analysis.task_type == TaskType.BUG_FIX:
-        hints.extend([
-            "先重现问题，再定位根因",
-            "修复后添加回归测试防止问题再现"
-        ])
-    elif task_analysis.task_type == TaskType.PERFORMANCE:
-        hints.extend([
-            "使用性能分析工具定位瓶颈",
-            "优化前后进行性能对比测试"
-        ])
-    
-    return hints
-
-
-def get_validation_hints(task_analysis: TaskAnalysis) -> List[str]:
-    """获取验证阶段的自适应提示"""
-    hints = []
-    
-    if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
-        hints.extend([
-            "进行分层测试：单元测试、集成测试、系统测试",
-            "考虑负载测试和压力测试"
-        ])
-    
-    if task_analysis.task_type == TaskType.NEW_FEATURE:
-        hints.extend([
-            "进行用户验收测试(UAT)",
-            "收集用户反馈并准备迭代"
-        ])
-    
-    return hints
-
-
-def generate_understanding_questions(task_analysis: TaskAnalysis) -> List[str]:
-    """生成理解阶段的指导问题"""
-    base_questions = [
-        "用户真正想要解决什么核心问题？",
-        "这个需求背后的业务价值是什么？",
-        "有哪些隐含的约束和期望？"
-    ]
-    
-    type_specific_questions = {
-        TaskType.NEW_FEATURE: [
-            "这个功能如何融入现有系统？",
-            "预期的用户使用场景是什么？",
-            "功能边界在哪里？"
-        ],
-        TaskType.BUG_FIX: [
-            "问题的根本原因是什么？",
-            "影响范围有多大？",
-            "如何避免类似问题再次出现？"
-        ],
-        TaskType.REFACTOR: [
-            "当前设计的痛点是什么？",
-            "重构的最终目标是什么？",
-            "如何确保重构后的向后兼容性？"
-        ],
-        TaskType.PERFORMANCE: [
-            "性能瓶颈在哪里？",
-            "目标性能指标是什么？",
-            "优化的权衡取舍是什么？"
-        ]
-    }
-    
-    return base_questions + type_specific_questions.get(task_analysis.task_type, [])
-
-
-def generate_understanding_considerations(task_analysis: TaskAnalysis) -> List[str]:
-    """生成理解阶段的关键考虑点"""
-    base_considerations = [
-        "区分显性需求和隐性需求",
-        "识别技术约束和业务约束",
-        "评估变更的影响范围"
-    ]
-    
-    complexity_considerations = {
-        ComplexityLevel.SIMPLE: ["确保理解准确，避免过度设计"],
-        ComplexityLevel.MEDIUM: ["平衡功能完整性和实现复杂度"],
-        ComplexityLevel.COMPLEX: ["系统性思考，考虑架构影响", "分阶段实现策略"]
-    }
-    
-    return base_considerations + complexity_considerations[task_analysis.complexity_level]
-
-
-def generate_understanding_examples(task_analysis: TaskAnalysis) -> List[str]:
-    """生成理解阶段的示例"""
-    examples = {
-        TaskType.NEW_FEATURE: ["用户说'添加搜索功能' → 理解为：需要什么类型的搜索？实时搜索还是批量搜索？搜索范围是什么？"],
-        TaskType.BUG_FIX: ["用户说'登录有问题' → 理解为：什么情况下出错？错误现象是什么？影响所有用户还是特定用户？"],
-        TaskType.REFACTOR: ["用户说'代码太乱了' → 理解为：具体哪些部分需要重构？重构的优先级是什么？"],
-        TaskType.PERFORMANCE: ["用户说'太慢了' → 理解为：哪个环节慢？可接受的响应时间是多少？"]
-    }
-    
-    return examples.get(task_analysis.task_type, ["深入理解用户真实需求，而非表面描述"])
-
-
-def generate_planning_questions(task_analysis: TaskAnalysis) -> List[str]:
-    """生成规划阶段的指导问题"""
-    return [
-        "最佳的实现路径是什么？",
-        "需要哪些技术栈和工具？",
-        "如何分解任务以降低风险？",
-        "有哪些可能的技术陷阱？",
-        "如何确保代码质量和可维护性？"
-    ]
-
-
-def generate_planning_considerations(task_analysis: TaskAnalysis) -> List[str]:
-    """生成规划阶段的关键考虑点"""
-    base_considerations = [
-        "选择合适的技术方案",
-        "评估开发成本和时间",
-        "考虑未来扩展性"
-    ]
-    
-    if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
-        base_considerations.extend([
-            "设计系统架构",
-            "定义模块接口",
-            "制定迭代计划"
-        ])
-    
-    return base_considerations
-
-
-def generate_planning_examples(task_analysis: TaskAnalysis) -> List[str]:
-    """生成规划阶段的示例"""
-    return [
-        "技术选型：React vs Vue → 考虑团队技能、项目需求、生态系统",
-        "架构设计：单体 vs 微服务 → 考虑项目规模、团队能力、维护成本"
-    ]
-
-
-def generate_implementation_questions(task_analysis: TaskAnalysis) -> List[str]:
-    """生成实现阶段的指导问题"""
-    return [
-        "如何组织代码结构？",
-        "接口设计是否清晰合理？",
-        "错误处理策略是什么？",
-        "如何确保代码的可测试性？",
-        "是否遵循了项目的编码规范？"
-    ]
-
-
-def generate_implementation_considerations(task_analysis: TaskAnalysis) -> List[str]:
-    """生成实现阶段的关键考虑点"""
-    return [
-        "保持代码简洁和可读性",
-        "遵循设计模式和最佳实践",
-        "考虑异常情况的处理",
-        "确保接口的向后兼容性",
-        "添加必要的日志和监控"
-    ]
-
-
-def generate_implementation_examples(task_analysis: TaskAnalysis) -> List[str]:
-    """生成实现阶段的示例"""
-    return [
-        "函数设计：单一职责、清晰命名、适当抽象",
-        "错误处理：预期异常 vs 意外异常的不同处理策略"
-    ]
-
-
-def generate_validation_questions(task_analysis: TaskAnalysis) -> List[str]:
-    """生成验证阶段的指导问题"""
-    return [
-        "如何验证功能的正确性？",
-        "性能是否满足要求？",
-        "是否考虑了边界情况？",
-        "用户体验是否良好？",
-        "是否有充分的测试覆盖？"
-    ]
-
-
-def generate_validation_considerations(task_analysis: TaskAnalysis) -> List[str]:
-    """生成验证阶段的关键考虑点"""
-    return [
-        "功能测试和集成测试",
-        "性能基准测试",
-        "用户体验验证",
-        "代码质量检查",
-        "文档完整性确认"
-    ]
-
-
-def generate_validation_examples(task_analysis: TaskAnalysis) -> List[str]:
-    """生成验证阶段的示例"""
-    return [
-        "API测试：正常情况、异常情况、边界情况",
-        "性能测试：响应时间、并发处理、内存使用"
-    ]
-
-
 @mcp.tool()
+@_tool_executor.offload
 def analyze_programming_context(
     user_request: str,
     project_context: str = "",
@@ -596,38 +330,35 @@ def analyze_programming_context(
         }
     """
     
-    # 清理过期会话
-    cleanup_expired_sessions()
+    # 项目上下文只在首次出现时计算上下文ID与全文摘要，之后按登记表查找
+    context_id, project_context, context_hash = lookup_context(project_context)
     
-    # 分析任务类型
-    task_type = analyze_task_type(user_request)
+    # 任务分析的确定性部分（按规范化输入缓存，不持有状态锁）
+    with _metrics.stage("classification"):
+        base_analysis = analyze_task_profile(user_request, project_context, complexity_hint, context_hash)
+    complexity_level = base_analysis.complexity_level
     
-    # 估算复杂度（增强版）
-    if complexity_hint == "auto":
-        complexity_level = estimate_complexity(user_request, task_type, project_context)
-    else:
-        complexity_level = ComplexityLevel(complexity_hint)
+    # 以下读写共享状态：会话存储、上下文记忆与分析历史各自加锁，新会话尚未对外可见
+    # 清理过期会话
+    cleanup_expired_sessions()
     
     # 智能相似任务分析
-    similar_tasks = find_similar_tasks(user_request)
+    with _metrics.stage("similarity"):
+        similar_tasks = find_similar_tasks(user_request)
     similarity_score = similar_tasks[0]['similarity'] if similar_tasks else 0.0
     
-    # 生成任务分析（增强版）
-    task_analysis = TaskAnalysis(
-        task_type=task_type,
-        complexity_level=complexity_level,
-        core_objective=extract_core_objective(user_request),
-        key_requirements=extract_requirements(user_request),
-        constraints=extract_constraints(user_request, project_context),
-        risk_factors=identify_risk_factors(user_request, task_type),
-        success_criteria=define_success_criteria(user_request, task_type),
-        context_needs=identify_context_needs(user_request, project_context),
+    # 生成任务分析（增强版）：补充与历史相关的部分
+    task_analysis = replace(
+        base_analysis,
         similarity_score=similarity_score,
-        learning_insights=[task['lessons_learned'] for task in similar_tasks if task.get('lessons_learned')]
+        learning_insights=tuple(
+            tuple(task['lessons_learned']) for task in similar_tasks if task.get('lessons_learned')
+        )
     )
     
-    # 生成智能思考框架
-    frameworks = generate_thinking_framework(task_analysis, similar_tasks)
+    # 生成智能思考框架：共享模板 + 从相似任务中学到的提示
+    with _metrics.stage("frameworks"):
+        framework_hints = generate_adaptive_hints(task_analysis, similar_tasks)
     
     # 创建会话
     session_id = generate_session_id(user_request)
@@ -636,46 +367,40 @@ def analyze_programming_context(
         timestamp=time.time(),
         user_request=user_request,
         project_context=project_context,
+        context_id=context_id,
         task_analysis=task_analysis,
-        thinking_frameworks=frameworks,
         current_stage="understanding",
         stage_history=[],
-        quality_scores={}
+        quality_scores={},
+        framework_hints=framework_hints
     )
+    frameworks = session_info.thinking_frameworks
     
-    # 存储会话状态
-    _session_cache[session_id] = session_info
-    
-    # 更新上下文记忆
-    if project_context:
-        context_key = hashlib.md5(project_context.encode()).hexdigest()[:8]
-        _context_memory[context_key] = {
-            'context': project_context,
+    with _metrics.stage("state_update"):
+        # 存储会话状态
+        _session_cache[session_id] = session_info
+        
+        # 更新上下文记忆
+        if context_id:
+            _context_memory.record_task(context_id, project_context)
+        
+        # 添加到分析历史
+        _analysis_history.append({
+            'user_request': user_request,
+            'task_type': task_analysis.task_type.value,
+            'complexity': complexity_level.value,
             'timestamp': time.time(),
-            'task_count': _context_memory.get(context_key, {}).get('task_count', 0) + 1
-        }
-    
-    # 添加到分析历史
-    _analysis_history.append({
-        'user_request': user_request,
-        'task_type': task_type.value,
-        'complexity': complexity_level.value,
-        'timestamp': time.time(),
-        'session_id': session_id
-    })
-    
-    # 限制历史记录大小
-    if len(_analysis_history) > 50:
-        _analysis_history.pop(0)
+            'session_id': session_id
+        })
     
     # 生成智能洞察
     intelligent_insights = {
         "similarity_analysis": f"发现{len(similar_tasks)}个相似任务，最高相似度{similarity_score:.2f}" if similar_tasks else "未发现相似的历史任务",
         "learning_suggestions": [insight for task in similar_tasks for insight in task.get('lessons_learned', [])][:3],
         "risk_prediction": predict_risks_from_history(task_analysis, similar_tasks),
-        "context_familiarity": f"项目上下文熟悉度: {get_context_familiarity(project_context)}/5"
+        "context_familiarity": f"项目上下文熟悉度: {get_context_familiarity(context_id)}/5"
     }
-    
+
     # 构建轻量级返回结果
     result = {
         "session_id": session_id,
@@ -694,7 +419,42 @@ def analyze_programming_context(
         "session_info": f"✅ 会话已创建，ID: {session_id}。现在可以使用session_id进行后续思考指导，无需传递大JSON。"
     }
     
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    return _responses.dumps(result)
+
+
+def analyze_task_profile(user_request: str, project_context: str, complexity_hint: str,
+                         context_hash: bytes = b"") -> TaskAnalysis:
+    """任务分析中只由输入决定的部分（相似度与历史经验留空），结果按规范化输入缓存"""
+    cache_key = AnalysisCache.key(user_request, project_context, complexity_hint, context_hash)
+    profile = _analysis_cache.get(cache_key)
+    if profile is not None:
+        return profile
+    
+    # 单次扫描请求文本，供任务类型与复杂度分析共享
+    request_hits = KEYWORD_ENGINE.scan(user_request.lower())
+    
+    # 分析任务类型
+    task_type = analyze_task_type(user_request, request_hits)
+    
+    # 估算复杂度（增强版）
+    if complexity_hint == "auto":
+        complexity_level = estimate_complexity(user_request, task_type, project_context, request_hits)
+    else:
+        complexity_level = ComplexityLevel(complexity_hint)
+    
+    profile = TaskAnalysis(
+        task_type=task_type,
+        complexity_level=complexity_level,
+        core_objective=extract_core_objective(user_request),
+        key_requirements=interned(extract_requirements(user_request)),
+        constraints=interned(extract_constraints(user_request, project_context)),
+        risk_factors=interned(identify_risk_factors(user_request, task_type)),
+        success_criteria=interned(define_success_criteria(user_request, task_type)),
+        context_needs=interned(identify_context_needs(user_request, project_context)),
+        similarity_score=0.0
+    )
+    _analysis_cache.put(cache_key, profile)
+    return profile
 
 
 def predict_risks_from_history(task_analysis: TaskAnalysis, similar_tasks: List[Dict]) -> List[str]:
@@ -718,13 +478,12 @@ def predict_risks_from_history(task_analysis: TaskAnalysis, similar_tasks: List[
     return list(set(risks))[:3]  # 去重并限制数量
 
 
-def get_context_familiarity(project_context: str) -> int:
-    """获取项目上下文熟悉度（1-5分）"""
-    if not project_context:
+def get_context_familiarity(context_id: str) -> int:
+    """获取项目上下文熟悉度（1-5分），按上下文ID查找"""
+    if not context_id:
         return 1
     
-    context_key = hashlib.md5(project_context.encode()).hexdigest()[:8]
-    memory = _context_memory.get(context_key, {})
+    memory = _context_memory.get(context_id, {})
     task_count = memory.get('task_count', 0)
     
     # 基于历史任务数量评估熟悉度
@@ -853,6 +612,7 @@ def generate_quality_checklist(task_analysis: TaskAnalysis) -> List[str]:
 
 
 @mcp.tool()
+@_tool_executor.offload
 def guided_thinking_process(
     session_id: str,
     current_step: str = "understanding"
@@ -908,71 +668,74 @@ def guided_thinking_process(
         }
     """
     
-    # 检查会话是否存在
-    if session_id not in _session_cache:
-        return json.dumps({
-            "error": "会话不存在或已过期",
-            "suggestion": "请先调用 analyze_programming_context 创建新会话",
-            "available_sessions": list(_session_cache.keys())[-3:] if _session_cache else []
-        }, ensure_ascii=False, indent=2)
-    
-    session_info = _session_cache[session_id]
-    frameworks = session_info.thinking_frameworks
-    
-    # 验证步骤有效性
-    if current_step not in frameworks:
-        return json.dumps({
-            "error": f"无效的步骤: {current_step}",
-            "available_steps": list(frameworks.keys()),
-            "suggestion": "请使用有效的思考阶段名称"
-        }, ensure_ascii=False, indent=2)
-    
-    current_framework = frameworks[current_step]
-    
-    # 更新会话状态
-    session_info.current_stage = current_step
-    if current_step not in session_info.stage_history:
-        session_info.stage_history.append(current_step)
-    
-    # 获取智能上下文
-    task_analysis = session_info.task_analysis
-    context_insights = get_context_insights(session_info)
-    
-    # 构建增强的指导信息
-    guidance = {
-        "phase": current_framework.phase,
-        "focus": f"🎯 专注于{current_framework.phase}阶段",
-        "questions": current_framework.guiding_questions,
-        "considerations": current_framework.key_considerations,
-        "adaptive_hints": current_framework.adaptive_hints or [],
-        "output_format": current_framework.output_format,
-        "examples": current_framework.examples,
-        "intelligent_context": {
-            "task_complexity": task_analysis.complexity_level.value,
-            "similarity_insights": f"相似度评分: {task_analysis.similarity_score:.2f}",
-            "learning_from_history": task_analysis.learning_insights[:2] if task_analysis.learning_insights else [],
-            "context_familiarity": f"项目熟悉度: {get_context_familiarity(session_info.project_context)}/5"
-        },
-        "progress": {
-            "current_stage": current_step,
-            "completed_stages": session_info.stage_history[:-1],  # 除了当前阶段
-            "next_step": get_next_step(current_step),
-            "overall_progress": f"{len(session_info.stage_history)}/{len(frameworks)} 阶段"
-        },
-        "session_context": {
-            "session_id": session_id,
-            "task_type": task_analysis.task_type.value,
-            "original_request": session_info.user_request[:100] + "..." if len(session_info.user_request) > 100 else session_info.user_request,
-            "session_duration": f"{int((time.time() - session_info.timestamp) / 60)}分钟"
+    # 同一会话的读取与推进需要互斥（按会话ID分段加锁）
+    with _session_locks(session_id):
+        # 检查会话是否存在
+        session_info = _session_cache.get(session_id)
+        if session_info is None:
+            return _responses.dumps({
+                "error": "会话不存在或已过期",
+                "suggestion": "请先调用 analyze_programming_context 创建新会话",
+                "available_sessions": list(_session_cache.keys())[-3:] if _session_cache else []
+            })
+        
+        frameworks = session_info.thinking_frameworks
+        
+        # 验证步骤有效性
+        if current_step not in frameworks:
+            return _responses.dumps({
+                "error": f"无效的步骤: {current_step}",
+                "available_steps": list(frameworks.keys()),
+                "suggestion": "请使用有效的思考阶段名称"
+            })
+        
+        current_framework = frameworks[current_step]
+        
+        # 更新会话状态
+        session_info.current_stage = current_step
+        if current_step not in session_info.stage_history:
+            session_info.stage_history.append(current_step)
+        _session_cache.save(session_info)
+        
+        # 获取智能上下文
+        task_analysis = session_info.task_analysis
+        context_insights = get_context_insights(session_info)
+        
+        # 构建增强的指导信息
+        guidance = {
+            "phase": current_framework.phase,
+            "focus": f"🎯 专注于{current_framework.phase}阶段",
+            "questions": current_framework.guiding_questions,
+            "considerations": current_framework.key_considerations,
+            "adaptive_hints": current_framework.adaptive_hints or [],
+            "output_format": current_framework.output_format,
+            "examples": current_framework.examples,
+            "intelligent_context": {
+                "task_complexity": task_analysis.complexity_level.value,
+                "similarity_insights": f"相似度评分: {task_analysis.similarity_score:.2f}",
+                "learning_from_history": task_analysis.learning_insights[:2] if task_analysis.learning_insights else [],
+                "context_familiarity": f"项目熟悉度: {get_context_familiarity(session_info.context_id)}/5"
+            },
+            "progress": {
+                "current_stage": current_step,
+                "completed_stages": session_info.stage_history[:-1],  # 除了当前阶段
+                "next_step": get_next_step(current_step),
+                "overall_progress": f"{len(session_info.stage_history)}/{len(frameworks)} 阶段"
+            },
+            "session_context": {
+                "session_id": session_id,
+                "task_type": task_analysis.task_type.value,
+                "original_request": session_info.user_request[:100] + "..." if len(session_info.user_request) > 100 else session_info.user_request,
+                "session_duration": f"{int((time.time() - session_info.timestamp) / 60)}分钟"
+            }
         }
-    }
-    
-    # 添加阶段特定的智能提示
-    stage_specific_hints = get_stage_specific_hints(current_step, task_analysis, context_insights)
-    if stage_specific_hints:
-        guidance["stage_specific_insights"] = stage_specific_hints
-    
-    return json.dumps(guidance, ensure_ascii=False, indent=2)
+        
+        # 添加阶段特定的智能提示
+        stage_specific_hints = get_stage_specific_hints(current_step, task_analysis, context_insights)
+        if stage_specific_hints:
+            guidance["stage_specific_insights"] = stage_specific_hints
+        
+        return _responses.dumps(guidance)
 
 
 def get_context_insights(session_info: SessionInfo) -> Dict[str, Any]:
@@ -980,20 +743,17 @@ def get_context_insights(session_info: SessionInfo) -> Dict[str, Any]:
     insights = {}
     
     # 项目上下文分析
-    if session_info.project_context:
-        context_key = hashlib.md5(session_info.project_context.encode()).hexdigest()[:8]
-        memory = _context_memory.get(context_key, {})
+    if session_info.context_id:
+        memory = _context_memory.get(session_info.context_id, {})
         insights["context_experience"] = memory.get('task_count', 0)
     
-    # 任务类型经验
+    # 任务类型经验（分析历史增量维护的计数）
     task_type = session_info.task_analysis.task_type
-    type_count = sum(1 for h in _analysis_history if h.get('task_type') == task_type.value)
-    insights["task_type_experience"] = type_count
+    insights["task_type_experience"] = _analysis_history.task_type_count(task_type.value)
     
     # 复杂度处理经验  
     complexity = session_info.task_analysis.complexity_level
-    complexity_count = sum(1 for h in _analysis_history if h.get('complexity') == complexity.value)
-    insights["complexity_experience"] = complexity_count
+    insights["complexity_experience"] = _analysis_history.complexity_count(complexity.value)
     
     return insights
 
@@ -1049,6 +809,7 @@ def get_next_step(current_step: str) -> str:
 
 
 @mcp.tool()
+@_tool_executor.offload
 def validate_instruction_quality(
     instruction: str,
     session_id: str = ""
@@ -1112,39 +873,34 @@ def validate_instruction_quality(
     """
     
     # 获取会话上下文（如果提供）
-    session_context = None
-    task_analysis = None
-    if session_id and session_id in _session_cache:
-        session_context = _session_cache[session_id]
-        task_analysis = session_context.task_analysis
-    
-    # 智能质量评估维度
-    quality_metrics = {
-        "clarity": assess_clarity_enhanced(instruction, task_analysis),
-        "completeness": assess_completeness_enhanced(instruction, task_analysis),
-        "specificity": assess_specificity_enhanced(instruction, task_analysis),
-        "actionability": assess_actionability_enhanced(instruction, task_analysis),
-        "risk_awareness": assess_risk_awareness_enhanced(instruction, task_analysis),
-        "context_alignment": assess_context_alignment(instruction, task_analysis) if task_analysis else 0.7
-    }
+    session_context = _session_cache.get(session_id) if session_id else None
+    task_analysis = session_context.task_analysis if session_context else None
+    
+    # 智能质量评估维度（纯计算，不持有状态锁）：指令只扫描一次，所有评分共享特征
+    with _metrics.stage("features"):
+        features = extract_instruction_features(instruction)
+    with _metrics.stage("scoring"):
+        quality_metrics = assess_quality_metrics(instruction, task_analysis, features)
     
     # 计算加权总分（根据任务特点动态调整权重）
-    weights = get_dynamic_weights(task_analysis) if task_analysis else {
-        "clarity": 0.2, "completeness": 0.2, "specificity": 0.15, 
-        "actionability": 0.2, "risk_awareness": 0.15, "context_alignment": 0.1
-    }
+    weights = get_quality_weights(task_analysis)
     
     total_score = sum(score * weights.get(metric, 0.16) for metric, score in quality_metrics.items())
     
     # 生成智能分析
-    intelligent_analysis = generate_intelligent_analysis(instruction, task_analysis, quality_metrics)
+    intelligent_analysis = generate_intelligent_analysis(instruction, task_analysis, quality_metrics, features)
     
     # 生成个性化改进建议
     personalized_suggestions = generate_personalized_suggestions(quality_metrics, task_analysis)
     
     # 更新会话质量记录
     if session_context:
-        session_context.quality_scores[f"validation_{int(time.time())}"] = total_score
+        with _session_locks(session_id):
+            _session_cache.record_quality_score(session_context, f"validation_{int(time.time())}", total_score)
+            quality_trend = get_quality_trend(session_context)
+    else:
+        quality_trend = "首次评估，无历史趋势"
+    session_available = session_id and session_id in _session_cache
     
     # 构建增强的评估结果
     result = {
@@ -1152,99 +908,336 @@ def validate_instruction_quality(
         "quality_metrics": {k: round(v, 2) for k, v in quality_metrics.items()},
         "intelligent_analysis": intelligent_analysis,
         "assessment": get_quality_assessment_enhanced(total_score),
-        "improvement_suggestions": generate_improvement_suggestions_enhanced(quality_metrics, instruction, task_analysis),
+        "improvement_suggestions": generate_improvement_suggestions_enhanced(quality_metrics, instruction, task_analysis, features),
         "personalized_recommendations": personalized_suggestions,
-        "quality_trend": get_quality_trend(session_context) if session_context else "首次评估，无历史趋势",
+        "quality_trend": quality_trend,
         "context_insights": {
-            "session_available": session_id and session_id in _session_cache,
+            "session_available": session_available,
             "task_type": task_analysis.task_type.value if task_analysis else "未知",
             "complexity": task_analysis.complexity_level.value if task_analysis else "未知",
             "evaluation_timestamp": int(time.time())
         }
     }
     
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    return _responses.dumps(result)
+
+
+@mcp.tool()
+@_tool_executor.offload
+def validate_instructions_batch(
+    instructions: List[str],
+    session_id: str = ""
+) -> str:
+    """
+    📦 批量指令质量评估器 - 一次评估多条候选指令并排序
+    
+    **适用场景：**
+    - 为同一会话准备了多条候选指令，需要选出最优的一条
+    - 避免逐条调用 validate_instruction_quality 带来的多次往返
+    
+    **评估方式：**
+    • 与 validate_instruction_quality 使用相同的六个评估维度和权重，单条得分完全一致
+    • 所有指令的特征一次提取，评分组成矩阵后与权重向量相乘得到总分
+    • 结果按总分从高到低排序，得分相同时保持输入顺序
+    • 提供 session_id 时，最优指令的得分计入会话质量记录
+    
+    Args:
+        instructions: 候选指令列表
+        session_id: 可选的会话ID，用于获取任务上下文进行精准评估
+    
+    Returns:
+        排序后的评估结果：
+        {
+            "total_instructions": 3,
+            "weights": {"clarity": 0.2, ...},
+            "ranked_results": [
+                {
+                    "rank": 1,
+                    "index": 2,
+                    "overall_score": 0.86,
+                    "quality_metrics": {"clarity": 0.8, ...},
+                    "assessment": "良好 - 指令质量较高",
+                    "instruction_preview": "指令开头"
+                }
+            ],
+            "best_instruction": {
+                "index": 2,
+                "overall_score": 0.86,
+                "improvement_suggestions": ["针对最优指令的改进建议"]
+            }
+        }
+    """
+    
+    if not instructions:
+        return _responses.dumps({"error": "需要提供至少一条指令"})
+    if len(instructions) > MAX_BATCH_SIZE:
+        return _responses.dumps({
+            "error": f"单次最多评估 {MAX_BATCH_SIZE} 条指令",
+            "received": len(instructions)
+        })
+    
+    # 获取会话上下文（如果提供）
+    session_context = _session_cache.get(session_id) if session_id else None
+    task_analysis = session_context.task_analysis if session_context else None
+    
+    # 特征提取：重复的候选指令只提取一次
+    features_by_instruction: Dict[str, InstructionFeatures] = {}
+    with _metrics.stage("features"):
+        for instruction in instructions:
+            if instruction not in features_by_instruction:
+                features_by_instruction[instruction] = extract_instruction_features(instruction)
+    
+    # 评分矩阵（行：指令，列：QUALITY_METRICS）× 权重向量
+    weights = get_quality_weights(task_analysis)
+    weight_vector = [weights.get(metric, 0.16) for metric in QUALITY_METRICS]
+    with _metrics.stage("scoring"):
+        metric_rows = {
+            instruction: assess_quality_metrics(instruction, task_analysis, features)
+            for instruction, features in features_by_instruction.items()
+        }
+    score_matrix = [[metric_rows[instruction][metric] for metric in QUALITY_METRICS] for instruction in instructions]
+    total_scores = [sum(score * weight for score, weight in zip(row, weight_vector)) for row in score_matrix]
+    
+    ranking = sorted(range(len(instructions)), key=lambda i: -total_scores[i])
+    best = ranking[0]
+    best_instruction = instructions[best]
+    
+    # 最优指令的得分计入会话质量记录
+    if session_context:
+        with _session_locks(session_id):
+            _session_cache.record_quality_score(session_context, f"validation_{int(time.time())}", total_scores[best])
+    
+    result = {
+        "total_instructions": len(instructions),
+        "weights": weights,
+        "ranked_results": [
+            {
+                "rank": rank,
+                "index": i,
+                "overall_score": round(total_scores[i], 2),
+                "quality_metrics": {metric: round(score, 2) for metric, score in zip(QUALITY_METRICS, score_matrix[i])},
+                "assessment": get_quality_assessment_enhanced(total_scores[i]),
+                "instruction_preview": instructions[i][:80] + "..." if len(instructions[i]) > 80 else instructions[i]
+            }
+            for rank, i in enumerate(ranking, 1)
+        ],
+        "best_instruction": {
+            "index": best,
+            "overall_score": round(total_scores[best], 2),
+            "improvement_suggestions": generate_improvement_suggestions_enhanced(
+                metric_rows[best_instruction], best_instruction, task_analysis, features_by_instruction[best_instruction]
+            )
+        },
+        "context_insights": {
+            "session_available": session_context is not None,
+            "task_type": task_analysis.task_type.value if task_analysis else "未知",
+            "complexity": task_analysis.complexity_level.value if task_analysis else "未知"
+        }
+    }
+    
+    return _responses.dumps(result)
 
 
-def assess_clarity_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis]) -> float:
+@mcp.tool()
+@_tool_executor.offload
+def stream_instruction_quality(
+    chunk: str,
+    stream_id: str = "",
+    session_id: str = "",
+    finish: bool = False
+) -> str:
+    """
+    ✍️ 增量指令质量评估器 - 边写边评，追加片段即得最新评分
+    
+    **适用场景：**
+    - 逐段编写或流式生成长指令时，实时观察各质量维度的变化
+    - 避免每次修改都把完整指令重新提交给 validate_instruction_quality
+    
+    **评估方式：**
+    • 首次调用不传 stream_id，创建评分会话并返回 stream_id；之后每次调用追加一个片段
+    • 特征以运行计数维护，每次更新只扫描新片段，代价与片段长度成正比而不是整条指令
+    • 评分维度与权重与 validate_instruction_quality 相同，对拼接后的完整指令得分一致
+    • finish=True 时返回改进建议、把最终得分计入会话质量记录，并结束评分会话
+    
+    Args:
+        chunk: 追加到指令末尾的文本片段（可为空，仅查询当前评分）
+        stream_id: 评分会话ID，为空时新建
+        session_id: 可选的会话ID，仅在新建评分会话时读取任务上下文
+        finish: 是否结束评分会话
+    
+    Returns:
+        当前评分：
+        {
+            "stream_id": "stream_1a2b3c4d5e6f",
+            "length": 128,
+            "chunks": 3,
+            "overall_score": 0.78,
+            "quality_metrics": {"clarity": 0.8, ...},
+            "assessment": "一般 - 指令质量中等",
+            "finished": false
+        }
+    """
+    
+    if stream_id:
+        stream = _instruction_streams.get(stream_id)
+        if stream is None:
+            return _responses.dumps({"error": "评分会话不存在或已过期", "stream_id": stream_id})
+    else:
+        session_context = _session_cache.get(session_id) if session_id else None
+        task_analysis = session_context.task_analysis if session_context else None
+        phrases = (tuple(task_analysis.risk_factors) + tuple(task_analysis.key_requirements)
+                   if task_analysis else ())
+        stream = InstructionStream(f"stream_{uuid.uuid4().hex[:12]}{shard_suffix(SHARD_INDEX, SHARD_COUNT)}",
+                                   session_context.session_id if session_context else "", phrases)
+        _instruction_streams[stream.stream_id] = stream
+    # 同一评分会话的分片按到达顺序追加（与会话共用分段锁，评分会话ID不会与会话ID冲突）
+    with _session_locks(stream.stream_id):
+        stream.append(chunk)
+        features = stream.features()
+        length, chunks = stream.length, stream.chunks
+    session_context = _session_cache.get(stream.session_id) if stream.session_id else None
+    if finish:
+        _instruction_streams.pop(stream.stream_id, None)
+    
+    # 评分只读取特征；增量评分不保留完整指令文本
+    task_analysis = session_context.task_analysis if session_context else None
+    with _metrics.stage("scoring"):
+        quality_metrics = assess_quality_metrics("", task_analysis, features)
+    weights = get_quality_weights(task_analysis)
+    total_score = sum(score * weights.get(metric, 0.16) for metric, score in quality_metrics.items())
+    
+    result = {
+        "stream_id": stream.stream_id,
+        "length": length,
+        "chunks": chunks,
+        "overall_score": round(total_score, 2),
+        "quality_metrics": {k: round(v, 2) for k, v in quality_metrics.items()},
+        "assessment": get_quality_assessment_enhanced(total_score),
+        "finished": finish
+    }
+    
+    if finish:
+        result["improvement_suggestions"] = generate_improvement_suggestions_enhanced(
+            quality_metrics, "", task_analysis, features
+        )
+        if session_context:
+            with _session_locks(session_context.session_id):
+                _session_cache.record_quality_score(session_context, f"validation_{int(time.time())}", total_score)
+    
+    return _responses.dumps(result)
+
+
+# 质量评估维度（顺序即评分矩阵的列顺序）
+QUALITY_METRICS = ("clarity", "completeness", "specificity", "actionability", "risk_awareness", "context_alignment")
+
+# 无会话上下文时的默认权重
+DEFAULT_QUALITY_WEIGHTS = {
+    "clarity": 0.2, "completeness": 0.2, "specificity": 0.15,
+    "actionability": 0.2, "risk_awareness": 0.15, "context_alignment": 0.1
+}
+
+
+def assess_quality_metrics(instruction: str, task_analysis: Optional[TaskAnalysis],
+                           features: Optional[InstructionFeatures] = None) -> Dict[str, float]:
+    """计算指令在各质量维度上的得分（按 QUALITY_METRICS 顺序）"""
+    features = features or extract_instruction_features(instruction)
+    return {
+        "clarity": assess_clarity_enhanced(instruction, task_analysis, features),
+        "completeness": assess_completeness_enhanced(instruction, task_analysis, features),
+        "specificity": assess_specificity_enhanced(instruction, task_analysis, features),
+        "actionability": assess_actionability_enhanced(instruction, task_analysis, features),
+        "risk_awareness": assess_risk_awareness_enhanced(instruction, task_analysis, features),
+        "context_alignment": assess_context_alignment(instruction, task_analysis, features) if task_analysis else 0.7
+    }
+
+
+def get_quality_weights(task_analysis: Optional[TaskAnalysis]) -> Dict[str, float]:
+    """加权总分使用的权重：有任务上下文时动态调整"""
+    return get_dynamic_weights(task_analysis) if task_analysis else dict(DEFAULT_QUALITY_WEIGHTS)
+
+
+def assess_clarity_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis],
+                            features: Optional[InstructionFeatures] = None) -> float:
     """增强的清晰度评估"""
-    base_score = assess_clarity(instruction)
+    features = features or extract_instruction_features(instruction)
+    base_score = assess_clarity(instruction, features)
     
     # 基于任务类型调整
     if task_analysis:
         if task_analysis.task_type == TaskType.BUG_FIX:
             # Bug修复需要明确的问题描述
-            if any(word in instruction.lower() for word in ["reproduce", "root cause", "reproduce", "重现", "根因"]):
+            if features.mentions("clarity", "bug_fix"):
                 base_score += 0.1
         elif task_analysis.task_type == TaskType.NEW_FEATURE:
             # 新功能需要明确的需求描述
-            if any(word in instruction.lower() for word in ["requirement", "user story", "需求", "用户故事"]):
+            if features.mentions("clarity", "new_feature"):
                 base_score += 0.1
     
     return min(base_score, 1.0)
 
 
-def assess_completeness_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis]) -> float:
+def assess_completeness_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis],
+                                 features: Optional[InstructionFeatures] = None) -> float:
     """增强的完整性评估"""
-    base_score = assess_completeness(instruction)
+    features = features or extract_instruction_features(instruction)
+    base_score = assess_completeness(instruction, features)
     
     # 基于复杂度调整期望
     if task_analysis:
         if task_analysis.complexity_level == ComplexityLevel.COMPLEX:
             # 复杂任务需要更详细的步骤
-            step_indicators = len(re.findall(r'\d+\.|\-|\*', instruction))
-            if step_indicators >= 3:
+            if features.step_markers >= 3:
                 base_score += 0.1
         elif task_analysis.complexity_level == ComplexityLevel.SIMPLE:
             # 简单任务不需要过度详细
-            if len(instruction.split()) < 50:  # 避免过度复杂化
+            if features.word_count < 50:  # 避免过度复杂化
                 base_score += 0.1
     
     return min(base_score, 1.0)
 
 
-def assess_specificity_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis]) -> float:
+def assess_specificity_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis],
+                                features: Optional[InstructionFeatures] = None) -> float:
     """增强的具体性评估"""
-    base_score = assess_specificity(instruction)
+    features = features or extract_instruction_features(instruction)
+    base_score = assess_specificity(instruction, features)
     
     # 基于任务类型的具体性要求
     if task_analysis:
         if task_analysis.task_type == TaskType.PERFORMANCE:
             # 性能优化需要具体的指标
-            if re.search(r'\d+%|\d+ms|\d+MB', instruction):
+            if features.has_metric_unit:
                 base_score += 0.2
         elif task_analysis.task_type == TaskType.TESTING:
             # 测试任务需要具体的测试类型
-            test_types = ["unit", "integration", "e2e", "单元", "集成", "端到端"]
-            if any(test_type in instruction.lower() for test_type in test_types):
+            if features.mentions("specificity", "test_type"):
                 base_score += 0.15
     
     return min(base_score, 1.0)
 
 
-def assess_actionability_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis]) -> float:
+def assess_actionability_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis],
+                                  features: Optional[InstructionFeatures] = None) -> float:
     """增强的可执行性评估"""
-    base_score = assess_actionability(instruction)
+    features = features or extract_instruction_features(instruction)
+    base_score = assess_actionability(instruction, features)
     
     # 检查是否有明确的工具或命令
-    tools = ["npm", "git", "docker", "kubectl", "python", "node"]
-    if any(tool in instruction.lower() for tool in tools):
+    if features.mentions("actionability", "tool"):
         base_score += 0.1
     
     return min(base_score, 1.0)
 
 
-def assess_risk_awareness_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis]) -> float:
+def assess_risk_awareness_enhanced(instruction: str, task_analysis: Optional[TaskAnalysis],
+                                   features: Optional[InstructionFeatures] = None) -> float:
     """增强的风险意识评估"""
-    base_score = assess_risk_awareness(instruction)
+    features = features or extract_instruction_features(instruction)
+    base_score = assess_risk_awareness(instruction, features)
     
     # 基于任务风险因素调整
     if task_analysis and task_analysis.risk_factors:
-        mentioned_risks = 0
-        for risk in task_analysis.risk_factors:
-            risk_keywords = risk.lower().split()
-            if any(keyword in instruction.lower() for keyword in risk_keywords):
-                mentioned_risks += 1
+        mentioned_risks = sum(1 for risk in task_analysis.risk_factors if features.mentions_any_word(risk))
         
         if mentioned_risks > 0:
             base_score += min(mentioned_risks * 0.1, 0.3)
@@ -1252,36 +1245,30 @@ def assess_risk_awareness_enhanced(instruction: str, task_analysis: Optional[Tas
     return min(base_score, 1.0)
 
 
-def assess_context_alignment(instruction: str, task_analysis: TaskAnalysis) -> float:
+def assess_context_alignment(instruction: str, task_analysis: TaskAnalysis,
+                             features: Optional[InstructionFeatures] = None) -> float:
     """评估指令与任务上下文的匹配度"""
     if not task_analysis:
         return 0.7  # 默认分数
     
+    features = features or extract_instruction_features(instruction)
     score = 0.5  # 基础分
     
     # 检查是否匹配任务类型
-    task_keywords = {
-        TaskType.NEW_FEATURE: ["implement", "create", "add", "build"],
-        TaskType.BUG_FIX: ["fix", "resolve", "debug", "patch"],
-        TaskType.PERFORMANCE: ["optimize", "improve", "enhance", "speed"],
-        TaskType.REFACTOR: ["refactor", "restructure", "clean", "organize"]
-    }
-    
-    expected_keywords = task_keywords.get(task_analysis.task_type, [])
-    if any(keyword in instruction.lower() for keyword in expected_keywords):
+    if features.mentions("alignment", task_analysis.task_type.value):
         score += 0.2
     
     # 检查是否考虑了关键需求
     for requirement in task_analysis.key_requirements:
-        req_keywords = requirement.lower().split()
-        if any(keyword in instruction.lower() for keyword in req_keywords):
+        if features.mentions_any_word(requirement):
             score += 0.1
     
     # 检查复杂度匹配
+    word_count = features.word_count
     complexity_indicators = {
-        ComplexityLevel.SIMPLE: len(instruction.split()) < 100,
-        ComplexityLevel.MEDIUM: 100 <= len(instruction.split()) <= 300,
-        ComplexityLevel.COMPLEX: len(instruction.split()) > 200
+        ComplexityLevel.SIMPLE: word_count < 100,
+        ComplexityLevel.MEDIUM: 100 <= word_count <= 300,
+        ComplexityLevel.COMPLEX: word_count > 200
     }
     
     if complexity_indicators.get(task_analysis.complexity_level, False):
@@ -1316,7 +1303,8 @@ def get_dynamic_weights(task_analysis: TaskAnalysis) -> Dict[str, float]:
 
 
 def generate_intelligent_analysis(instruction: str, task_analysis: Optional[TaskAnalysis], 
-                                quality_metrics: Dict[str, float]) -> Dict[str, str]:
+                                quality_metrics: Dict[str, float],
+                                features: Optional[InstructionFeatures] = None) -> Dict[str, str]:
     """生成智能分析"""
     analysis = {}
     
@@ -1331,7 +1319,7 @@ def generate_intelligent_analysis(instruction: str, task_analysis: Optional[Task
             analysis["task_context_match"] = "❌ 指令与任务上下文匹配度较低，需要调整"
         
         # 复杂度适配性分析
-        word_count = len(instruction.split())
+        word_count = features.word_count if features else len(instruction.split())
         if task_analysis.complexity_level == ComplexityLevel.SIMPLE and word_count < 100:
             analysis["complexity_appropriateness"] = "✅ 指令复杂度与任务匹配"
         elif task_analysis.complexity_level == ComplexityLevel.COMPLEX and word_count > 150:
@@ -1422,7 +1410,8 @@ def get_quality_assessment_enhanced(score: float) -> str:
 
 
 def generate_improvement_suggestions_enhanced(quality_metrics: Dict[str, float], instruction: str, 
-                                            task_analysis: Optional[TaskAnalysis]) -> List[str]:
+                                            task_analysis: Optional[TaskAnalysis],
+                                            features: Optional[InstructionFeatures] = None) -> List[str]:
     """生成增强的改进建议"""
     suggestions = []
     
@@ -1445,99 +1434,102 @@ def generate_improvement_suggestions_enhanced(quality_metrics: Dict[str, float],
             suggestions.append("🏗️ 复杂任务建议：考虑分阶段实施，制定详细的里程碑计划")
         
         # 检查是否遗漏了重要的风险因素
+        features = features or extract_instruction_features(instruction)
         for risk in task_analysis.risk_factors:
-            if risk.lower() not in instruction.lower():
+            if not features.contains_phrase(risk):
                 suggestions.append(f"⚠️ 风险提醒：考虑应对 '{risk}' 的策略")
                 break
     
     return suggestions[:4]  # 限制建议数量
 
 
-def assess_clarity(instruction: str) -> float:
+def assess_clarity(instruction: str, features: Optional[InstructionFeatures] = None) -> float:
     """评估指令清晰度"""
+    features = features or extract_instruction_features(instruction)
     score = 0.6  # 基础分
     
     # 检查是否有明确的动词
-    action_verbs = ["implement", "create", "fix", "optimize", "refactor", "test", "实现", "创建", "修复", "优化", "重构", "测试"]
-    if any(verb in instruction.lower() for verb in action_verbs):
+    if features.mentions("clarity", "action_verb"):
         score += 0.2
     
     # 检查是否有具体的目标
-    if any(word in instruction.lower() for word in ["function", "class", "method", "api", "函数", "类", "方法"]):
+    if features.mentions("clarity", "target"):
         score += 0.2
     
     return min(score, 1.0)
 
 
-def assess_completeness(instruction: str) -> float:
+def assess_completeness(instruction: str, features: Optional[InstructionFeatures] = None) -> float:
     """评估指令完整性"""
+    features = features or extract_instruction_features(instruction)
     score = 0.5  # 基础分
     
     # 检查是否包含输入/输出描述
-    if any(word in instruction.lower() for word in ["input", "output", "return", "parameter", "输入", "输出", "返回", "参数"]):
+    if features.mentions("completeness", "io"):
         score += 0.2
     
     # 检查是否包含约束条件
-    if any(word in instruction.lower() for word in ["constraint", "requirement", "must", "should", "约束", "要求", "必须", "应该"]):
+    if features.mentions("completeness", "constraint"):
         score += 0.2
     
     # 检查是否包含成功标准
-    if any(word in instruction.lower() for word in ["success", "criteria", "expect", "成功", "标准", "期望"]):
+    if features.mentions("completeness", "success"):
         score += 0.1
     
     return min(score, 1.0)
 
 
-def assess_specificity(instruction: str) -> float:
+def assess_specificity(instruction: str, features: Optional[InstructionFeatures] = None) -> float:
     """评估指令具体性"""
+    features = features or extract_instruction_features(instruction)
     score = 0.4  # 基础分
     
     # 检查是否有具体的文件或函数名
-    if re.search(r'\w+\.(py|js|ts|java|cpp|c)', instruction):
+    if features.has_source_file:
         score += 0.3
     
     # 检查是否有具体的技术栈
-    tech_terms = ["react", "vue", "angular", "django", "flask", "express", "spring"]
-    if any(term in instruction.lower() for term in tech_terms):
+    if features.mentions("specificity", "tech"):
         score += 0.2
     
     # 检查是否有数值或量化指标
-    if re.search(r'\d+', instruction):
+    if features.has_number:
         score += 0.1
     
     return min(score, 1.0)
 
 
-def assess_actionability(instruction: str) -> float:
+def assess_actionability(instruction: str, features: Optional[InstructionFeatures] = None) -> float:
     """评估指令可执行性"""
+    features = features or extract_instruction_features(instruction)
     score = 0.6  # 基础分
     
     # 检查是否有明确的步骤
-    if any(word in instruction.lower() for word in ["step", "first", "then", "步骤", "首先", "然后"]):
+    if features.mentions("actionability", "step"):
         score += 0.2
     
     # 检查是否避免了模糊语言
-    vague_terms = ["somehow", "maybe", "possibly", "大概", "可能", "或许"]
-    if not any(term in instruction.lower() for term in vague_terms):
+    if not features.mentions("actionability", "vague"):
         score += 0.2
     
     return min(score, 1.0)
 
 
-def assess_risk_awareness(instruction: str) -> float:
+def assess_risk_awareness(instruction: str, features: Optional[InstructionFeatures] = None) -> float:
     """评估风险意识"""
+    features = features or extract_instruction_features(instruction)
     score = 0.3  # 基础分
     
     # 检查是否提到了测试
-    if any(word in instruction.lower() for word in ["test", "testing", "测试"]):
+    if features.mentions("risk", "test"):
         score += 0.3
     
     # 检查是否提到了错误处理
-    if any(word in instruction.lower() for word in ["error", "exception", "handle", "错误", "异常", "处理"]):
+    if features.mentions("risk", "error_handling"):
         score += 0.2
     
     # 检查是否提到了兼容性
-    if any(word in instruction.lower() for word in ["compatible", "backward", "兼容"]):
+    if features.mentions("risk", "compatibility"):
         score += 0.2
     
     return min(score, 1.0)
@@ -1600,6 +1592,7 @@ def get_recommended_actions(quality_metrics: Dict[str, float]) -> List[str]:
 
 
 @mcp.tool()
+@_tool_executor.offload
 def smart_programming_coach(
     user_request: str,
     project_context: str = "",
@@ -1649,9 +1642,10 @@ def smart_programming_coach(
         }
     """
     
-    # 分析任务特征
-    task_complexity = estimate_request_complexity(user_request)
-    task_nature = analyze_request_nature(user_request)
+    # 分析任务特征（单次扫描）
+    request_hits = KEYWORD_ENGINE.scan(user_request.lower())
+    task_complexity = estimate_request_complexity(user_request, request_hits)
+    task_nature = analyze_request_nature(user_request, request_hits)
     
     # 根据复杂度和性质推荐流程
     workflow = generate_workflow_recommendation(task_complexity, task_nature, mode)
@@ -1670,26 +1664,16 @@ def smart_programming_coach(
         "next_actions": workflow["next_actions"]
     }
     
-    return json.dumps(guidance, ensure_ascii=False, indent=2)
+    return _responses.dumps(guidance)
 
 
-def estimate_request_complexity(user_request: str) -> str:
+def estimate_request_complexity(user_request: str, hits: Optional[KeywordHits] = None) -> str:
     """快速评估请求复杂度"""
-    request_lower = user_request.lower()
+    if hits is None:
+        hits = KEYWORD_ENGINE.scan(user_request.lower())
     
-    # 复杂度指标
-    high_complexity_indicators = [
-        "architecture", "system", "multiple", "integrate", "refactor", 
-        "optimize", "架构", "系统", "多个", "集成", "重构", "优化"
-    ]
-    
-    medium_complexity_indicators = [
-        "feature", "function", "class", "module", "api",
-        "功能", "函数", "类", "模块", "接口"
-    ]
-    
-    high_score = sum(1 for indicator in high_complexity_indicators if indicator in request_lower)
-    medium_score = sum(1 for indicator in medium_complexity_indicators if indicator in request_lower)
+    high_score = hits.count("request_complexity", "high")
+    medium_score = hits.count("request_complexity", "medium")
     
     if high_score >= 2:
         return "complex"
@@ -1699,20 +1683,15 @@ def estimate_request_complexity(user_request: str) -> str:
         return "simple"
 
 
-def analyze_request_nature(user_request: str) -> str:
+def analyze_request_nature(user_request: str, hits: Optional[KeywordHits] = None) -> str:
     """分析请求性质"""
-    request_lower = user_request.lower()
+    if hits is None:
+        hits = KEYWORD_ENGINE.scan(user_request.lower())
     
-    if any(word in request_lower for word in ["learn", "understand", "explain", "学习", "理解", "解释"]):
-        return "learning"
-    elif any(word in request_lower for word in ["fix", "bug", "error", "修复", "错误", "问题"]):
-        return "debugging"
-    elif any(word in request_lower for word in ["optimize", "performance", "优化", "性能"]):
-        return "optimization"
-    elif any(word in request_lower for word in ["create", "implement", "build", "创建", "实现", "构建"]):
-        return "development"
-    else:
-        return "general"
+    for nature in REQUEST_NATURE_KEYWORDS:
+        if hits.any("request_nature", nature):
+            return nature
+    return "general"
 
 
 def generate_workflow_recommendation(complexity: str, nature: str, mode: str) -> dict:
@@ -1825,9 +1804,19 @@ def generate_usage_tips(complexity: str, mode: str) -> list:
 
 
 @mcp.tool()
+@_tool_executor.offload
 def session_manager(
     action: str = "list",
-    session_id: str = ""
+    session_id: str = "",
+    limit: int = LIST_PAGE_SIZE,
+    cursor: str = "",
+    task_type: str = "",
+    complexity: str = "",
+    current_stage: str = "",
+    min_age_minutes: float = 0,
+    max_age_minutes: float = 0,
+    sort: str = "newest",
+    fields: str = ""
 ) -> str:
     """
     🗂️ 会话管理器 - 智能会话状态管理工具
@@ -1845,10 +1834,25 @@ def session_manager(
     • **cleanup**: 清理过期会话
     • **stats**: 显示使用统计
     • **reset**: 重置特定会话状态
+    • **metrics**: 各工具及处理阶段的耗时分位数、调用次数与响应大小
+    
+    **会话列表（list）：**
+    • 分页返回，响应中的 next_cursor 传回 cursor 参数即可获取下一页，为空表示已到末尾
+    • 可按任务类型、复杂度、当前阶段和会话年龄过滤，按创建时间排序
+    • fields 指定返回的字段（逗号分隔），例如只需要ID时传 "session_id"
     
     Args:
-        action: 操作类型 ("list"/"detail"/"cleanup"/"stats"/"reset")
+        action: 操作类型 ("list"/"detail"/"cleanup"/"stats"/"reset"/"metrics")
         session_id: 会话ID（某些操作需要）
+        limit: list 每页条数（1-500）
+        cursor: list 分页游标
+        task_type: list 按任务类型过滤（如 "bug_fix"）
+        complexity: list 按复杂度过滤（"simple"/"medium"/"complex"）
+        current_stage: list 按当前阶段过滤
+        min_age_minutes: list 只返回创建至少这么多分钟的会话
+        max_age_minutes: list 只返回创建不超过这么多分钟的会话（0 表示不限）
+        sort: list 排序方式（"newest" 最新优先 / "oldest" 最早优先）
+        fields: list 返回的字段，逗号分隔（默认全部）
     
     Returns:
         操作结果的详细信息
@@ -1856,148 +1860,255 @@ def session_manager(
     
     if action == "list":
         if not _session_cache:
-            return json.dumps({
+            return _responses.dumps({
                 "message": "当前没有活跃的会话",
                 "suggestion": "使用 analyze_programming_context 创建新会话"
-            }, ensure_ascii=False, indent=2)
-        
-        sessions = []
-        for sid, session in _session_cache.items():
-            duration = int((time.time() - session.timestamp) / 60)
-            sessions.append({
-                "session_id": sid,
-                "task_type": session.task_analysis.task_type.value,
-                "complexity": session.task_analysis.complexity_level.value,
-                "current_stage": session.current_stage,
-                "progress": f"{len(session.stage_history)}/{len(session.thinking_frameworks)}",
-                "duration_minutes": duration,
-                "request_preview": session.user_request[:50] + "..." if len(session.user_request) > 50 else session.user_request
             })
         
-        return json.dumps({
-            "active_sessions": len(sessions),
-            "sessions": sorted(sessions, key=lambda x: x['duration_minutes']),
-            "usage_tip": "使用 session_manager('detail', 'session_id') 查看详情"
-        }, ensure_ascii=False, indent=2)
+        return list_sessions(limit, cursor, task_type, complexity, current_stage,
+                             min_age_minutes, max_age_minutes, sort, fields)
     
     elif action == "detail":
         if not session_id:
             return json.dumps({"error": "需要提供session_id"}, ensure_ascii=False)
         
-        if session_id not in _session_cache:
-            return json.dumps({
-                "error": "会话不存在",
-                "available_sessions": list(_session_cache.keys())[-5:]
-            }, ensure_ascii=False, indent=2)
-        
-        session = _session_cache[session_id]
-        task_analysis = session.task_analysis
-        
-        detail = {
-            "session_info": {
-                "session_id": session_id,
-                "created_time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(session.timestamp)),
-                "duration_minutes": int((time.time() - session.timestamp) / 60),
-                "current_stage": session.current_stage
-            },
-            "task_details": {
-                "original_request": session.user_request,
-                "task_type": task_analysis.task_type.value,
-                "complexity_level": task_analysis.complexity_level.value,
-                "core_objective": task_analysis.core_objective,
-                "similarity_score": task_analysis.similarity_score
-            },
-            "progress_tracking": {
-                "completed_stages": session.stage_history,
-                "available_stages": list(session.thinking_frameworks.keys()),
-                "progress_percentage": int((len(session.stage_history) / len(session.thinking_frameworks)) * 100),
-                "next_recommended_stage": get_next_step(session.current_stage)
-            },
-            "quality_history": session.quality_scores,
-            "learning_insights": task_analysis.learning_insights[:3] if task_analysis.learning_insights else [],
-            "resume_suggestion": f"继续使用: guided_thinking_process('{session_id}', '{get_next_step(session.current_stage)}')"
-        }
-        
-        return json.dumps(detail, ensure_ascii=False, indent=2)
+        # 持有会话锁构建详情，避免读到推进中途的阶段与评分
+        with _session_locks(session_id):
+            session = _session_cache.get(session_id)
+            if session is None:
+                return _responses.dumps({
+                    "error": "会话不存在",
+                    "available_sessions": list(_session_cache.keys())[-5:]
+                })
+            
+            task_analysis = session.task_analysis
+            
+            detail = {
+                "session_info": {
+                    "session_id": session_id,
+                    "created_time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(session.timestamp)),
+                    "duration_minutes": int((time.time() - session.timestamp) / 60),
+                    "current_stage": session.current_stage
+                },
+                "task_details": {
+                    "original_request": session.user_request,
+                    "task_type": task_analysis.task_type.value,
+                    "complexity_level": task_analysis.complexity_level.value,
+                    "core_objective": task_analysis.core_objective,
+                    "similarity_score": task_analysis.similarity_score
+                },
+                "progress_tracking": {
+                    "completed_stages": session.stage_history,
+                    "available_stages": list(session.thinking_frameworks.keys()),
+                    "progress_percentage": int((len(session.stage_history) / len(session.thinking_frameworks)) * 100),
+                    "next_recommended_stage": get_next_step(session.current_stage)
+                },
+                "quality_history": session.quality_scores,
+                "learning_insights": task_analysis.learning_insights[:3] if task_analysis.learning_insights else [],
+                "resume_suggestion": f"继续使用: guided_thinking_process('{session_id}', '{get_next_step(session.current_stage)}')"
+            }
+            
+            return _responses.dumps(detail)
     
     elif action == "cleanup":
         initial_count = len(_session_cache)
         cleanup_expired_sessions()
         cleaned_count = initial_count - len(_session_cache)
         
-        return json.dumps({
+        return _responses.dumps({
             "cleanup_completed": True,
             "sessions_cleaned": cleaned_count,
             "remaining_sessions": len(_session_cache),
             "message": f"清理了 {cleaned_count} 个过期会话"
-        }, ensure_ascii=False, indent=2)
+        })
     
     elif action == "stats":
         if not _analysis_history:
-            return json.dumps({
+            return _responses.dumps({
                 "message": "暂无使用统计数据",
                 "suggestion": "开始使用工具后将产生统计数据"
-            }, ensure_ascii=False, indent=2)
-        
-        # 统计分析
-        task_types = {}
-        complexities = {}
-        for history in _analysis_history:
-            task_type = history.get('task_type', 'unknown')
-            complexity = history.get('complexity', 'unknown')
-            task_types[task_type] = task_types.get(task_type, 0) + 1
-            complexities[complexity] = complexities.get(complexity, 0) + 1
-        
-        # 计算平均质量分数
-        all_quality_scores = []
-        for session in _session_cache.values():
-            all_quality_scores.extend(session.quality_scores.values())
+            })
         
-        avg_quality = sum(all_quality_scores) / len(all_quality_scores) if all_quality_scores else 0
+        # 统计分析：分布与平均分均为增量维护的聚合值，无需遍历历史与会话；
+        # 各自在同一把锁下一次取出，得到一致的快照而不阻塞其他工具的写入
+        total_analyses, task_types, complexities = _analysis_history.summary()
+        quality_mean, quality_count = _session_cache.quality_summary()
         
         stats = {
-            "total_analyses": len(_analysis_history),
+            "total_analyses": total_analyses,
             "active_sessions": len(_session_cache),
             "task_type_distribution": task_types,
             "complexity_distribution": complexities,
-            "average_quality_score": round(avg_quality, 2),
-            "context_memory_entries": len(_context_memory),
+            "average_quality_score": round(quality_mean, 2),
+            "context_memory_entries": _context_memory.total(),
             "most_common_task_type": max(task_types.items(), key=lambda x: x[1])[0] if task_types else "无",
-            "quality_assessments_performed": len(all_quality_scores)
+            "quality_assessments_performed": quality_count,
+            "analysis_cache": _analysis_cache.stats()
         }
         
-        return json.dumps(stats, ensure_ascii=False, indent=2)
+        return _responses.dumps(stats)
+    
+    elif action == "metrics":
+        metrics = {
+            **_metrics.snapshot(),
+            "enabled": _metrics.enabled,
+            "prometheus_file": _metrics.export()
+        }
+        from .http_serving import admission_stats
+        http_admission = admission_stats()
+        if http_admission is not None:
+            metrics["http_admission"] = http_admission
+        return _responses.dumps(metrics)
     
     elif action == "reset":
         if not session_id:
             return json.dumps({"error": "需要提供session_id"}, ensure_ascii=False)
         
-        if session_id not in _session_cache:
-            return json.dumps({"error": "会话不存在"}, ensure_ascii=False)
-        
-        session = _session_cache[session_id]
-        session.current_stage = "understanding"
-        session.stage_history = []
-        session.quality_scores = {}
-        
-        return json.dumps({
-            "reset_completed": True,
-            "session_id": session_id,
-            "new_stage": "understanding",
-            "message": "会话已重置到初始状态",
-            "next_action": f"使用 guided_thinking_process('{session_id}', 'understanding') 重新开始"
-        }, ensure_ascii=False, indent=2)
+        with _session_locks(session_id):
+            session = _session_cache.get(session_id)
+            if session is None:
+                return json.dumps({"error": "会话不存在"}, ensure_ascii=False)
+            
+            session.current_stage = "understanding"
+            session.stage_history = []
+            _session_cache.clear_quality_scores(session)
+            
+            return _responses.dumps({
+                "reset_completed": True,
+                "session_id": session_id,
+                "new_stage": "understanding",
+                "message": "会话已重置到初始状态",
+                "next_action": f"使用 guided_thinking_process('{session_id}', 'understanding') 重新开始"
+            })
     
     else:
-        return json.dumps({
+        return _responses.dumps({
             "error": f"不支持的操作: {action}",
-            "supported_actions": ["list", "detail", "cleanup", "stats", "reset"]
-        }, ensure_ascii=False, indent=2)
+            "supported_actions": ["list", "detail", "cleanup", "stats", "reset", "metrics"]
+        })
+
+
+# 会话列表可返回的字段
+SESSION_LIST_FIELDS = {
+    "session_id": lambda session, now: session.session_id,
+    "created_at": lambda session, now: session.timestamp,
+    "task_type": lambda session, now: session.task_analysis.task_type.value,
+    "complexity": lambda session, now: session.task_analysis.complexity_level.value,
+    "current_stage": lambda session, now: session.current_stage,
+    "progress": lambda session, now: f"{len(session.stage_history)}/{len(session.thinking_frameworks)}",
+    "duration_minutes": lambda session, now: int((now - session.timestamp) / 60),
+    "request_preview": lambda session, now: (session.user_request[:50] + "..."
+                                             if len(session.user_request) > 50 else session.user_request)
+}
+
+
+def list_sessions(limit: int, cursor: str, task_type: str, complexity: str, current_stage: str,
+                  min_age_minutes: float, max_age_minutes: float, sort: str, fields: str) -> str:
+    """分页列出内存中的会话
+
+    遍历会话索引中按创建时间排序的条目：任务类型、复杂度与当前阶段均由索引分组直接定位，
+    单个过滤条件时代价与页大小成正比；多个条件时遍历最小的分组，逐条检查其余分组（二分查找）。
+    """
+    if sort not in ("newest", "oldest"):
+        return _responses.dumps({"error": f"不支持的排序方式: {sort}", "supported_sorts": ["newest", "oldest"]})
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(SESSION_LIST_FIELDS)
+    unknown = [field for field in selected if field not in SESSION_LIST_FIELDS]
+    if unknown:
+        return _responses.dumps({"error": f"不支持的字段: {', '.join(unknown)}",
+                                 "supported_fields": list(SESSION_LIST_FIELDS)})
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return _responses.dumps({"error": "无效的分页游标", "cursor": cursor})
+    limit = max(1, min(limit, MAX_LIST_PAGE_SIZE))
+    
+    now = time.time()
+    filters = {}
+    if task_type:
+        filters["task_type"] = task_type
+    if complexity:
+        filters["complexity"] = complexity
+    if current_stage:
+        filters["current_stage"] = current_stage
+    entries = _session_index.scan(
+        filters,
+        newest_first=sort == "newest",
+        after=after,
+        created_from=now - max_age_minutes * 60 if max_age_minutes > 0 else None,
+        created_to=now - min_age_minutes * 60 if min_age_minutes > 0 else None
+    )
+    
+    sessions = []
+    last_entry = None
+    # 遍历索引期间持有会话存储的锁（持有时间与遍历的索引条目数成正比，见上）
+    with _session_cache.lock:
+        for entry in entries:
+            session = _session_cache.peek(entry[1])
+            # 阶段在修改后、save() 更新索引之前的短暂窗口内可能与索引不一致
+            if session is None or (current_stage and session.current_stage != current_stage):
+                continue
+            if len(sessions) == limit:
+                break
+            sessions.append({field: SESSION_LIST_FIELDS[field](session, now) for field in selected})
+            last_entry = entry
+        else:
+            last_entry = None  # 已遍历到末尾，没有下一页
+    
+    return _responses.dumps({
+        "active_sessions": len(_session_cache),
+        "returned": len(sessions),
+        "sessions": sessions,
+        "next_cursor": encode_cursor(last_entry) if last_entry else "",
+        "usage_tip": "使用 session_manager('detail', 'session_id') 查看详情"
+    })
 
 
 def main():
     """Main entry point to run the MCP server."""
-    mcp.run()
+    parser = argparse.ArgumentParser(prog="taskify-mcp-server", description="Taskify MCP Server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=TRANSPORT,
+                        help="stdio（默认）或 HTTP 传输：streamable-http / sse")
+    parser.add_argument("--host", default=HTTP_HOST, help="HTTP 监听地址")
+    parser.add_argument("--port", type=int, default=HTTP_PORT, help="HTTP 监听端口")
+    parser.add_argument("--shards", type=int, default=SHARDS,
+                        help="分片工作进程数（需要 streamable-http），大于 1 时本进程只做路由")
+    args = parser.parse_args()
+    
+    if args.transport == "stdio":
+        mcp.run()
+        return
+    if args.shards > 1:
+        if args.transport != "streamable-http":
+            parser.error("--shards 需要 --transport streamable-http")
+        # 本进程只做路由，不使用自己的存储：先等历史预加载结束并关闭存储后端，
+        # 分叉出的工作进程不会继承仍在运行的加载线程或路由打开的数据库连接
+        if _history_loader is not None:
+            _history_loader.join()
+        _storage.close()
+        from .sharding import DEFAULT_SHARD_START, run_sharded
+        run_sharded(
+            args.shards, args.host, args.port,
+            keep_alive=HTTP_KEEP_ALIVE,
+            max_body_bytes=HTTP_MAX_BODY_BYTES,
+            max_inflight=HTTP_MAX_INFLIGHT,
+            queue_timeout=HTTP_QUEUE_TIMEOUT,
+            max_connections=HTTP_MAX_CONNECTIONS,
+            log_level=mcp.settings.log_level,
+            compact=COMPACT_JSON,
+            start_method=SHARD_START or DEFAULT_SHARD_START
+        )
+        return
+    from .http_serving import run_http
+    run_http(
+        mcp, args.transport, args.host, args.port,
+        keep_alive=HTTP_KEEP_ALIVE,
+        max_body_bytes=HTTP_MAX_BODY_BYTES,
+        max_inflight=HTTP_MAX_INFLIGHT,
+        queue_timeout=HTTP_QUEUE_TIMEOUT,
+        max_connections=HTTP_MAX_CONNECTIONS,
+        json_response=HTTP_JSON_RESPONSE,
+        stateless=HTTP_STATELESS
+    )
 
 
 if __name__ == "__main__":
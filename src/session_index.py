@@ -0,0 +1,131 @@
+"""会话索引 - 会话列表分页使用的二级索引"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LIST_PAGE_SIZE = 50  # 会话列表默认每页条数
+MAX_LIST_PAGE_SIZE = 500  # 会话列表每页条数上限
+
+# 索引条目：(创建时间, 会话ID)，按升序排列；会话ID保证条目唯一，同时作为分页游标
+IndexEntry = Tuple[float, str]
+
+
+def encode_cursor(entry: IndexEntry) -> str:
+    """分页游标：最后一条结果的索引条目"""
+    return f"{entry[0]!r}|{entry[1]}"
+
+
+def decode_cursor(cursor: str) -> IndexEntry:
+    """解析分页游标，格式错误时抛出 ValueError"""
+    timestamp, separator, session_id = cursor.partition("|")
+    if not separator:
+        raise ValueError(cursor)
+    return float(timestamp), session_id
+
+
+class SessionIndex:
+    """内存会话的二级索引
+
+    - 全部会话按创建时间排序，支持正反向遍历与按年龄区间定位（二分查找）
+    - 任务类型、复杂度与当前阶段按 (字段, 取值) 分组维护各自的有序列表，
+      过滤时直接遍历对应分组，不必扫描其他会话
+    - 任务类型与复杂度在会话创建后不变；当前阶段会变化，记录入索引时的取值，
+      由 update_stage() 把会话移到新阶段的分组
+
+    由 SessionStore 在会话进出内存与保存时维护。
+    """
+
+    def __init__(self):
+        self._all: List[IndexEntry] = []
+        self._groups: Dict[Tuple[str, str], List[IndexEntry]] = {}
+        self._stages: Dict[str, str] = {}  # 会话ID → 索引中记录的当前阶段
+
+    @staticmethod
+    def _keys(session) -> Tuple[Tuple[str, str], ...]:
+        task_analysis = session.task_analysis
+        return (("task_type", task_analysis.task_type.value),
+                ("complexity", task_analysis.complexity_level.value))
+
+    def add(self, session):
+        entry = (session.timestamp, session.session_id)
+        insort(self._all, entry)
+        for key in self._keys(session):
+            insort(self._groups.setdefault(key, []), entry)
+        self._stages[session.session_id] = session.current_stage
+        insort(self._groups.setdefault(("current_stage", session.current_stage), []), entry)
+
+    def remove(self, session):
+        entry = (session.timestamp, session.session_id)
+        self._discard(self._all, entry)
+        keys = list(self._keys(session))
+        stage = self._stages.pop(session.session_id, None)
+        if stage is not None:
+            keys.append(("current_stage", stage))
+        for key in keys:
+            self._discard_from_group(key, entry)
+
+    def update_stage(self, session):
+        """会话的当前阶段变化后，把它移到新阶段的分组"""
+        stage = self._stages.get(session.session_id)
+        if stage is None or stage == session.current_stage:
+            return
+        entry = (session.timestamp, session.session_id)
+        self._discard_from_group(("current_stage", stage), entry)
+        self._stages[session.session_id] = session.current_stage
+        insort(self._groups.setdefault(("current_stage", session.current_stage), []), entry)
+
+    def _discard_from_group(self, key: Tuple[str, str], entry: IndexEntry):
+        group = self._groups.get(key)
+        if group is not None:
+            self._discard(group, entry)
+            if not group:
+                del self._groups[key]
+
+    @staticmethod
+    def _discard(entries: List[IndexEntry], entry: IndexEntry):
+        position = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    def scan(self, filters: Dict[str, str], newest_first: bool = True,
+             after: Optional[IndexEntry] = None, created_from: Optional[float] = None,
+             created_to: Optional[float] = None) -> Iterator[IndexEntry]:
+        """按创建时间顺序遍历符合条件的条目
+
+        filters: 索引字段 → 取值，多个条件时遍历最小的分组并检查其余条件
+        after: 上一页最后一条（游标），从其后继续
+        created_from / created_to: 创建时间的闭区间
+        """
+        entries = self._all
+        others: List[List[IndexEntry]] = []
+        for field, value in filters.items():
+            group = self._groups.get((field, value))
+            if group is None:
+                return
+            others.append(group)
+        if others:
+            others.sort(key=len)
+            entries = others.pop(0)
+
+        low = 0 if created_from is None else bisect_left(entries, (created_from, ""))
+        # (t, "\uffff") 排在创建时间为 t 的所有条目之后
+        high = len(entries) if created_to is None else bisect_right(entries, (created_to, "\uffff"))
+        if after is not None:
+            if newest_first:
+                high = min(high, bisect_left(entries, after))
+            else:
+                low = max(low, bisect_right(entries, after))
+
+        positions = range(high - 1, low - 1, -1) if newest_first else range(low, high)
+        for position in positions:
+            entry = entries[position]
+            if all(self._contains(group, entry) for group in others):
+                yield entry
+
+    @staticmethod
+    def _contains(entries: List[IndexEntry], entry: IndexEntry) -> bool:
+        position = bisect_left(entries, entry)
+        return position < len(entries) and entries[position] == entry
+
+    def __len__(self) -> int:
+        return len(self._all)
@@ -0,0 +1,286 @@
+"""会话存储 - 基于最近访问时间的 LRU/TTL 会话缓存"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, ItemsView, Iterator, KeysView, List, Optional, Tuple, ValuesView
+
+from .session_index import SessionIndex
+from .storage import MemoryBackend, StorageBackend
+
+BACKEND_PURGE_INTERVAL = 60  # 后端过期会话的清理间隔（秒）
+
+
+class RunningMean:
+    """可增删样本的流式平均值"""
+
+    __slots__ = ("total", "count")
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value: float):
+        self.total += value
+        self.count += 1
+
+    def remove(self, value: float):
+        self.count -= 1
+        # 样本清空时归零，避免浮点累计误差残留
+        self.total = self.total - value if self.count else 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+
+class SessionStore(MutableMapping):
+    """按最近访问排序的会话存储
+
+    内部 OrderedDict 始终保持"最久未访问 → 最近访问"的顺序：
+    - 读写会话为 O(1)，并把会话移到队尾、刷新 last_access
+    - 超时以最近访问时间计算，过期会话必然位于队首，清理只需从队首弹出，均摊 O(1)
+    - 超出容量时淘汰最久未访问的会话，而不是最早创建的会话
+
+    ``in`` 检查、``values()``/``items()`` 遍历不会刷新访问时间。
+
+    内部可重入锁 ``lock`` 保护顺序表、统计与索引，每次操作只短暂持有，
+    后端读写在锁外进行；``keys()``/``values()``/``items()`` 返回加锁时刻快照上的视图。
+    锁不覆盖会话对象本身的字段，修改会话内容的调用方须自行按会话互斥（见 LockStripes）。
+
+    配置持久化后端时，内存中只保留已水合的会话：未命中的会话按需从后端加载，
+    容量淘汰只释放内存，超时清理才会删除后端中的记录。
+    只读访问不写后端：刷新过访问时间的会话记入待同步集合，在被淘汰、后端清理过期会话之前
+    或 flush() 时才写出一次；会话内容的修改经 save() 等方法立即交给后端。
+
+    传入 quality 时，内存中所有会话的质量评分汇总为流式平均值：会话进出内存时增减，
+    评分须经 record_quality_score / clear_quality_scores 修改，统计读取为 O(1)。
+    传入 index 时同样随会话进出内存维护二级索引，供分页列表使用。
+    """
+
+    def __init__(self, timeout: float, max_sessions: int, backend: Optional[StorageBackend] = None,
+                 quality: Optional[RunningMean] = None, index: Optional[SessionIndex] = None):
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.backend = backend or MemoryBackend()
+        self.quality = quality
+        self.index = index
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._touched: set = set()  # 访问时间已刷新、尚未写回后端的会话ID
+        self._last_backend_purge = 0.0
+        self.lock = threading.RLock()
+
+    def _attach(self, session: Any):
+        """会话进入内存"""
+        if self.quality is not None:
+            for score in session.quality_scores.values():
+                self.quality.add(score)
+        if self.index is not None:
+            self.index.add(session)
+
+    def _detach(self, session: Any):
+        """会话离开内存"""
+        if self.quality is not None:
+            for score in session.quality_scores.values():
+                self.quality.remove(score)
+        if self.index is not None:
+            self.index.remove(session)
+
+    def _expired(self, session: Any, now: float) -> bool:
+        return now - session.last_access > self.timeout
+
+    def _lookup(self, session_id: str, now: float) -> Optional[Any]:
+        """查找未过期的会话，必要时从后端水合"""
+        with self.lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                if not self._expired(session, now):
+                    return session
+                self._detach(self._sessions.pop(session_id))
+                self._touched.discard(session_id)
+        if session is not None:
+            self.backend.delete_session(session_id)
+            return None
+        # 后端读取在锁外进行，其他线程可能同时水合了同一会话
+        loaded = self.backend.load_session(session_id)
+        if loaded is None:
+            return None
+        if self._expired(loaded, now):
+            self.backend.delete_session(session_id)
+            return None
+        with self.lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return session
+            # 水合视为一次访问，保持队列按访问时间有序
+            loaded.last_access = now
+            self._sessions[session_id] = loaded
+            self._touched.add(session_id)
+            self._attach(loaded)
+            evicted = self._evict_overflow()
+        self._write_back(evicted)
+        return loaded
+
+    def _evict_overflow(self) -> List[Any]:
+        """淘汰超出容量的会话（调用方持有锁），返回其中需要写回访问时间的会话"""
+        evicted = []
+        while len(self._sessions) > self.max_sessions:
+            session_id, session = self._sessions.popitem(last=False)
+            self._detach(session)
+            if session_id in self._touched:
+                self._touched.discard(session_id)
+                evicted.append(session)
+        return evicted
+
+    def _write_back(self, sessions: List[Any]):
+        """在锁外把会话交给后端"""
+        for session in sessions:
+            self.backend.save_session(session)
+
+    def __getitem__(self, session_id: str) -> Any:
+        now = time.time()
+        session = self._lookup(session_id, now)
+        if session is None:
+            raise KeyError(session_id)
+        with self.lock:
+            session.last_access = now
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+                self._touched.add(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session: Any):
+        with self.lock:
+            session.last_access = time.time()
+            previous = self._sessions.get(session_id)
+            if previous is not session:
+                if previous is not None:
+                    self._detach(previous)
+                self._attach(session)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._touched.discard(session_id)
+            evicted = self._evict_overflow()
+        self.backend.save_session(session)
+        self._write_back(evicted)
+
+    def __delitem__(self, session_id: str):
+        with self.lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._detach(session)
+            self._touched.discard(session_id)
+        self.backend.delete_session(session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        if not isinstance(session_id, str):
+            return False
+        return self._lookup(session_id, time.time()) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self.lock:
+            return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self._sessions)
+
+    def keys(self) -> KeysView[str]:
+        return self._snapshot().keys()
+
+    def values(self) -> ValuesView[Any]:
+        return self._snapshot().values()
+
+    def items(self) -> ItemsView[str, Any]:
+        return self._snapshot().items()
+
+    def clear(self):
+        """清空内存中的全部会话（质量统计与索引随之清空）
+
+        与容量淘汰相同，只释放内存：持久化后端中的记录保留，之后仍可按需水合。
+        """
+        with self.lock:
+            for session in self._sessions.values():
+                self._detach(session)
+            evicted = [self._sessions[session_id] for session_id in self._touched]
+            self._touched.clear()
+            self._sessions.clear()
+        self._write_back(evicted)
+
+    def peek(self, session_id: str) -> Optional[Any]:
+        """读取内存中的会话但不刷新访问时间"""
+        return self._sessions.get(session_id)
+
+    def save(self, session: Any):
+        """会话内容被修改后调用：更新索引中的当前阶段，并交给后端持久化"""
+        with self.lock:
+            if self._sessions.get(session.session_id) is session:
+                self._touched.discard(session.session_id)
+                if self.index is not None:
+                    self.index.update_stage(session)
+        self.backend.save_session(session)
+
+    def quality_summary(self) -> Tuple[float, int]:
+        """同一时刻的质量评分平均值与评分次数（未传入 quality 时为 (0.0, 0)）"""
+        if self.quality is None:
+            return 0.0, 0
+        with self.lock:
+            return self.quality.mean, self.quality.count
+
+    def record_quality_score(self, session: Any, key: str, score: float):
+        """记录一次质量评分（覆盖同名评分）并持久化"""
+        with self.lock:
+            previous = session.quality_scores.get(key)
+            session.quality_scores[key] = score
+            # 已被淘汰的会话不再计入内存中的统计
+            if self.quality is not None and self._sessions.get(session.session_id) is session:
+                if previous is not None:
+                    self.quality.remove(previous)
+                self.quality.add(score)
+        self.save(session)
+
+    def clear_quality_scores(self, session: Any):
+        """清空会话的质量评分并持久化"""
+        with self.lock:
+            if self.quality is not None and self._sessions.get(session.session_id) is session:
+                for score in session.quality_scores.values():
+                    self.quality.remove(score)
+            session.quality_scores = {}
+        self.save(session)
+
+    def cleanup(self) -> int:
+        """清理过期及超出容量的会话，返回清理数量"""
+        sessions = self._sessions
+        now = time.time()
+        with self.lock:
+            initial_count = len(sessions)
+            while sessions:
+                oldest = next(iter(sessions.values()))
+                if not self._expired(oldest, now):
+                    break
+                session_id, session = sessions.popitem(last=False)
+                self._detach(session)
+                self._touched.discard(session_id)
+            evicted = self._evict_overflow()
+            cleaned = initial_count - len(sessions)
+            purge = now - self._last_backend_purge >= min(self.timeout, BACKEND_PURGE_INTERVAL)
+            if purge:
+                self._last_backend_purge = now
+        self._write_back(evicted)
+        # 后端中的过期会话按较低频率批量删除，避免每次调用都触发写入；
+        # 删除前先写回仍在使用的会话的访问时间，它们不会被当作过期删除
+        if purge:
+            self.flush()
+            self.backend.delete_expired_sessions(now - self.timeout)
+        return cleaned
+
+    def flush(self):
+        """把访问时间已刷新、尚未写回的会话交给后端（进程退出前调用）"""
+        with self.lock:
+            touched = [self._sessions[session_id] for session_id in self._touched]
+            self._touched.clear()
+        self._write_back(touched)
@@ -0,0 +1,22 @@
+"""分片标识 - 会话ID与评分会话ID中的分片后缀
+
+单独成模块：未分片的 stdio / 单进程 HTTP 部署生成ID时只需要这里的后缀规则，不必导入分片路由。
+"""
+
+import re
+import zlib
+
+SHARD_SUFFIX = re.compile(r"_s(\d+)$")
+
+
+def shard_suffix(shard_index: int, shard_count: int) -> str:
+    """会话ID与评分会话ID的分片后缀；未分片时为空，ID 格式保持不变"""
+    return f"_s{shard_index}" if shard_count > 1 else ""
+
+
+def shard_of(identifier: str, shard_count: int) -> int:
+    """ID 所属的分片：读取后缀中的分片序号，没有后缀的 ID 按哈希分配"""
+    match = SHARD_SUFFIX.search(identifier)
+    if match and int(match.group(1)) < shard_count:
+        return int(match.group(1))
+    return zlib.crc32(identifier.encode()) % shard_count
@@ -0,0 +1,457 @@
+"""分片部署 - 多个工作进程按会话分片，前端路由进程按会话亲和转发工具调用"""
+
+import asyncio
+import atexit
+import copy
+import gc
+import importlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from .frameworks import preload_framework_templates
+from .http_serving import AdmissionControl, Receive, Scope, Send, admission_stats, error_response, serve
+from .responses import ResponseEncoder
+from .session_index import LIST_PAGE_SIZE, MAX_LIST_PAGE_SIZE, encode_cursor
+from .shard_ids import shard_of
+
+if TYPE_CHECKING:
+    import httpx
+
+# 路由键：按顺序检查的工具参数（增量评分的后续分片只带评分会话ID）
+ROUTING_ARGUMENTS = ("stream_id", "session_id")
+# 不带会话ID时广播到全部分片并合并结果的会话管理操作
+FAN_OUT_ACTIONS = ("list", "stats", "cleanup", "metrics")
+# 转发给工作进程的请求头
+FORWARDED_HEADERS = frozenset((b"content-type", b"accept", b"mcp-protocol-version", b"mcp-session-id",
+                               b"last-event-id", b"authorization"))
+# 不转发回客户端的逐跳响应头
+HOP_BY_HOP_HEADERS = frozenset((b"connection", b"keep-alive", b"transfer-encoding", b"date", b"server"))
+WORKER_START_TIMEOUT = 30.0
+# 工作进程启动方式：fork 从已完成导入的路由进程分叉，共享只读内存页；spawn 为每个工作进程启动新解释器
+SHARD_START_METHODS = ("fork", "spawn")
+DEFAULT_SHARD_START = "fork" if sys.platform.startswith("linux") else "spawn"
+
+logger = logging.getLogger(__name__)
+
+
+class ShardRouter:
+    """ASGI 应用：把 Streamable HTTP 请求转发到分片工作进程
+
+    - tools/call 按 stream_id / session_id 中编码的分片转发（会话亲和）
+    - 其余请求（新建分析、教练、初始化、工具列表）轮询分配给各分片
+    - 不带会话ID的 session_manager 列表、统计、清理与指标广播到全部分片并合并结果
+
+    工作进程以无状态、JSON 响应模式运行，任意请求都可由任意分片处理，路由本身不保存会话；
+    响应按块原样转发，SSE 流同样适用。
+    """
+
+    def __init__(self, worker_urls: List[str], compact: bool = False):
+        self.worker_urls = worker_urls
+        self._encoder = ResponseEncoder(compact=compact)
+        self._round_robin = itertools.count()
+        self._client: Optional["httpx.AsyncClient"] = None  # 在 lifespan 启动时创建
+        self.forwarded = [0] * len(worker_urls)
+        self.fan_outs = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await self._read_body(receive)
+        shard = None
+        if scope["method"] == "POST":
+            try:
+                message = json.loads(body)
+            except ValueError:
+                message = None
+            if isinstance(message, dict) and message.get("method") == "tools/call":
+                params = message.get("params") or {}
+                arguments = params.get("arguments") or {}
+                if (params.get("name") == "session_manager" and not arguments.get("session_id")
+                        and arguments.get("action", "list") in FAN_OUT_ACTIONS):
+                    await self._fan_out(scope, message, arguments, send)
+                    return
+                shard = self.route(arguments)
+        if shard is None:
+            shard = next(self._round_robin) % len(self.worker_urls)
+        await self._forward(shard, scope, body, send)
+
+    def route(self, arguments: Dict[str, Any]) -> Optional[int]:
+        """按工具参数中的ID确定分片，没有ID时返回 None（由调用方轮询分配）"""
+        for name in ROUTING_ARGUMENTS:
+            value = arguments.get(name)
+            if isinstance(value, str) and value:
+                return shard_of(value, len(self.worker_urls))
+        return None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """转发请求用的 HTTP 客户端；路由的 lifespan 启动之前访问会抛出 RuntimeError"""
+        if self._client is None:
+            raise RuntimeError("分片路由尚未启动")
+        return self._client
+
+    async def _lifespan(self, receive: Receive, send: Send):
+        import httpx
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # 每个工作进程保持一组长连接；SSE 流可能长时间无数据，不设读取超时
+                self._client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None),
+                                                 limits=httpx.Limits(max_connections=None, max_keepalive_connections=256))
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._client is not None:
+                    await self._client.aclose()
+                    self._client = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    def _url(self, shard: int, scope: Scope) -> str:
+        url = self.worker_urls[shard] + scope["path"]
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode("latin-1")
+        return url
+
+    async def _forward(self, shard: int, scope: Scope, body: bytes, send: Send):
+        """把请求原样转发给一个分片，响应按块转发回客户端"""
+        import httpx
+
+        headers = [(name, value) for name, value in scope["headers"] if name in FORWARDED_HEADERS]
+        request = self.client.build_request(scope["method"], self._url(shard, scope), headers=headers, content=body)
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.HTTPError as exc:
+            logger.warning("分片 %d 不可用: %s", shard, exc)
+            await error_response(send, 502, f"分片 {shard} 不可用")
+            return
+        self.forwarded[shard] += 1
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [(name.lower(), value) for name, value in response.headers.raw
+                            if name.lower() not in HOP_BY_HOP_HEADERS]
+            })
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+
+    async def _call(self, shard: int, scope: Scope, message: Dict[str, Any]) -> Dict[str, Any]:
+        """向一个分片发送 JSON-RPC 请求并返回解析后的响应"""
+        response = await self.client.post(
+            self._url(shard, scope), json=message,
+            headers={"accept": "application/json, text/event-stream"}
+        )
+        self.forwarded[shard] += 1
+        return response.json()
+
+    async def _fan_out(self, scope: Scope, message: Dict[str, Any], arguments: Dict[str, Any], send: Send):
+        """广播会话管理操作并合并各分片的结果"""
+        import httpx
+
+        self.fan_outs += 1
+        action = arguments.get("action", "list")
+        arguments = dict(arguments)
+        requested: List[str] = []
+        if action == "list":
+            # 每个分片返回游标之后的一整页，合并后按创建时间取前 limit 条；
+            # 合并需要创建时间与会话ID，未请求的字段在合并后去掉
+            requested = [field.strip() for field in arguments.get("fields", "").split(",") if field.strip()]
+            if requested:
+                arguments["fields"] = ",".join(dict.fromkeys(requested + ["session_id", "created_at"]))
+            arguments["limit"] = max(1, min(int(arguments.get("limit", LIST_PAGE_SIZE)), MAX_LIST_PAGE_SIZE))
+        request = copy.deepcopy(message)
+        request["params"]["arguments"] = arguments
+        try:
+            responses = await asyncio.gather(*(self._call(shard, scope, request) for shard in range(len(self.worker_urls))))
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.warning("广播 session_manager('%s') 失败: %s", action, exc)
+            await error_response(send, 502, "部分分片不可用")
+            return
+
+        for response in responses:
+            if "error" in response or response.get("result", {}).get("isError"):
+                await self._respond(send, response)
+                return
+        payloads = [json.loads(response["result"]["content"][0]["text"]) for response in responses]
+        if action == "list":
+            merged = merge_list(payloads, arguments, requested)
+        elif action == "stats":
+            merged = merge_stats(payloads)
+        elif action == "cleanup":
+            merged = merge_cleanup(payloads)
+        else:
+            merged = {"shards": payloads, "router": self.stats()}
+            admission = admission_stats()
+            if admission is not None:
+                merged["http_admission"] = admission
+
+        result = copy.deepcopy(responses[0])
+        text = self._encoder.dumps(merged)
+        result["result"]["content"][0]["text"] = text
+        if isinstance(result["result"].get("structuredContent"), dict):
+            result["result"]["structuredContent"]["result"] = text
+        await self._respond(send, result)
+
+    @staticmethod
+    async def _respond(send: Send, message: Dict[str, Any]):
+        body = json.dumps(message, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, Any]:
+        return {"shards": len(self.worker_urls), "forwarded": list(self.forwarded), "fan_outs": self.fan_outs}
+
+
+def merge_list(payloads: List[Dict[str, Any]], arguments: Dict[str, Any], requested: List[str]) -> Dict[str, Any]:
+    """合并各分片的会话列表页：按 (创建时间, 会话ID) 排序取前 limit 条，游标在各分片间通用"""
+    for payload in payloads:
+        if "error" in payload:
+            return payload
+    pages = [payload for payload in payloads if "sessions" in payload]
+    if not pages:
+        return payloads[0]  # 所有分片都没有活跃会话
+    limit = arguments["limit"]
+    merged = sorted((session for page in pages for session in page["sessions"]),
+                    key=lambda session: (session["created_at"], session["session_id"]),
+                    reverse=arguments.get("sort", "newest") == "newest")
+    has_more = len(merged) > limit or any(page["next_cursor"] for page in pages)
+    merged = merged[:limit]
+    next_cursor = ""
+    if has_more and merged:
+        next_cursor = encode_cursor((merged[-1]["created_at"], merged[-1]["session_id"]))
+    if requested:
+        merged = [{field: session[field] for field in requested} for session in merged]
+    return {
+        "active_sessions": sum(payload.get("active_sessions", 0) for payload in pages),
+        "returned": len(merged),
+        "sessions": merged,
+        "next_cursor": next_cursor,
+        "usage_tip": pages[0]["usage_tip"]
+    }
+
+
+def merge_stats(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并各分片的统计：历史已在分片间复制，分布取最完整的一份；会话、评分与缓存按分片累加"""
+    stats = [payload for payload in payloads if "total_analyses" in payload]
+    if not stats:
+        return payloads[0]
+    base = max(stats, key=lambda payload: payload["total_analyses"])
+    count = sum(payload["quality_assessments_performed"] for payload in stats)
+    total = sum(payload["average_quality_score"] * payload["quality_assessments_performed"] for payload in stats)
+    caches = [payload["analysis_cache"] for payload in stats]
+    hits = sum(cache["hits"] for cache in caches)
+    misses = sum(cache["misses"] for cache in caches)
+    return {
+        **base,
+        "active_sessions": sum(payload["active_sessions"] for payload in stats),
+        "average_quality_score": round(total / count, 2) if count else 0,
+        "context_memory_entries": sum(payload["context_memory_entries"] for payload in stats),
+        "quality_assessments_performed": count,
+        "analysis_cache": {
+            "size": sum(cache["size"] for cache in caches),
+            "max_size": sum(cache["max_size"] for cache in caches),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 2) if hits + misses else 0.0
+        },
+        "shards": len(payloads)
+    }
+
+
+def merge_cleanup(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    cleaned = sum(payload["sessions_cleaned"] for payload in payloads)
+    return {
+        "cleanup_completed": True,
+        "sessions_cleaned": cleaned,
+        "remaining_sessions": sum(payload["remaining_sessions"] for payload in payloads),
+        "message": f"清理了 {cleaned} 个过期会话"
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class _ForkedWorker:
+    """分叉出的工作进程，提供 run_sharded 用到的 subprocess.Popen 接口子集"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self, timeout: float) -> int:
+        deadline = time.monotonic() + timeout
+        while True:
+            returncode = self.poll()
+            if returncode is not None:
+                return returncode
+            if time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(f"pid {self.pid}", timeout)
+            time.sleep(0.05)
+
+    def terminate(self):
+        if self.returncode is None:
+            os.kill(self.pid, signal.SIGTERM)
+
+    def kill(self):
+        if self.returncode is None:
+            os.kill(self.pid, signal.SIGKILL)
+
+
+def _fork_worker(env: Dict[str, str], argv: List[str]) -> _ForkedWorker:
+    """从路由进程分叉一个工作进程
+
+    子进程沿用路由已导入的模块（mcp 协议栈、关键词自动机、思考框架模板等），
+    这些对象所在的内存页在路由与各工作进程之间写时复制共享，也省去了重新导入与编译的时间；
+    只有服务器模块按工作进程的环境变量重新执行，创建本分片自己的会话、存储与线程池。
+    子进程以 os._exit 退出，不执行从路由继承的 atexit 回调，自己的清理由 server.shutdown 完成。
+    """
+    pid = os.fork()
+    if pid:
+        return _ForkedWorker(pid)
+    status = 1
+    try:
+        os.environ.update(env)
+        sys.argv = argv
+        name = f"{__package__}.server"
+        sys.modules.pop(name, None)
+        server = importlib.import_module(name)
+        try:
+            server.main()
+        finally:
+            server.shutdown()
+        status = 0
+    except SystemExit as exc:
+        status = exc.code if isinstance(exc.code, int) else int(exc.code is not None)
+    except BaseException:
+        logger.exception("分片工作进程异常退出")
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+def _wait_for_worker(process: subprocess.Popen, port: int):
+    deadline = time.monotonic() + WORKER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"分片工作进程提前退出（状态码 {process.returncode}）")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"分片工作进程在 {WORKER_START_TIMEOUT} 秒内没有开始监听")
+
+
+def run_sharded(shards: int, host: str, port: int, keep_alive: float, max_body_bytes: int, max_inflight: int,
+                queue_timeout: float, max_connections: int, log_level: str = "INFO", compact: bool = False,
+                start_method: str = DEFAULT_SHARD_START):
+    """启动 shards 个工作进程，并在 host:port 上运行路由（阻塞直到退出，退出时结束工作进程）
+
+    工作进程只监听 127.0.0.1，各自拥有按会话ID分片的会话、独立的存储文件与线程池；
+    分析历史经共享目录在分片间复制。路由的在途请求上限为 max_inflight × shards，
+    每个工作进程仍各自执行 max_inflight 的上限。
+
+    start_method 为 "fork" 时，先构建全部思考框架模板并冻结垃圾回收跟踪的对象，再分叉工作进程：
+    只读的关键词表、自动机与模板只存在一份，子进程的垃圾回收也不会改写这些共享页。
+    """
+    if start_method not in SHARD_START_METHODS:
+        raise ValueError(f"未知的工作进程启动方式: {start_method}")
+    if start_method == "fork" and not hasattr(os, "fork"):
+        start_method = "spawn"
+    replication_dir = tempfile.mkdtemp(prefix="taskify-replication-")
+    workers: List[Any] = []
+    worker_ports: List[int] = []
+
+    def stop_workers():
+        for process in workers:
+            if process.poll() is None:
+                process.terminate()
+        for process in workers:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(replication_dir, ignore_errors=True)
+
+    atexit.register(stop_workers)
+    # uvicorn 退出时会重新触发收到的信号；SIGTERM 转为 SystemExit，保证工作进程随路由一起结束
+    # （分叉出的工作进程继承这一处理，收到 SIGTERM 后同样先完成清理再退出）
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    if start_method == "fork":
+        preload_framework_templates()
+        gc.freeze()
+    for index in range(shards):
+        worker_ports.append(_free_port())
+        env = dict(os.environ)
+        env.update({
+            "TASKIFY_SHARDS": "1",
+            "TASKIFY_SHARD_INDEX": str(index),
+            "TASKIFY_SHARD_COUNT": str(shards),
+            "TASKIFY_REPLICATION_DIR": replication_dir,
+            "TASKIFY_HTTP_STATELESS": "1",
+            "TASKIFY_HTTP_JSON_RESPONSE": "1"
+        })
+        arguments = ["--transport", "streamable-http", "--host", "127.0.0.1", "--port", str(worker_ports[-1])]
+        if start_method == "fork":
+            workers.append(_fork_worker(env, ["taskify-mcp-server", *arguments]))
+            continue
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", f"{__package__}.server", *arguments],
+            env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ))
+    for process, worker_port in zip(workers, worker_ports):
+        _wait_for_worker(process, worker_port)
+
+    logger.info("taskify 分片路由监听 http://%s:%d，%d 个工作进程", host, port, shards)
+    router = ShardRouter([f"http://127.0.0.1:{worker_port}" for worker_port in worker_ports], compact=compact)
+    try:
+        serve(AdmissionControl(router, max_body_bytes, max_inflight * shards, queue_timeout),
+              host, port, keep_alive, max_connections, log_level)
+    finally:
+        stop_workers()
@@ -0,0 +1,236 @@
+"""SQLite 存储后端 - WAL 模式下批量写入会话、上下文记忆与分析历史"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .models import SessionInfo
+from .storage import StorageBackend, session_from_record, session_to_record
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite 存储后端（WAL 模式）
+
+    - 写入先进入缓冲区，达到 batch_size 或距上次落盘超过 flush_interval 秒时，
+      在一个事务内用 executemany 批量写入；固定的 SQL 文本由 sqlite3 的语句缓存复用预编译结果
+    - 后台线程每 flush_interval 秒写出一次缓冲，空闲期间的写入最多滞后 flush_interval 秒落盘；
+      事务失败时缓冲保留，下次落盘重试
+    - 启动时不加载任何数据：会话在首次被访问时才从数据库水合为 SessionInfo
+    """
+
+    name = "sqlite"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            last_access REAL NOT NULL,
+            user_request TEXT NOT NULL,
+            project_context TEXT NOT NULL,
+            current_stage TEXT NOT NULL,
+            task_analysis TEXT NOT NULL,
+            thinking_frameworks TEXT NOT NULL,  -- 仅保存相对模板的自适应提示差异
+            stage_history TEXT NOT NULL,
+            quality_scores TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(last_access);
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS context_memory (
+            context_key TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    # 列序与 session_to_record 的键序一致
+    _SESSION_COLUMNS = ("session_id", "timestamp", "last_access", "user_request", "project_context",
+                        "current_stage", "task_analysis", "thinking_frameworks", "stage_history",
+                        "quality_scores")
+    _JSON_COLUMNS = frozenset(("task_analysis", "thinking_frameworks", "stage_history", "quality_scores"))
+
+    _UPSERT_SESSION = (
+        "INSERT OR REPLACE INTO sessions (session_id, timestamp, last_access, user_request, "
+        "project_context, current_stage, task_analysis, thinking_frameworks, stage_history, "
+        "quality_scores) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    _SELECT_SESSION = (
+        "SELECT session_id, timestamp, last_access, user_request, project_context, current_stage, "
+        "task_analysis, thinking_frameworks, stage_history, quality_scores "
+        "FROM sessions WHERE session_id = ?"
+    )
+    _DELETE_SESSION = "DELETE FROM sessions WHERE session_id = ?"
+    _DELETE_EXPIRED = "DELETE FROM sessions WHERE last_access < ?"
+    _INSERT_HISTORY = "INSERT INTO history (data) VALUES (?)"
+    _TRIM_HISTORY = "DELETE FROM history WHERE id <= (SELECT MAX(id) FROM history) - ?"
+    _SELECT_HISTORY = "SELECT data FROM (SELECT id, data FROM history ORDER BY id DESC LIMIT ?) ORDER BY id"
+    _UPSERT_CONTEXT = "INSERT OR REPLACE INTO context_memory (context_key, data) VALUES (?, ?)"
+    _SELECT_CONTEXT = "SELECT data FROM context_memory WHERE context_key = ?"
+    _COUNT_CONTEXTS = "SELECT COUNT(*) FROM context_memory"
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 1.0,
+                 max_history: int = 20000):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_history = max_history
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+
+        # 写缓冲：同一会话/上下文只保留最后一次写入
+        self._pending_sessions: Dict[str, SessionInfo] = {}
+        self._pending_deletes: List[str] = []
+        self._pending_contexts: Dict[str, Dict[str, Any]] = {}
+        self._pending_history: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._run, name="taskify-sqlite-flush", daemon=True)
+        self._flusher.start()
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("SQLite 后台落盘失败，缓冲的写入将在下次落盘时重试")
+
+    def _pending_count(self) -> int:
+        return (len(self._pending_sessions) + len(self._pending_deletes)
+                + len(self._pending_contexts) + len(self._pending_history))
+
+    def _maybe_flush(self):
+        if (self._pending_count() >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    @staticmethod
+    def _session_row(session: SessionInfo) -> tuple:
+        """会话记录按列序展开为一行，嵌套字段以 JSON 文本保存"""
+        json_columns = SQLiteBackend._JSON_COLUMNS
+        return tuple(json.dumps(value, ensure_ascii=False) if column in json_columns else value
+                     for column, value in session_to_record(session).items())
+
+    @staticmethod
+    def _session_from_row(row: tuple) -> SessionInfo:
+        return session_from_record({
+            column: json.loads(value) if column in SQLiteBackend._JSON_COLUMNS else value
+            for column, value in zip(SQLiteBackend._SESSION_COLUMNS, row)
+        })
+
+    def load_session(self, session_id: str) -> Optional[SessionInfo]:
+        with self._lock:
+            pending = self._pending_sessions.get(session_id)
+            if pending is not None:
+                return pending
+            if session_id in self._pending_deletes:
+                return None
+            row = self._conn.execute(self._SELECT_SESSION, (session_id,)).fetchone()
+        return self._session_from_row(row) if row else None
+
+    def save_session(self, session: SessionInfo):
+        with self._lock:
+            self._pending_sessions[session.session_id] = session
+            self._maybe_flush()
+
+    def delete_session(self, session_id: str):
+        with self._lock:
+            self._pending_sessions.pop(session_id, None)
+            self._pending_deletes.append(session_id)
+            self._maybe_flush()
+
+    def delete_expired_sessions(self, cutoff: float):
+        with self._lock:
+            self.flush()
+            self._conn.execute(self._DELETE_EXPIRED, (cutoff,))
+
+    def load_context(self, context_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pending = self._pending_contexts.get(context_key)
+            if pending is not None:
+                return pending
+            row = self._conn.execute(self._SELECT_CONTEXT, (context_key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_context(self, context_key: str, memory: Dict[str, Any]):
+        with self._lock:
+            self._pending_contexts[context_key] = dict(memory)
+            self._maybe_flush()
+
+    def count_contexts(self) -> int:
+        # 计数不触发落盘：库中的条目数加上缓冲中尚未入库的新键
+        with self._lock:
+            count = self._conn.execute(self._COUNT_CONTEXTS).fetchone()[0]
+            keys = list(self._pending_contexts)
+            for start in range(0, len(keys), 500):  # 低于 SQLite 单条语句的参数个数上限
+                chunk = keys[start:start + 500]
+                stored = self._conn.execute(
+                    f"SELECT COUNT(*) FROM context_memory WHERE context_key IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchone()[0]
+                count += len(chunk) - stored
+            return count
+
+    def append_history(self, item: Dict[str, Any]):
+        with self._lock:
+            self._pending_history.append(item)
+            self._maybe_flush()
+
+    def load_history(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(self._SELECT_HISTORY, (limit,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending_count():
+                return
+            sessions = [self._session_row(session) for session in self._pending_sessions.values()]
+            deletes = [(session_id,) for session_id in self._pending_deletes]
+            contexts = [(key, json.dumps(memory, ensure_ascii=False))
+                        for key, memory in self._pending_contexts.items()]
+            history = [(json.dumps({k: v for k, v in item.items() if k != 'entry_id'}, ensure_ascii=False),)
+                       for item in self._pending_history]
+
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                if deletes:
+                    conn.executemany(self._DELETE_SESSION, deletes)
+                if sessions:
+                    conn.executemany(self._UPSERT_SESSION, sessions)
+                if contexts:
+                    conn.executemany(self._UPSERT_CONTEXT, contexts)
+                if history:
+                    conn.executemany(self._INSERT_HISTORY, history)
+                    conn.execute(self._TRIM_HISTORY, (self.max_history,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            # 提交成功后才清空缓冲（全程持有锁，期间没有新的写入）
+            self._pending_sessions.clear()
+            self._pending_deletes.clear()
+            self._pending_contexts.clear()
+            self._pending_history.clear()
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self.flush()
+            self._conn.close()
@@ -0,0 +1,239 @@
+"""存储后端 - 会话、上下文记忆与分析历史的持久化抽象"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .models import ComplexityLevel, FrameworkHints, SessionInfo, TaskAnalysis, TaskType, interned
+
+
+def task_analysis_to_record(task_analysis: TaskAnalysis) -> Dict[str, Any]:
+    """TaskAnalysis → 可 JSON 序列化的字典"""
+    return {
+        "task_type": task_analysis.task_type.value,
+        "complexity_level": task_analysis.complexity_level.value,
+        "core_objective": task_analysis.core_objective,
+        "key_requirements": list(task_analysis.key_requirements),
+        "constraints": list(task_analysis.constraints),
+        "risk_factors": list(task_analysis.risk_factors),
+        "success_criteria": list(task_analysis.success_criteria),
+        "context_needs": list(task_analysis.context_needs),
+        "similarity_score": task_analysis.similarity_score,
+        "learning_insights": ([list(insights) for insights in task_analysis.learning_insights]
+                              if task_analysis.learning_insights is not None else None)
+    }
+
+
+def task_analysis_from_record(record: Dict[str, Any]) -> TaskAnalysis:
+    """字典 → TaskAnalysis"""
+    learning_insights = record.get("learning_insights")
+    return TaskAnalysis(
+        task_type=TaskType(record["task_type"]),
+        complexity_level=ComplexityLevel(record["complexity_level"]),
+        core_objective=record["core_objective"],
+        key_requirements=interned(record["key_requirements"]),
+        constraints=interned(record["constraints"]),
+        risk_factors=interned(record["risk_factors"]),
+        success_criteria=interned(record["success_criteria"]),
+        context_needs=interned(record["context_needs"]),
+        similarity_score=record.get("similarity_score", 0.0),
+        learning_insights=(tuple(tuple(insights) for insights in learning_insights)
+                           if learning_insights is not None else None)
+    )
+
+
+def framework_hints_to_record(hints: Optional[FrameworkHints]) -> Dict[str, Any]:
+    """会话的思考框架差异 → 可 JSON 序列化的字典（框架模板本身不落盘）"""
+    return {stage: list(stage_hints) for stage, stage_hints in (hints or {}).items()}
+
+
+def framework_hints_from_record(record: Dict[str, Any]) -> Optional[FrameworkHints]:
+    """字典 → 思考框架差异
+
+    兼容早期保存完整框架的记录：只取出各阶段的自适应提示，其余内容由模板还原。
+    """
+    hints = {}
+    for stage, data in record.items():
+        if isinstance(data, dict):
+            data = data.get("adaptive_hints") or []
+        hints[stage] = interned(data)
+    return hints or None
+
+
+def session_to_record(session: SessionInfo) -> Dict[str, Any]:
+    """SessionInfo → 可 JSON 序列化的字典（日志与 SQLite 后端共用）"""
+    return {
+        "session_id": session.session_id,
+        "timestamp": session.timestamp,
+        "last_access": session.last_access,
+        "user_request": session.user_request,
+        "project_context": session.project_context,
+        "current_stage": session.current_stage,
+        "task_analysis": task_analysis_to_record(session.task_analysis),
+        "thinking_frameworks": framework_hints_to_record(session.framework_hints),
+        "stage_history": list(session.stage_history),
+        "quality_scores": dict(session.quality_scores)
+    }
+
+
+def session_from_record(record: Dict[str, Any]) -> SessionInfo:
+    """字典 → SessionInfo"""
+    return SessionInfo(
+        session_id=record["session_id"],
+        timestamp=record["timestamp"],
+        last_access=record["last_access"],
+        user_request=record["user_request"],
+        project_context=record["project_context"],
+        current_stage=record["current_stage"],
+        task_analysis=task_analysis_from_record(record["task_analysis"]),
+        framework_hints=framework_hints_from_record(record["thinking_frameworks"]),
+        stage_history=record["stage_history"],
+        quality_scores=record["quality_scores"]
+    )
+
+
+class StorageBackend:
+    """存储后端接口
+
+    基类方法均为空操作：写入被丢弃、读取总是未命中，子类按需覆盖。
+    """
+
+    name = "base"
+
+    def load_session(self, session_id: str) -> Optional[SessionInfo]:
+        """按需加载单个会话，未找到返回 None"""
+        return None
+
+    def save_session(self, session: SessionInfo):
+        """保存（新增或更新）会话"""
+
+    def delete_session(self, session_id: str):
+        """删除会话"""
+
+    def delete_expired_sessions(self, cutoff: float):
+        """删除最近访问时间早于 cutoff 的会话"""
+
+    def load_context(self, context_key: str) -> Optional[Dict[str, Any]]:
+        """加载上下文记忆条目"""
+        return None
+
+    def save_context(self, context_key: str, memory: Dict[str, Any]):
+        """保存上下文记忆条目"""
+
+    def count_contexts(self) -> int:
+        """持久化的上下文记忆条目数"""
+        return 0
+
+    def append_history(self, item: Dict[str, Any]):
+        """追加一条分析历史"""
+
+    def load_history(self, limit: int) -> List[Dict[str, Any]]:
+        """按时间顺序加载最近 limit 条分析历史"""
+        return []
+
+    def flush(self):
+        """把缓冲的写入落盘"""
+
+    def close(self):
+        """关闭后端"""
+
+
+class MemoryBackend(StorageBackend):
+    """纯内存模式（默认）：状态只保存在进程内缓存中，重启即丢失"""
+
+    name = "memory"
+
+
+class BackgroundBackend(StorageBackend):
+    """在后台线程中打开的存储后端
+
+    日志后端的快照回放、SQLite 的建表等打开开销不再阻塞进程启动：
+    构造时立即返回，首次调用任意方法时才等待打开完成，之后的调用直接委托给真实后端。
+    打开失败时，每次调用都抛出打开时的异常。
+    进程分叉前会先等待打开完成，子进程不会继承打开到一半的后端。
+    """
+
+    name = "background"
+
+    def __init__(self, factory: Callable[[], StorageBackend]):
+        self._backend: Optional[StorageBackend] = None
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._open, args=(factory,), name="taskify-storage-open", daemon=True)
+        self._thread.start()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(before=self._thread.join)
+
+    def _open(self, factory: Callable[[], StorageBackend]):
+        try:
+            self._backend = factory()
+        except BaseException as exc:
+            self._error = exc
+
+    def _resolve(self) -> StorageBackend:
+        backend = self._backend
+        if backend is not None:
+            return backend
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        if self._backend is None:
+            raise RuntimeError("存储后端未能打开")
+        return self._backend
+
+    def load_session(self, session_id: str) -> Optional[SessionInfo]:
+        return self._resolve().load_session(session_id)
+
+    def save_session(self, session: SessionInfo):
+        self._resolve().save_session(session)
+
+    def delete_session(self, session_id: str):
+        self._resolve().delete_session(session_id)
+
+    def delete_expired_sessions(self, cutoff: float):
+        self._resolve().delete_expired_sessions(cutoff)
+
+    def load_context(self, context_key: str) -> Optional[Dict[str, Any]]:
+        return self._resolve().load_context(context_key)
+
+    def save_context(self, context_key: str, memory: Dict[str, Any]):
+        self._resolve().save_context(context_key, memory)
+
+    def count_contexts(self) -> int:
+        return self._resolve().count_contexts()
+
+    def append_history(self, item: Dict[str, Any]):
+        self._resolve().append_history(item)
+
+    def load_history(self, limit: int) -> List[Dict[str, Any]]:
+        return self._resolve().load_history(limit)
+
+    def flush(self):
+        self._resolve().flush()
+
+    def close(self):
+        self._thread.join()
+        if self._backend is not None:
+            self._backend.close()
+
+
+def create_backend(kind: str, path: str, max_history: int, background: bool = False,
+                   **options: Any) -> StorageBackend:
+    """根据配置创建存储后端（"memory"、"sqlite" 或 "journal"）
+
+    background 为 True 时持久化后端在后台线程中打开（见 BackgroundBackend），内存后端总是直接创建。
+    """
+    if kind == "memory":
+        return MemoryBackend()
+    # 持久化后端只在选用时导入，内存模式启动时不加载 sqlite3
+    if kind == "sqlite":
+        from .sqlite_backend import SQLiteBackend
+        factory: Callable[..., StorageBackend] = SQLiteBackend
+        options = {}
+    elif kind == "journal":
+        from .journal import JournalBackend
+        factory = JournalBackend
+    else:
+        raise ValueError(f"不支持的存储后端: {kind}")
+    if background:
+        return BackgroundBackend(lambda: factory(path, max_history=max_history, **options))
+    return factory(path, max_history=max_history, **options)